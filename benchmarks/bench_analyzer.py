@@ -0,0 +1,111 @@
+"""Micro-benchmark of the metrics analyzers: commits/sec of analyzing synthetic commit records.
+
+The records look like the commits GitLogParser yields (without diff_lines). A pool of
+distinct records is cycled through, so that a million commits don't have to fit in memory.
+
+Usage:
+  python benchmarks/bench_analyzer.py [--commits N] [--metric NAME ...] [--metrics-precision NAME ...]
+                                      [--analyzer NAME ...]
+"""
+from __future__ import print_function
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import codewerdz.git.metrics  # noqa: E402
+from codewerdz.git.metrics.columnar_commit_analyzer import ColumnarCommitAnalyzer  # noqa: E402
+from codewerdz.git.metrics.commit_analyzer import CommitAnalyzer  # noqa: E402
+
+# the analyzers of `metrics --analyzer`
+ANALYZERS = {
+  'streaming': CommitAnalyzer,
+  'columnar': ColumnarCommitAnalyzer
+}
+
+STATS_KEYS = ['lines_added', 'lines_removed', 'lines_changed', 'lines_of_docs', 'lines_of_code']
+
+
+def synthetic_commits(count, authors=200, seed=0):
+  """Returns count commit records spread over ~10 years of history."""
+  rng = random.Random(seed)
+  commits = []
+  timestamp = 1262304000
+  for n in range(count):
+    timestamp += rng.randint(0, 2 * 86400 * 3650 // max(count, 1))
+    offset = rng.choice([-7, -5, 0, 1, 2, 9])
+    local = time.gmtime(timestamp + offset * 3600)
+    date_iso = time.strftime('%Y-%m-%d %H:%M:%S', local) + ' {}{:02d}00'.format('-' if offset < 0 else '+', abs(offset))
+    author = rng.randint(0, authors - 1)
+
+    diffs = []
+    for _ in range(rng.randint(1, 6)):
+      stats = dict((key, rng.randint(0, 50)) for key in STATS_KEYS)
+      kind = rng.random()
+      chars_of_docs = rng.randint(1, 2000) if kind < 0.4 else 0
+      chars_of_code = rng.randint(1, 4000) if kind > 0.3 else 0
+      stats.update(chars_of_docs=chars_of_docs, chars_of_code=chars_of_code, is_docfile=chars_of_code == 0,
+                   chars_changed=chars_of_docs + chars_of_code, chars_added=chars_of_docs, chars_removed=chars_of_code)
+      diffs.append({'filename': 'file{}.py'.format(rng.randint(0, 999)), 'stats': stats})
+
+    commits.append({
+      'sha': '{:07x}'.format(n),
+      'author': 'Author {}'.format(author),
+      'email': 'author{}@example.com'.format(author),
+      'date': str(timestamp),
+      'date_iso': date_iso,
+      'commit_date': str(timestamp),
+      'commit_date_iso': date_iso,
+      'parent': '{:07x}'.format(n + 1),
+      'tree': '{:07x}'.format(n + 2),
+      'subject': 'Commit {}'.format(n),
+      'stats': [],
+      'diffs': diffs
+    })
+  return commits
+
+
+def bench(analyzer_class, pool, count, precisions, metric_names):
+  """Returns the commits/sec of analyzing count commits cycled from pool."""
+  commits = itertools.islice(itertools.cycle(pool), count)
+  start = time.time()
+  analyzer_class().analyze_commits(commits, precisions, metric_names)
+  return count / max(time.time() - start, 1e-9)
+
+
+def main():
+  arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arg_parser.add_argument('--commits', type=int, default=1000000, help="Number of commits to analyze.")
+  arg_parser.add_argument('--pool', type=int, default=20000, help="Number of distinct commit records.")
+  arg_parser.add_argument('--metric', action='append', choices=codewerdz.git.metrics.METRICS_CHOICES,
+                          help="Also time this selection of metrics (all metrics are always timed).")
+  arg_parser.add_argument('--metrics-precision', action='append', choices=codewerdz.git.metrics.PRECISION_CHOICES,
+                          help="Precisions to analyze. Default the default precisions")
+  arg_parser.add_argument('--analyzer', action='append', choices=sorted(ANALYZERS), help="Analyzers to time. Default all")
+  args = arg_parser.parse_args()
+
+  pool = synthetic_commits(args.pool)
+  precisions = args.metrics_precision or codewerdz.git.metrics.DEFAULT_PRECISION
+
+  cases = [('all metrics', codewerdz.git.metrics.METRICS_CHOICES),
+           ('commit_count', ['commit_count']),
+           ('docs_density_avg', ['docs_density_avg']),
+           ('contributor_count', ['contributor_count'])]
+  if args.metric:
+    cases.append((','.join(args.metric), args.metric))
+
+  print("{} commits, precisions: {}".format(args.commits, ', '.join(sorted(precisions))))
+  print("{:<12} {:<40} {:>12}".format('analyzer', 'metrics', 'commits/sec'))
+  for analyzer in args.analyzer or sorted(ANALYZERS):
+    for name, metric_names in cases:
+      rate = bench(ANALYZERS[analyzer], pool, args.commits, precisions, metric_names)
+      print("{:<12} {:<40} {:>12.0f}".format(analyzer, name, rate))
+
+
+if __name__ == '__main__':
+  main()
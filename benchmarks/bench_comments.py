@@ -0,0 +1,63 @@
+"""Micro-benchmark of the cost of --comments-are-docs: commits/sec parsed with and without it.
+
+Compares the per-language CommentClassifier to the generic prefix/suffix checks
+GitLogParser used before, on the same (captured or synthetic) log as bench_parser.
+
+Usage:
+  python benchmarks/bench_comments.py [--repo PATH] [--commits N] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_parser import bench, repo_log, synthetic_log  # noqa: E402
+from codewerdz.git.log.git_log_parser import GitLogParser  # noqa: E402
+from codewerdz.git.log.git_log_process import GitLogProcess  # noqa: E402
+
+
+def legacy_is_comment_line(content):
+  """The comment check GitLogParser used before CommentClassifier."""
+  content = (content or '').strip()
+  COMMENT_PREFIXES = ["#", "//", "/*", "* ", "*/", "'''", '"""']
+  COMMENT_SUFFIXES = ["*/", "'''", '"""']
+  return any((
+    any(map(content.startswith, COMMENT_PREFIXES)),
+    any(map(content.endswith, COMMENT_SUFFIXES))
+    ))
+
+
+class LegacyCommentsParser(GitLogParser):
+  def _comment_matcher(self, filename):
+    return legacy_is_comment_line
+
+
+def main():
+  arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arg_parser.add_argument('--repo', help="Parse the log of this repository instead of a synthetic one.")
+  arg_parser.add_argument('--commits', type=int, default=2000, help="Number of commits to parse.")
+  arg_parser.add_argument('--repeat', type=int, default=3, help="Runs of each case, the best is reported.")
+  args = arg_parser.parse_args()
+
+  framing = GitLogProcess.FRAMING_NUL
+  lines = repo_log(framing, args.repo, args.commits) if args.repo else synthetic_log(framing, args.commits)
+
+  cases = [
+    ('off', GitLogParser, False),
+    ('legacy', LegacyCommentsParser, True),
+    ('per-language', GitLogParser, True),
+  ]
+
+  print("{:<14} {:>8} {:>12} {:>10}".format('comments', 'commits', 'commits/sec', 'slowdown'))
+  baseline = None
+  for name, parser_class, comments_are_docs in cases:
+    count, rate = bench(lines, args.repeat, parser_class, diff_lines=False, comments_are_docs=comments_are_docs)
+    baseline = baseline or rate
+    print("{:<14} {:>8} {:>12.1f} {:>9.2f}x".format(name, count, rate, baseline / rate))
+
+
+if __name__ == '__main__':
+  main()
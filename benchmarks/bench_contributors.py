@@ -0,0 +1,86 @@
+"""Memory benchmark of counting contributors exactly or approximately (see ContributorSketch).
+
+Synthetic commit records (see bench_analyzer) by many authors are aggregated into the contributor
+counts of every default precision, once with exact contributor dicts and once per error rate with
+sketches. Each run is in a fresh interpreter, whose peak RSS growth while aggregating is reported,
+along with its speed and the worst relative errors of its counts against the exact ones.
+
+Usage:
+  python benchmarks/bench_contributors.py [--commits N] [--authors N] [--error RATE ...]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import codewerdz.git.metrics  # noqa: E402
+from bench_analyzer import synthetic_commits  # noqa: E402
+from codewerdz.git.metrics.commit_analyzer import CONTRIBUTOR_COUNTS, CommitAnalyzer  # noqa: E402
+
+
+def run(commits, authors, error):
+  """Returns the peak RSS growth (KiB), commits/sec and counts of aggregating the commits."""
+  records = synthetic_commits(commits, authors)
+  analyzer = CommitAnalyzer(contributor_error=error)
+  before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+  start = time.time()
+  accumulators = analyzer.aggregate_commits(records, codewerdz.git.metrics.DEFAULT_PRECISION, CONTRIBUTOR_COUNTS)
+  rate = commits / max(time.time() - start, 1e-9)
+
+  growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+  metrics = analyzer.finalize_metrics(accumulators, CONTRIBUTOR_COUNTS)
+  return {'memory': growth, 'rate': rate, 'metrics': metrics}
+
+
+def worst_error(metrics, exact, names):
+  """Returns the worst relative error of the counts names in metrics against exact ones."""
+  errors = [0.0]
+  for precision, buckets in exact.items():
+    for key, counts in ([('', buckets)] if precision == 'total' else buckets.items()):
+      estimated = metrics[precision] if precision == 'total' else metrics[precision][key]
+      errors += [abs(estimated[name] - value) / float(value) for name, value in counts.items()
+                 if value and name in names]
+  return max(errors)
+
+
+def main():
+  arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arg_parser.add_argument('--commits', type=int, default=200000, help="Number of commits. Default %(default)s")
+  arg_parser.add_argument('--authors', type=int, default=5000, help="Number of authors. Default %(default)s")
+  arg_parser.add_argument('--error', type=float, action='append', help="Error rates to time. Default 0.02, 0.05")
+  arg_parser.add_argument('--child', type=float, default=None, help=argparse.SUPPRESS)
+  args = arg_parser.parse_args()
+
+  if args.child is not None:
+    print(json.dumps(run(args.commits, args.authors, args.child or None)))
+    return
+
+  print("{} commits by {} authors, precisions: {}".format(
+    args.commits, args.authors, ', '.join(sorted(codewerdz.git.metrics.DEFAULT_PRECISION))))
+  print("{:<12} {:>14} {:>12} {:>12} {:>12}".format('contributors', 'peak RSS +MiB', 'commits/sec', 'worst error',
+                                                    'only_* error'))
+  # the only docs (code) counts are differences of estimates, whose error is relative to a larger count
+  only_counts = [name for name in CONTRIBUTOR_COUNTS if '_only_' in name]
+  exact = None
+  for error in [0.0] + (args.error or [0.02, 0.05]):
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--commits', str(args.commits),
+                                      '--authors', str(args.authors), '--child', str(error)])
+    result = json.loads(output.decode('utf-8'))
+    if exact is None:
+      exact = result['metrics']
+    print("{:<12} {:>14.1f} {:>12.0f} {:>12.2%} {:>12.2%}".format(
+      '{:.0%} error'.format(error) if error else 'exact', result['memory'] / 1024.0, result['rate'],
+      worst_error(result['metrics'], exact, [name for name in CONTRIBUTOR_COUNTS if name not in only_counts]),
+      worst_error(result['metrics'], exact, only_counts)))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,105 @@
+"""Micro-benchmark of GitLogParser.parse: commits/sec for each framing and diff parser.
+
+The log output is captured in memory up front (from a repository with --repo, or generated
+synthetically), so only the parser is timed.
+
+Usage:
+  python benchmarks/bench_parser.py [--repo PATH] [--commits N] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from codewerdz.git.log.git_log_parser import GitLogParser  # noqa: E402
+from codewerdz.git.log.git_log_process import GitLogProcess  # noqa: E402
+
+
+def synthetic_log(framing, commits, seed=0):
+  """Returns the lines of a patch heavy git log output with the given framing."""
+  rng = random.Random(seed)
+  words = ['foo', 'bar', 'baz', '#', '//', 'return', 'self', '=', '(', ')', '"""', 'x', '1']
+  paths = ['src/module{}/file{}.{}'.format(i % 13, i, ('py', 'c', 'md', 'js')[i % 4]) for i in range(500)]
+  lines = []
+  for n in range(commits):
+    header = ['{:07x}'.format(n), 'Author {}'.format(n % 17), 'author{}@example.com'.format(n % 17),
+              '1500000000', '2017-07-14 02:40:00 +0000', '1500000000', '2017-07-14 02:40:00 +0000',
+              '{:07x}'.format(n + 1), '{:07x}'.format(n + 2), 'Commit {}'.format(n)]
+    if framing == GitLogProcess.FRAMING_NUL:
+      lines.append('\0' + header[0])
+      lines.extend(header[1:])
+    else:
+      lines.append(GitLogProcess.FORMAT_START_COMMIT)
+      lines.extend(header)
+
+    files = rng.sample(paths, rng.randint(1, 8))
+    hunks = dict((path, [rng.randint(5, 60) for _ in range(rng.randint(1, 4))]) for path in files)
+    lines.append('')
+    lines.extend('{}\t{}\t{}'.format(sum(hunks[path]), sum(hunks[path]), path) for path in files)
+    lines.append('')
+    for path in files:
+      lines.extend(['diff --git a/{0} b/{0}'.format(path), 'index 1234567..89abcde 100644',
+                    '--- a/' + path, '+++ b/' + path])
+      for size in hunks[path]:
+        lines.append('@@ -1,{0} +1,{0} @@ def function():'.format(size + 3))
+        lines.extend(' ' + ' '.join(rng.sample(words, 4)) for _ in range(3))
+        lines.extend('-' + ' '.join(rng.sample(words, 6)) for _ in range(size))
+        lines.extend('+' + ' '.join(rng.sample(words, 6)) for _ in range(size))
+  return lines
+
+
+def repo_log(framing, repo, commits):
+  """Returns the lines of the git log output of a repository with the given framing."""
+  process = GitLogProcess(limit=commits, framing=framing)
+  command = [GitLogProcess.GIT_EXECUTABLE, GitLogProcess.GIT_PAGER_OPTION, 'log'] + process.params
+  return subprocess.check_output(command, cwd=repo).split('\n')[:-1]
+
+
+def bench(lines, repeat, parser_class=GitLogParser, **parser_options):
+  """Returns the best commits/sec of parsing lines with a GitLogParser (or subclass)."""
+  best = None
+  for _ in range(repeat):
+    parser = parser_class(**parser_options)
+    start = time.time()
+    count = sum(1 for _ in parser.parse(lines))
+    rate = count / max(time.time() - start, 1e-9)
+    best = rate if best is None else max(best, rate)
+  return count, best
+
+
+def main():
+  arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arg_parser.add_argument('--repo', help="Parse the log of this repository instead of a synthetic one.")
+  arg_parser.add_argument('--commits', type=int, default=2000, help="Number of commits to parse.")
+  arg_parser.add_argument('--repeat', type=int, default=3, help="Runs of each case, the best is reported.")
+  arg_parser.add_argument('--comments-are-docs', action='store_true')
+  args = arg_parser.parse_args()
+
+  cases = [
+    (GitLogProcess.FRAMING_SENTINEL, GitLogParser.DIFF_PARSER_WHATTHEPATCH),
+    (GitLogProcess.FRAMING_SENTINEL, GitLogParser.DIFF_PARSER_STREAMING),
+    (GitLogProcess.FRAMING_NUL, GitLogParser.DIFF_PARSER_WHATTHEPATCH),
+    (GitLogProcess.FRAMING_NUL, GitLogParser.DIFF_PARSER_STREAMING),
+  ]
+
+  logs = {}
+  print("{:<10} {:<13} {:>8} {:>12}".format('framing', 'diff parser', 'commits', 'commits/sec'))
+  for framing, diff_parser in cases:
+    if framing not in logs:
+      if args.repo:
+        logs[framing] = repo_log(framing, args.repo, args.commits)
+      else:
+        logs[framing] = synthetic_log(framing, args.commits)
+    count, rate = bench(logs[framing], args.repeat, diff_parser=diff_parser, diff_lines=False,
+                        comments_are_docs=args.comments_are_docs)
+    print("{:<10} {:<13} {:>8} {:>12.1f}".format(framing, diff_parser, count, rate))
+
+
+if __name__ == '__main__':
+  main()
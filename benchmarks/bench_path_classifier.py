@@ -0,0 +1,106 @@
+"""Micro-benchmark of doc file classification: lookups/sec of fnmatch vs PathClassifier.
+
+The paths of a repository (with --repo, from `git ls-files`) or a synthetic monorepo layout
+are looked up in a skewed order, as a few hot paths show up in most diffs of a real history.
+
+Usage:
+  python benchmarks/bench_path_classifier.py [--repo PATH] [--lookups N] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+import fnmatch
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import codewerdz.git  # noqa: E402
+from codewerdz.git.log.git_attributes import GitAttributes  # noqa: E402
+from codewerdz.git.log.path_classifier import PathClassifier  # noqa: E402
+
+ATTRIBUTES = """
+docs/** linguist-documentation
+**/generated/** linguist-generated
+*.pb.go linguist-generated
+third_party/**/*.md -linguist-documentation
+"""
+
+
+def synthetic_paths(count, seed=0):
+  """Returns count paths of a monorepo like layout."""
+  rng = random.Random(seed)
+  tops = ['services', 'libs', 'tools', 'docs', 'third_party', 'web']
+  extensions = ['py', 'go', 'pb.go', 'js', 'ts', 'c', 'h', 'java', 'md', 'rst', 'txt', 'json', 'yaml']
+  paths = set()
+  while len(paths) < count:
+    depth = rng.randint(1, 5)
+    parts = [rng.choice(tops)] + ['{}{}'.format(rng.choice(['pkg', 'src', 'generated', 'internal', 'api']),
+                                                 rng.randint(0, 40)) for _ in range(depth)]
+    name = rng.choice(['README', 'file{}.{}'.format(rng.randint(0, 300), rng.choice(extensions))])
+    paths.add('/'.join(parts + [name]))
+  return sorted(paths)
+
+
+def repo_paths(repo):
+  """Returns the paths of the files of a repository."""
+  return subprocess.check_output(['git', 'ls-files', '-z'], cwd=repo).split('\0')[:-1]
+
+
+def lookups(paths, count, seed=0):
+  """Returns count paths drawn with a skewed (pareto) distribution."""
+  rng = random.Random(seed)
+  return [paths[min(int(rng.paretovariate(0.5)) - 1, len(paths) - 1)] for _ in range(count)]
+
+
+def fnmatch_is_doc_file(patterns):
+  """Returns the classification GitLogParser used before PathClassifier."""
+  def is_doc_file(filename):
+    return any([fnmatch.fnmatch(filename, pattern) for pattern in patterns])
+  return is_doc_file
+
+
+def bench(make_is_doc_file, paths, repeat):
+  """Returns the best lookups/sec of a (fresh) is_doc_file function over paths."""
+  best = None
+  for _ in range(repeat):
+    is_doc_file = make_is_doc_file()
+    start = time.time()
+    for path in paths:
+      is_doc_file(path)
+    rate = len(paths) / max(time.time() - start, 1e-9)
+    best = rate if best is None else max(best, rate)
+  return best
+
+
+def main():
+  arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arg_parser.add_argument('--repo', help="Classify the paths of this repository instead of synthetic ones.")
+  arg_parser.add_argument('--paths', type=int, default=20000, help="Number of synthetic paths.")
+  arg_parser.add_argument('--lookups', type=int, default=500000, help="Number of paths to classify.")
+  arg_parser.add_argument('--repeat', type=int, default=3, help="Runs of each case, the best is reported.")
+  args = arg_parser.parse_args()
+
+  paths = repo_paths(args.repo) if args.repo else synthetic_paths(args.paths)
+  sample = lookups(paths, args.lookups)
+  patterns = codewerdz.git.DEFAULT_DOCS_PATTERNS + ['docs/*', '*/CHANGELOG*']
+  attributes = GitAttributes(GitAttributes.parse(ATTRIBUTES))
+
+  cases = [
+    ('fnmatch', lambda: fnmatch_is_doc_file(patterns)),
+    ('classifier', lambda: PathClassifier(patterns).is_doc_file),
+    ('classifier+attrs', lambda: PathClassifier(patterns, attributes=attributes).is_doc_file),
+    ('uncached', lambda: PathClassifier(patterns, attributes=attributes, cache_size=1).is_doc_file),
+  ]
+
+  print("{} paths, {} distinct in {} lookups".format(len(paths), len(set(sample)), len(sample)))
+  print("{:<18} {:>14}".format('engine', 'lookups/sec'))
+  for name, make_is_doc_file in cases:
+    print("{:<18} {:>14.0f}".format(name, bench(make_is_doc_file, sample, args.repeat)))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,72 @@
+"""Startup benchmarks: the time to import the API and the CLI, and to answer a tiny query.
+
+Each case runs in a fresh interpreter, repeat times, and its fastest and median wall times are
+reported, along with the time of an empty interpreter (which every case pays for). The import
+cases also list the slow-to-import dependencies (click, whatthepatch, ...) they loaded.
+
+Usage:
+  python benchmarks/bench_startup.py [--repo PATH] [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(BENCHMARKS_DIR, '..'))
+
+# the dependencies that take a while to import
+HEAVY_MODULES = ['click', 'whatthepatch', 'iso8601', 'numpy', 'multiprocessing', 'sqlite3']
+
+PRELUDE = "import sys; sys.path.insert(0, {!r}); ".format(ROOT)
+REPORT_MODULES = "; print(','.join(m for m in {!r} if m in sys.modules))".format(HEAVY_MODULES)
+
+# a query that only reads the last commit, so its time is mostly startup
+QUERY_CLI = ['--repo-name', 'bench', '--repo-url', 'bench', '--commits-limit', '1', 'metrics', '--metric',
+             'commit_count', '--metrics-precision', 'total']
+
+
+def cases():
+  """Returns the (name, python -c code, arguments) of the benchmarks."""
+  cli = "from codewerdz.git.cli import cli; cli(prog_name='codewerdz-git')"
+  return [
+    ('python', "pass", []),
+    ('import api', "import codewerdz.git.api" + REPORT_MODULES, []),
+    ('import cli', "import codewerdz.git.cli" + REPORT_MODULES, []),
+    ('cli --help', cli, ['--help']),
+    ('cli metrics query', cli, QUERY_CLI),
+    ('api metrics query', "from codewerdz.git import api; "
+                          "api.compute_metrics(precisions=['total'], metrics=['commit_count'], limit=1)", [])
+  ]
+
+
+def run(repo, code, args, repeat):
+  """Returns the wall times of repeat runs of code, and the heavy modules it reported (if any)."""
+  times = []
+  output = b''
+  for _ in range(repeat):
+    start = time.time()
+    output = subprocess.check_output([sys.executable, '-c', PRELUDE + code] + args, cwd=repo)
+    times.append(time.time() - start)
+  modules = output.decode('utf-8').strip() if code.endswith(REPORT_MODULES) else ''
+  return sorted(times), modules
+
+
+def main():
+  arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arg_parser.add_argument('--repo', default=ROOT, help="Path of the repository queried. Default %(default)s")
+  arg_parser.add_argument('--repeat', type=int, default=20, help="Runs of each case. Default %(default)s")
+  args = arg_parser.parse_args()
+
+  print("{:<20} {:>9} {:>9}  {}".format('case', 'min ms', 'median ms', 'heavy modules imported'))
+  for name, code, cli_args in cases():
+    times, modules = run(args.repo, code, cli_args, args.repeat)
+    print("{:<20} {:>9.1f} {:>9.1f}  {}".format(
+      name, times[0] * 1000, times[len(times) // 2] * 1000, modules))
+
+
+if __name__ == '__main__':
+  main()
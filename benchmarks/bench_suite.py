@@ -0,0 +1,135 @@
+"""End to end benchmarks of `log` and `metrics`, on a synthetic repository (see synthetic_repo).
+
+Each case runs the CLI in its own process with --profile, and reports its commits/sec, peak RSS
+and the wall time of its stages (git, parse, diff, analyze, output, see Profiler). The results
+can be saved as a baseline, and compared to one: the run fails (exit code 1) if the commits/sec
+of a case regressed by more than --threshold. (The times include the overhead of --profile, in
+the baseline as well.)
+
+Usage:
+  python benchmarks/bench_suite.py [--repo PATH] [--case NAME ...] [--repeat N] [--save-baseline PATH]
+                                   [--baseline PATH] [--threshold R] [synthetic_repo options]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..'))
+
+import codewerdz.git.metrics  # noqa: E402
+import synthetic_repo  # noqa: E402
+
+# runs the CLI of this tree, whatever the working directory (the repository)
+CLI = [sys.executable, '-c', "import sys; sys.path.insert(0, {!r}); from codewerdz.git.cli import cli; "
+                             "cli(prog_name='codewerdz-git')".format(os.path.join(BENCHMARKS_DIR, '..'))]
+CLI_OPTIONS = ['--repo-name', 'bench', '--repo-url', 'bench']
+
+STAGES = ['git', 'parse', 'object_store', 'diff', 'analyze', 'output']
+
+DEFAULT_REPO = os.path.join(tempfile.gettempdir(), 'codewerdz-bench-repo')
+DEFAULT_THRESHOLD = 0.1
+
+
+def cases():
+  """Returns the (name, CLI arguments) of the benchmarks: log, and metrics at each precision."""
+  cases = [('log', ['log', '--compact']),
+           ('log ndjson', ['log', '--format', 'ndjson']),
+           ('metrics', ['metrics']),
+           ('metrics commit_count', ['metrics', '--metric', 'commit_count'])]
+  for precision in sorted(codewerdz.git.metrics.PRECISION_CHOICES):
+    cases.append(('metrics {}'.format(precision), ['metrics', '--metrics-precision', precision]))
+  return cases
+
+
+def run(repo, args, repeat):
+  """Returns the result of the fastest of repeat runs of the CLI with args in repo (see Profiler.report)."""
+  best = None
+  with tempfile.NamedTemporaryFile(suffix='.json') as profile:
+    for _ in range(repeat):
+      with open(os.devnull, 'w') as devnull:
+        subprocess.check_call(CLI + CLI_OPTIONS + ['--profile', profile.name] + args, cwd=repo, stdout=devnull)
+      with open(profile.name) as f:
+        report = json.load(f)
+      if best is None or report['wall_time'] < best['wall_time']:
+        best = report
+  return {
+    'commits': best['commits'],
+    'wall_time': best['wall_time'],
+    'commits_per_sec': best['commits_per_sec'],
+    'peak_rss': best['peak_rss'],
+    'stages': dict((name, stage['wall_time']) for name, stage in best['stages'].items() if name in STAGES)
+  }
+
+
+def compare(results, baseline, threshold):
+  """Returns the names of the cases of results whose commits/sec regressed by more than threshold from baseline."""
+  regressions = []
+  for name, result in sorted(results['cases'].items()):
+    base = baseline['cases'].get(name)
+    if not base or not base['commits_per_sec']:
+      continue
+    change = result['commits_per_sec'] / base['commits_per_sec'] - 1
+    regressed = change < -threshold
+    if regressed:
+      regressions.append(name)
+    print("{:<24} {:>12.1f} {:>12.1f} {:>+8.1%}{}".format(
+      name, base['commits_per_sec'], result['commits_per_sec'], change, '  REGRESSION' if regressed else ''))
+  return regressions
+
+
+def main():
+  arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arg_parser.add_argument('--repo', default=DEFAULT_REPO,
+                          help="Path of the synthetic repository, generated unless up to date. Default %(default)s")
+  arg_parser.add_argument('--case', action='append', help="Cases to run (by name). Default all")
+  arg_parser.add_argument('--repeat', type=int, default=3, help="Runs of each case, the fastest is reported.")
+  arg_parser.add_argument('--save-baseline', help="Save the results as a baseline to this JSON file.")
+  arg_parser.add_argument('--baseline', help="Compare the results to the baseline in this JSON file.")
+  arg_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                          help="Regression of commits/sec (ratio) that fails the comparison. Default %(default)s")
+  synthetic_repo.add_arguments(arg_parser)
+  args = arg_parser.parse_args()
+
+  params = synthetic_repo.repo_params(args)
+  if synthetic_repo.SyntheticRepo(**params).generate(args.repo):
+    print("Generated {}".format(args.repo), file=sys.stderr)
+
+  results = {'repo': params, 'python': platform.python_version(), 'cases': {}}
+  print("{:<24} {:>8} {:>12} {:>9}  {}".format('case', 'commits', 'commits/sec', 'RSS MiB', 'stages (s)'))
+  for name, cli_args in cases():
+    if args.case and name not in args.case:
+      continue
+    result = results['cases'][name] = run(args.repo, cli_args, args.repeat)
+    stages = ' '.join('{}={:.2f}'.format(stage, result['stages'][stage])
+                      for stage in STAGES if stage in result['stages'])
+    print("{:<24} {:>8} {:>12.1f} {:>9.1f}  {}".format(
+      name, result['commits'], result['commits_per_sec'], result['peak_rss'] / 1048576.0, stages))
+
+  if args.save_baseline:
+    with open(args.save_baseline, 'w') as f:
+      json.dump(results, f, indent=2, sort_keys=True)
+      f.write("\n")
+
+  if args.baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+    if baseline['repo'] != params:
+      print("WARNING: The baseline was run on a different repository: {}".format(baseline['repo']), file=sys.stderr)
+    print()
+    print("{:<24} {:>12} {:>12} {:>8}".format('case', 'baseline', 'commits/sec', 'change'))
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+      print("{} case(s) regressed by more than {:.0%}: {}".format(
+        len(regressions), args.threshold, ', '.join(regressions)), file=sys.stderr)
+      sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
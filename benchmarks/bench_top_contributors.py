@@ -0,0 +1,106 @@
+"""Memory benchmark of ranking the top contributors of buckets from every contributor, or with summaries.
+
+Synthetic commit records (see bench_analyzer), by authors whose number of commits follows a power
+law, are aggregated into the top contributors metrics of every default precision, once from the
+contributors of each bucket (as when contributor lists are output too) and once with HeavyHitters
+summaries. Each run is in a fresh interpreter, whose peak RSS growth while aggregating is reported,
+along with its speed, and how the summarized top contributors compare with the exact ones: the
+share of them that are found, and the worst relative error of their values.
+
+Usage:
+  python benchmarks/bench_top_contributors.py [--commits N] [--authors N] [--top K]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import codewerdz.git.metrics  # noqa: E402
+from bench_analyzer import synthetic_commits  # noqa: E402
+from codewerdz.git.metrics.commit_analyzer import CommitAnalyzer  # noqa: E402
+
+
+def skewed_commits(count, authors):
+  """Returns synthetic commits whose n-th author has about 1 / n of the commits of the first one."""
+  commits = synthetic_commits(count, authors)
+  for n, commit in enumerate(commits):
+    # the uniform author ids are mapped onto a power law
+    author = int(authors ** (int(commit['email'][len('author'):-len('@example.com')]) / float(authors))) - 1
+    commit['author'] = 'Author {}'.format(author)
+    commit['email'] = 'author{}@example.com'.format(author)
+  return commits
+
+
+def run(commits, authors, top, exact):
+  """Returns the peak RSS growth (KiB), commits/sec and top contributors of aggregating the commits."""
+  records = skewed_commits(commits, authors)
+  analyzer = CommitAnalyzer(top_contributors=top)
+  metric_names = list(codewerdz.git.metrics.TOP_CONTRIBUTOR_METRICS)
+  if exact:
+    # (a contributor list needs every contributor, so the top ones are ranked from them)
+    metric_names.append('contributor_code_list')
+  before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+  start = time.time()
+  accumulators = analyzer.aggregate_commits(records, codewerdz.git.metrics.DEFAULT_PRECISION, metric_names)
+  rate = commits / max(time.time() - start, 1e-9)
+
+  growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+  metrics = analyzer.finalize_metrics(accumulators, codewerdz.git.metrics.TOP_CONTRIBUTOR_METRICS)
+  return {'memory': growth, 'rate': rate, 'metrics': metrics}
+
+
+def compare(metrics, exact):
+  """Returns the share of the exact top contributors in metrics, and the worst relative error of their values."""
+  found = 0
+  total = 0
+  errors = [0.0]
+  for precision, buckets in exact.items():
+    for key, bucket in ([('', buckets)] if precision == 'total' else buckets.items()):
+      summarized = metrics[precision] if precision == 'total' else metrics[precision][key]
+      for name, top in bucket.items():
+        values = dict(summarized[name])
+        total += len(top)
+        for contributor, value in top:
+          if contributor in values:
+            found += 1
+            errors.append(abs(values[contributor] - value) / float(value))
+  return found / float(max(total, 1)), max(errors)
+
+
+def main():
+  arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arg_parser.add_argument('--commits', type=int, default=200000, help="Number of commits. Default %(default)s")
+  arg_parser.add_argument('--authors', type=int, default=5000, help="Number of authors. Default %(default)s")
+  arg_parser.add_argument('--top', type=int, default=10, help="Number of top contributors. Default %(default)s")
+  arg_parser.add_argument('--child', choices=['exact', 'summaries'], default=None, help=argparse.SUPPRESS)
+  args = arg_parser.parse_args()
+
+  if args.child is not None:
+    print(json.dumps(run(args.commits, args.authors, args.top, args.child == 'exact')))
+    return
+
+  print("{} commits by {} authors, top {}, precisions: {}".format(
+    args.commits, args.authors, args.top, ', '.join(sorted(codewerdz.git.metrics.DEFAULT_PRECISION))))
+  print("{:<12} {:>14} {:>12} {:>12} {:>12}".format('ranked from', 'peak RSS +MiB', 'commits/sec', 'found', 'worst error'))
+  exact = None
+  for mode in ('exact', 'summaries'):
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--commits', str(args.commits),
+                                      '--authors', str(args.authors), '--top', str(args.top), '--child', mode])
+    result = json.loads(output.decode('utf-8'))
+    if exact is None:
+      exact = result['metrics']
+    found, error = compare(result['metrics'], exact)
+    print("{:<12} {:>14.1f} {:>12.0f} {:>12.2%} {:>12.2%}".format(
+      mode, result['memory'] / 1024.0, result['rate'], found, error))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,237 @@
+"""Generates a synthetic git repository, deterministically, with `git fast-import`.
+
+The same options (and seed) always produce the same history, down to the commit ids, so the
+benchmarks of different trees (or of a baseline) run on the same commits. The history mixes
+doc and code files, with heavy tailed diff sizes, renames, binary files and a few huge commits
+(e.g. vendored code), in the proportions given.
+
+Usage:
+  python benchmarks/synthetic_repo.py PATH [--commits N] [--files N] [--diff-size N] [--docs-ratio R]
+                                           [--renames R] [--binary R] [--huge-commits R] [--seed N]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+
+# the parameters of a synthetic repository, and their defaults
+DEFAULTS = {
+  'commits': 5000,
+  'files': 300,
+  'diff_size': 20,
+  'docs_ratio': 0.3,
+  'renames': 0.02,
+  'binary': 0.02,
+  'huge_commits': 0.001,
+  'seed': 0
+}
+
+# the parameters of a repository are stored in it, so that it's only generated once
+PARAMS_FILE = 'codewerdz-bench.json'
+
+AUTHORS = 40
+START_TIMESTAMP = 1262304000
+
+DOCS_EXTENSIONS = ['md', 'rst', 'txt']
+CODE_EXTENSIONS = ['py', 'js', 'c', 'go', 'java']
+COMMENTS = {'py': '#', 'js': '//', 'c': '//', 'go': '//', 'java': '//'}
+WORDS = ['the', 'parser', 'returns', 'a', 'commit', 'with', 'its', 'stats', 'of', 'docs', 'and', 'code', 'value',
+         'self', 'count', 'index', 'result', 'None', 'if', 'for', 'in', 'return', '(', ')', '=', '+', '1', '0']
+# the lines of the files are drawn from a pool of distinct lines, as generating each one is slow
+LINE_POOL_SIZE = 4096
+# binary files start with the PNG signature (which has a NUL byte, so that git sees them as binary)
+BINARY_HEADER = b'\x89PNG\r\n\x1a\n\x00'
+BINARY_POOL_SIZE = 65536
+
+
+class SyntheticRepo(object):
+  """The history of a synthetic repository, written as a `git fast-import` stream.
+
+  Usage:
+    SyntheticRepo(commits=1000, seed=1).generate('/tmp/repo')
+  """
+
+  def __init__(self, **params):
+    """
+    Args:
+        commits: The number of commits.
+        files: The number of files in the initial commit.
+        diff_size: The median number of lines changed in a file diff (their sizes are heavy tailed).
+        docs_ratio: The ratio of doc files (the rest are code files, with some comments).
+        renames: The probability of a commit renaming a file.
+        binary: The probability of a commit adding or changing a binary file.
+        huge_commits: The probability of a commit being huge (adding a hundred large files).
+        seed: The seed of the history.
+    """
+    unknown = set(params) - set(DEFAULTS)
+    if unknown:
+      raise ValueError("Unknown parameters: {}".format(', '.join(sorted(unknown))))
+    self.params = dict(DEFAULTS, **params)
+    self.rng = random.Random(self.params['seed'])
+    self.lines = [self._words(8) for _ in range(LINE_POOL_SIZE)]
+    self.comments = [self._words(6) for _ in range(LINE_POOL_SIZE // 4)]
+    self.binary = bytes(bytearray(self.rng.randint(0, 255) for _ in range(BINARY_POOL_SIZE)))
+    # the lines of each text file, and the size of each binary file, by path
+    self.files = {}
+    self.binary_files = {}
+    self.created = 0
+
+  def generate(self, path):
+    """Generates the repository at path, unless it was already generated with the same parameters.
+
+    Returns whether the repository was generated."""
+    params_path = os.path.join(path, '.git', PARAMS_FILE)
+    if os.path.exists(params_path):
+      with open(params_path) as f:
+        if json.load(f) == self.params:
+          return False
+    if os.path.exists(path):
+      shutil.rmtree(path)
+
+    os.makedirs(path)
+    subprocess.check_call(['git', 'init', '-q'], cwd=path)
+    process = subprocess.Popen(['git', 'fast-import', '--quiet'], stdin=subprocess.PIPE, cwd=path)
+    try:
+      for chunk in self.stream():
+        process.stdin.write(chunk)
+    finally:
+      process.stdin.close()
+    if process.wait() != 0:
+      raise subprocess.CalledProcessError(process.returncode, 'git fast-import')
+    subprocess.check_call(['git', 'checkout', '-q', '-f', 'master'], cwd=path)
+
+    with open(params_path, 'w') as f:
+      json.dump(self.params, f, sort_keys=True)
+    return True
+
+  def stream(self):
+    """Yields the chunks (bytes) of the fast-import stream of the history."""
+    timestamp = START_TIMESTAMP
+    for n in range(self.params['commits']):
+      # a commit every ~4 hours on average, by a few prolific authors and many occasional ones
+      timestamp += self.rng.randint(60, 8 * 3600)
+      author = int(self.rng.paretovariate(1.2)) % AUTHORS
+      ident = 'Author {0} <author{0}@example.com> {1} +0000'.format(author, timestamp)
+
+      if n == 0:
+        commands = [self._create_file() for _ in range(self.params['files'])]
+      elif self.rng.random() < self.params['huge_commits']:
+        commands = [self._create_file(lines=self.rng.randint(500, 2000)) for _ in range(100)]
+      else:
+        commands = self._change()
+
+      message = 'Commit {}\n\n{}\n'.format(n, self._words(12))
+      header = 'commit refs/heads/master\nmark :{}\nauthor {}\ncommitter {}\n'.format(n + 1, ident, ident)
+      yield header.encode('ascii') + _data(message.encode('ascii'))
+      if n:
+        yield 'from :{}\n'.format(n).encode('ascii')
+      for command in commands:
+        yield command
+      yield b'\n'
+
+  def _change(self):
+    # the commands of an ordinary commit: changes to a few files, sometimes a rename or a binary file
+    commands = []
+    if self.rng.random() < self.params['renames'] and self.files:
+      old_path = self.rng.choice(sorted(self.files))
+      new_path = self._new_path(old_path.rsplit('.', 1)[1])
+      self.files[new_path] = self.files.pop(old_path)
+      commands.append('R {} {}\n'.format(old_path, new_path).encode('ascii'))
+    if self.rng.random() < self.params['binary']:
+      if self.binary_files and self.rng.random() < 0.5:
+        path = self.rng.choice(sorted(self.binary_files))
+      else:
+        path = self._new_path('png')
+      start = self.rng.randint(0, BINARY_POOL_SIZE // 2)
+      content = BINARY_HEADER + self.binary[start:start + self.rng.randint(100, BINARY_POOL_SIZE // 2)]
+      self.binary_files[path] = len(content)
+      commands.append(_modify(path, content))
+
+    paths = sorted(self.files)
+    for path in self.rng.sample(paths, min(len(paths), int(self.rng.paretovariate(1.5)))):
+      commands.append(self._change_file(path))
+    if self.rng.random() < 0.05:
+      commands.append(self._create_file())
+    return commands
+
+  def _create_file(self, lines=None):
+    is_docs = self.rng.random() < self.params['docs_ratio']
+    path = self._new_path(self.rng.choice(DOCS_EXTENSIONS if is_docs else CODE_EXTENSIONS))
+    self.files[path] = [self._line(path) for _ in range(lines or self.rng.randint(5, 200))]
+    return _modify(path, self._content(path))
+
+  def _change_file(self, path):
+    # replaces, inserts and removes ~diff_size lines (heavy tailed), at a random position
+    lines = self.files[path]
+    size = max(1, int(self.params['diff_size'] * (self.rng.paretovariate(2.0) - 0.5)))
+    start = self.rng.randint(0, len(lines))
+    removed = self.rng.randint(0, min(size, len(lines) - start))
+    lines[start:start + removed] = [self._line(path) for _ in range(size - removed // 2)]
+    return _modify(path, self._content(path))
+
+  def _new_path(self, extension):
+    self.created += 1
+    directory = 'docs' if extension in DOCS_EXTENSIONS else 'src/module{}'.format(self.created % 17)
+    return '{}/file{}.{}'.format(directory, self.created, extension)
+
+  def _line(self, path):
+    extension = path.rsplit('.', 1)[1]
+    if extension in COMMENTS and self.rng.random() < 0.2:
+      return '{} {}'.format(COMMENTS[extension], self.rng.choice(self.comments))
+    return self.rng.choice(self.lines)
+
+  def _words(self, count):
+    return ' '.join(self.rng.choice(WORDS) for _ in range(count))
+
+  def _content(self, path):
+    return ''.join(line + '\n' for line in self.files[path]).encode('ascii')
+
+
+def _data(content):
+  return 'data {}\n'.format(len(content)).encode('ascii') + content + b'\n'
+
+
+def _modify(path, content):
+  return 'M 100644 inline {}\n'.format(path).encode('ascii') + _data(content)
+
+
+def add_arguments(arg_parser):
+  """Adds the parameters of a synthetic repository (see SyntheticRepo) to arg_parser."""
+  arg_parser.add_argument('--commits', type=int, default=DEFAULTS['commits'], help="Number of commits.")
+  arg_parser.add_argument('--files', type=int, default=DEFAULTS['files'], help="Number of files in the initial commit.")
+  arg_parser.add_argument('--diff-size', type=int, default=DEFAULTS['diff_size'],
+                          help="Median number of lines changed in a file diff.")
+  arg_parser.add_argument('--docs-ratio', type=float, default=DEFAULTS['docs_ratio'], help="Ratio of doc files.")
+  arg_parser.add_argument('--renames', type=float, default=DEFAULTS['renames'],
+                          help="Probability of a commit renaming a file.")
+  arg_parser.add_argument('--binary', type=float, default=DEFAULTS['binary'],
+                          help="Probability of a commit changing a binary file.")
+  arg_parser.add_argument('--huge-commits', type=float, default=DEFAULTS['huge_commits'],
+                          help="Probability of a commit adding a hundred large files.")
+  arg_parser.add_argument('--seed', type=int, default=DEFAULTS['seed'], help="Seed of the history.")
+
+
+def repo_params(args):
+  """Returns the parameters of a synthetic repository, from the arguments of add_arguments."""
+  return dict((name, getattr(args, name)) for name in DEFAULTS)
+
+
+def main():
+  arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  arg_parser.add_argument('path', help="Path of the repository (replaced, unless generated with the same parameters).")
+  add_arguments(arg_parser)
+  args = arg_parser.parse_args()
+
+  if SyntheticRepo(**repo_params(args)).generate(args.path):
+    print("Generated {}".format(args.path), file=sys.stderr)
+  else:
+    print("{} is up to date".format(args.path), file=sys.stderr)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,138 @@
+"""The Python API of codewerdz-git: the commits and metrics of a repo, without going through the CLI.
+
+Importing this module is cheap: the modules that run git, parse diffs and compute metrics are
+imported by the first call that needs them, so short-lived callers only pay for what they use.
+
+Usage:
+  from codewerdz.git import api
+
+  for commit in api.iter_commits('path/to/repo', since='2017-01-01', diff_lines=False):
+    print(commit['sha'], sum(diff['stats']['chars_of_docs'] for diff in commit['diffs']))
+
+  metrics = api.compute_metrics('path/to/repo', precisions=['total', 'monthly'], metrics=['commit_count'])
+  metrics['total']['commit_count']
+
+  url = api.repo_url('path/to/repo')  # read from its .git/config, e.g. 'git@github.com:codewerdz/codewerdz-git.git'
+  api.repo_name(url)  # e.g. 'codewerdz/codewerdz-git.git'
+
+Options (of both iter_commits and compute_metrics, defaulting to the CLI's):
+  docs_pattern: Glob patterns matching doc files.
+  comments_are_docs: Whether comments in code are docs.
+  exclude_path: Glob patterns of the paths to leave out.
+  since, until: The dates (in any format git understands) of the first and last commits.
+  limit: The maximum number of commits.
+  jobs, job_mode, job_chunk_size: How many worker processes parse the log, and how (see the CLI's --jobs).
+  cache: Whether to cache the stats of each commit in .git (see CommitStatsCache).
+  diff_parser, max_diff_bytes, max_diff_lines, skip_generated: How diffs are parsed (see GitLogParser).
+"""
+import os
+
+import codewerdz.git
+
+from codewerdz.git.repo_config import repo_name, repo_url
+
+# the options named differently in the CLI's options (see cli)
+_RENAMED_OPTIONS = {
+  'since': 'date_range_start',
+  'until': 'date_range_end',
+  'limit': 'commits_limit'
+}
+
+
+def iter_commits(repo=None, diff_lines=True, **options):
+  """Returns an iterator of the parsed commits of a repo, newest first (like the log command outputs them).
+
+  Args:
+      repo: The path of the repo. Default None (the current directory's)
+      diff_lines: Whether each diff holds its patch, in diff_lines. Default True
+      options: See the module's documentation.
+  """
+  from codewerdz.git.log.commits import iterate_commits
+
+  options = _options(options)
+  return iterate_commits(
+    options['docs_pattern'],
+    options['comments_are_docs'],
+    options['date_range_start'],
+    options['date_range_end'],
+    options['commits_limit'],
+    options['exclude_path'],
+    options['jobs'],
+    options['cache'],
+    diff_parser=options['diff_parser'],
+    diff_lines=diff_lines,
+    max_diff_bytes=options['max_diff_bytes'],
+    max_diff_lines=options['max_diff_lines'],
+    skip_generated=options['skip_generated'],
+    job_mode=options['job_mode'],
+    job_chunk_size=options['job_chunk_size'],
+    repo=repo
+  )
+
+
+def compute_metrics(repo=None, precisions=None, metrics=None, analyzer='streaming', timezone='committer',
+                    incremental=None, contributor_error=None, top_contributors=None, **options):
+  """Returns the metrics of a repo, i.e. the metrics the metrics command outputs for it.
+
+  Args:
+      repo: The path of the repo. Default None (the current directory's)
+      precisions: The precisions to compute. Default None (the metrics command's default precisions)
+      metrics: The metrics to compute. Default None (every metric)
+      analyzer: How commits are aggregated, streaming or columnar. Default streaming
+      timezone: The timezone commits are bucketed in, see TimeBuckets. Default committer
+      incremental: The path of the analysis state to resume from and save (relative to the repo).
+        Default None
+      contributor_error: The standard error of approximate contributor counts (see the metrics
+        command's --approximate-contributors). Default None (exact counts)
+      top_contributors: The number of contributors output by the top_contributors_by_* metrics
+        (see the metrics command's --top-contributors). Default None (10)
+      options: See the module's documentation.
+
+  Raises:
+      ValueError: If incremental is combined with a limit.
+  """
+  import codewerdz.git.metrics
+  from codewerdz.git.metrics.analysis import analyze
+
+  options = _options(options)
+  options['contributor_error'] = contributor_error
+  options['top_contributors'] = top_contributors
+  if precisions is None:
+    precisions = codewerdz.git.metrics.DEFAULT_PRECISION
+  if metrics is None:
+    metrics = codewerdz.git.metrics.DEFAULT_METRICS
+
+  if incremental and repo is not None:
+    incremental = os.path.join(repo, incremental)
+
+  results, _ = analyze(options, analyzer, timezone, precisions, metrics, incremental, repo=repo)
+  return results
+
+
+def _options(options):
+  """Returns the CLI's options (see cli) with the given ones, by their API names."""
+  from codewerdz.git.log.commits import JOB_MODE_SHARDS
+  from codewerdz.git.log.git_log_parser import GitLogParser
+
+  defaults = {
+    'docs_pattern': codewerdz.git.DEFAULT_DOCS_PATTERNS,
+    'comments_are_docs': False,
+    'exclude_path': (),
+    'date_range_start': None,
+    'date_range_end': None,
+    'commits_limit': None,
+    'jobs': 1,
+    'job_mode': JOB_MODE_SHARDS,
+    'job_chunk_size': GitLogParser.POOL_CHUNK_SIZE,
+    'cache': False,
+    'diff_parser': GitLogParser.DIFF_PARSER_STREAMING,
+    'max_diff_bytes': GitLogParser.MAX_DIFF_BYTES,
+    'max_diff_lines': GitLogParser.MAX_DIFF_LINES,
+    'skip_generated': False
+  }
+  for name, value in options.items():
+    if name in _RENAMED_OPTIONS.values() or _RENAMED_OPTIONS.get(name, name) not in defaults:
+      raise TypeError("Unknown option: {}".format(name))
+    defaults[_RENAMED_OPTIONS.get(name, name)] = value
+  return defaults
+
@@ -0,0 +1,60 @@
+import time
+
+from codewerdz.git.profiler import Profiler
+
+
+class BufferedWriter(object):
+  """Buffers writes to a file, and flushes them once enough output or time has built up.
+
+  Encoders like JSONEncoder.iterencode produce many tiny chunks, and writing (and flushing)
+  each of them costs a syscall. Chunks are instead joined and written at once when the buffer
+  holds flush_size bytes, or when a write comes flush_interval seconds after the last flush,
+  so that a slow producer still reaches the reader of a pipe in time.
+
+  Usage:
+    with BufferedWriter(sys.stdout) as writer:
+      writer.write('...')
+  """
+
+  DEFAULT_FLUSH_SIZE = 64 * 1024
+  DEFAULT_FLUSH_INTERVAL = 1.0
+
+  def __init__(self, f, flush_size=DEFAULT_FLUSH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+    """
+    Args:
+        f: The file to write to.
+        flush_size: The number of buffered bytes that triggers a flush. Default 64KiB
+        flush_interval: The seconds after which a write triggers a flush, None to only flush by size. Default 1.0
+    """
+    self.f = f
+    self.flush_size = flush_size
+    self.flush_interval = flush_interval
+    self.chunks = []
+    self.size = 0
+    self.last_flush = time.time()
+
+  def write(self, data):
+    self.chunks.append(data)
+    self.size += len(data)
+    if self.size >= self.flush_size or (
+        self.flush_interval is not None and time.time() - self.last_flush >= self.flush_interval):
+      self.flush()
+
+  def flush(self):
+    """Writes the buffered chunks to the file, and flushes it."""
+    if self.chunks:
+      self.f.write(''.join(self.chunks))
+      profiler = Profiler.current()
+      if profiler is not None:
+        profiler.count('output', size=self.size)
+      self.chunks = []
+      self.size = 0
+    self.f.flush()
+    self.last_flush = time.time()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    # NOTE: the file is flushed, not closed (it's usually stdout)
+    self.flush()
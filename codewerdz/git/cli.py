@@ -1,15 +1,43 @@
-import urlparse
+import importlib
+
 import codewerdz
 import codewerdz.git
 
-from codewerdz.git.process.git_process import GitProcess
-from codewerdz.git.log.log_command import log as log_cli_command
-from codewerdz.git.metrics.metrics_command import metrics as metrics_cli_command
+from codewerdz.git.process.line_output_shell_process import LineOutputShellProcess
+from codewerdz.git.profiler import Profiler
+from codewerdz.git.log.commits import JOB_MODE_SHARDS, JOB_MODES
+from codewerdz.git.log.git_log_parser import GitLogParser
 
 import click
 
 
-@click.group(chain=True)
+class _LazyGroup(click.Group):
+  """A click Group importing the module of each subcommand only when it's used (or listed)."""
+
+  def __init__(self, *args, **kwargs):
+    # the "module:attribute" of each subcommand, by name
+    self.lazy_commands = kwargs.pop('lazy_commands', {})
+    super(_LazyGroup, self).__init__(*args, **kwargs)
+
+  def list_commands(self, ctx):
+    return sorted(set(super(_LazyGroup, self).list_commands(ctx)) | set(self.lazy_commands))
+
+  def get_command(self, ctx, name):
+    if name not in self.commands and name in self.lazy_commands:
+      module_name, attribute = self.lazy_commands[name].split(':')
+      self.add_command(getattr(importlib.import_module(module_name), attribute), name)
+    return super(_LazyGroup, self).get_command(ctx, name)
+
+
+# Subcommands of the CLI interpretter, imported when they're invoked
+SUBCOMMANDS = {
+  'log': 'codewerdz.git.log.log_command:log',
+  'metrics': 'codewerdz.git.metrics.metrics_command:metrics',
+  'serve': 'codewerdz.git.serve.serve_command:serve'
+}
+
+
+@click.group(chain=True, cls=_LazyGroup, lazy_commands=SUBCOMMANDS)
 @click.option('--verbose', is_flag=True, help="Will print verbose messages.")
 @click.option('-q', '--quiet', is_flag=True, help="Will not print any log messages.")
 @click.version_option(codewerdz.git.__version__)
@@ -21,8 +49,18 @@ import click
 @click.option('--exclude-path', help="A glob pattern to exclude.", multiple=True, default=[])
 @click.option('--docs-pattern', help="A glob pattern to match doc files.", multiple=True, default=codewerdz.git.DEFAULT_DOCS_PATTERNS)
 @click.option('--comments-are-docs', is_flag=True, help="Consider comments in code to be docs.")
+@click.option('-j', '--jobs', help="Number of worker processes to shard the git log across.", default=1, type=click.IntRange(1))
+@click.option('--job-mode', help="How --jobs split the work: each job runs git log over a range of the commits (shards), or a single git log's commits are parsed by the jobs (diffs).", default=JOB_MODE_SHARDS, type=click.Choice(JOB_MODES))
+@click.option('--job-chunk-size', help="Commits sent to a job at once with --job-mode diffs.", default=GitLogParser.POOL_CHUNK_SIZE, type=click.IntRange(1))
+@click.option('--cache', is_flag=True, help="Cache the diff stats of each commit in .git, so later metrics runs only parse new commits.")
+@click.option('--diff-parser', help="Engine used to derive stats from diffs.", default=GitLogParser.DIFF_PARSER_STREAMING, type=click.Choice(GitLogParser.DIFF_PARSERS))
+@click.option('--max-diff-bytes', help="Bytes of a file diff past which its patch isn't kept (nor parsed), its stats are counted as it streams in instead. 0 for no limit.", default=GitLogParser.MAX_DIFF_BYTES, type=click.IntRange(0))
+@click.option('--max-diff-lines', help="Lines of a file diff past which its patch isn't kept (nor parsed). 0 for no limit.", default=GitLogParser.MAX_DIFF_LINES, type=click.IntRange(0))
+@click.option('--skip-generated', is_flag=True, help="Leave out the files marked linguist-generated or -diff (binary) in .gitattributes.")
+@click.option('--git-reader', help="How git's output is read: in large chunks on a background thread, or line by line.", default=LineOutputShellProcess.READER_THREADED, type=click.Choice(LineOutputShellProcess.READERS))
+@click.option('--profile', 'profile_path', help="Time each stage of the run (git, parsing, diffs, analysis, output), and write a JSON report to this file (- for stderr).", type=click.Path(dir_okay=False, writable=True, allow_dash=True))
 @click.pass_context
-def cli(ctx, verbose, quiet, repo_name, repo_url, date_range_start, date_range_end, commits_limit, exclude_path, docs_pattern, comments_are_docs):
+def cli(ctx, verbose, quiet, repo_name, repo_url, date_range_start, date_range_end, commits_limit, exclude_path, docs_pattern, comments_are_docs, jobs, job_mode, job_chunk_size, cache, diff_parser, max_diff_bytes, max_diff_lines, skip_generated, git_reader, profile_path):
   """ codewerdz-git CLI main entry point."""
 
   if quiet:
@@ -32,12 +70,14 @@ def cli(ctx, verbose, quiet, repo_name, repo_url, date_range_start, date_range_e
   if verbose:
     codewerdz.LOGLEVEL = codewerdz.LOGLEVEL_DEBUG
 
-  # guess repo url and name if not provided explictly
-  if not repo_url:
-    repo_url = guess_repo_url()
-  if not repo_name:
-    repo_name = guess_repo_name(repo_url)
+  LineOutputShellProcess.reader = git_reader
+
+  # the report is written once the subcommands are done (or failed)
+  if profile_path:
+    Profiler.start()
+    ctx.call_on_close(lambda: Profiler.stop().dump(profile_path))
 
+  # NOTE: the repo url and name are guessed by the subcommands that need them, if not provided explictly
   # set global context to hold program options
   ctx.obj = {
     'repo_name': repo_name,
@@ -47,15 +87,25 @@ def cli(ctx, verbose, quiet, repo_name, repo_url, date_range_start, date_range_e
     'commits_limit': commits_limit,
     'exclude_path': exclude_path,
     'docs_pattern': docs_pattern,
-    'comments_are_docs': comments_are_docs
+    'comments_are_docs': comments_are_docs,
+    'jobs': jobs,
+    'job_mode': job_mode,
+    'job_chunk_size': job_chunk_size,
+    'cache': cache,
+    'diff_parser': diff_parser,
+    'max_diff_bytes': max_diff_bytes,
+    'max_diff_lines': max_diff_lines,
+    'skip_generated': skip_generated
   }
 
   # Print Options
   codewerdz.debug("Options:")
   codewerdz.debug("")
 
-  codewerdz.debug("Repo Name    : {}".format(repo_name))
-  codewerdz.debug("Repo URL     : {}".format(repo_url))
+  if repo_name:
+    codewerdz.debug("Repo Name    : {}".format(repo_name))
+  if repo_url:
+    codewerdz.debug("Repo URL     : {}".format(repo_url))
   if date_range_start:
     codewerdz.debug("Start Date   : {}".format(date_range_start))
   if date_range_end:
@@ -68,18 +118,15 @@ def cli(ctx, verbose, quiet, repo_name, repo_url, date_range_start, date_range_e
 
   codewerdz.debug("Docs Pattern : {}".format(', '.join(sorted(docs_pattern))))
   codewerdz.debug("Doc Comments : {}".format(comments_are_docs))
+  codewerdz.debug("Jobs         : {}".format(jobs))
+  if jobs > 1:
+    codewerdz.debug("Job Mode     : {}".format(job_mode))
+  codewerdz.debug("Cache        : {}".format(cache))
+  codewerdz.debug("Diff Parser  : {}".format(diff_parser))
+  codewerdz.debug("Max Diff     : {} bytes, {} lines".format(max_diff_bytes or 'no limit', max_diff_lines or 'no limit'))
+  if skip_generated:
+    codewerdz.debug("Generated    : skipped")
+  codewerdz.debug("Git Reader   : {}".format(git_reader))
+  if profile_path:
+    codewerdz.debug("Profile      : {}".format(profile_path))
 
-
-def guess_repo_url():
-  """Attempts to guess the repo url by extracting the URL from the origin remote"""
-  git_process = GitProcess()
-  return list(git_process.get_lines("ls-remote", ["--get-url", "origin"]))[0]
-
-
-def guess_repo_name(git_url):
-  """Attempts to guess the repo url by extracting the URL from the origin remote"""
-  return urlparse.urlparse(git_url).path[1:].split(':')[-1]
-
-# Add subcommands to the CLI interpretter
-cli.add_command(log_cli_command)
-cli.add_command(metrics_cli_command)
@@ -0,0 +1,95 @@
+import itertools
+
+import codewerdz
+from codewerdz.git.log.git_log_parser import GitLogParser
+from codewerdz.git.log.git_log_process import GitLogProcess
+from codewerdz.git.log.git_rev_list_process import GitRevListProcess
+from codewerdz.git.log.sharded_git_log import ShardedGitLog
+
+
+class CachedGitLog(object):
+  """Iterates commits, only asking git for the patches of commits missing from a CommitStatsCache.
+
+  The commits to visit are listed with `git rev-list`. Commits without cached stats are run
+  through GitLogProcess + the given GitLogParser (sharded across worker processes when jobs > 1) and
+  their stats are stored in the cache. The commit metadata is then read with a `git log` that
+  doesn't generate patches, and each commit's stats and diffs are filled in from the cache.
+
+  NOTE: Commits yielded by this class have no 'diff_lines' in their diffs, since the patch text
+  isn't cached.
+  """
+
+  # number of commits written to / read from the cache at a time
+  BATCH_SIZE = 1000
+
+  def __init__(self, cache, parser=None, since=None, until=None, limit=None, excluded_paths=None, jobs=1,
+               revisions=None, repo=None):
+    self.cache = cache
+    self.parser = parser or GitLogParser()
+    self.since = since
+    self.until = until
+    self.limit = limit
+    self.excluded_paths = excluded_paths
+    self.jobs = jobs
+    self.revisions = revisions
+    self.repo = repo
+
+  def iterate_commits(self):
+    """Returns an iterator of commit hashes, as produced by GitLogParser.parse."""
+    rev_list = GitRevListProcess(since=self.since, until=self.until, limit=self.limit,
+                                 excluded_paths=self.excluded_paths, revisions=self.revisions, repo=self.repo)
+    shas = list(rev_list.get_lines())
+    self.update(shas)
+    return self._iterate_cached(shas)
+
+  def update(self, shas):
+    """Parses the commits (by full SHA) that are missing from the cache and stores their stats."""
+    cached_shas = self.cache.cached_shas()
+    missing = [sha for sha in shas if sha not in cached_shas]
+    codewerdz.debug("Cached       : {} of {} commits".format(len(shas) - len(missing), len(shas)))
+    if not missing:
+      return
+
+    if self.jobs > 1:
+      sharded_log = ShardedGitLog(self.jobs, self.parser, excluded_paths=self.excluded_paths, repo=self.repo)
+      commits = sharded_log.iterate_shards(sharded_log.split(missing))
+    else:
+      log = GitLogProcess(excluded_paths=self.excluded_paths, commits=missing, repo=self.repo)
+      commits = self.parser.parse(log.get_lines())
+
+    batch = []
+    for sha, commit in _zip_commits(missing, commits):
+      batch.append((sha, commit))
+      if len(batch) >= self.BATCH_SIZE:
+        self.cache.put_many(batch)
+        batch = []
+    if batch:
+      self.cache.put_many(batch)
+
+  def _iterate_cached(self, shas):
+    log = GitLogProcess(since=self.since, until=self.until, limit=self.limit,
+                        excluded_paths=self.excluded_paths, patches=False, revisions=self.revisions, repo=self.repo)
+    commits = _zip_commits(shas, GitLogParser().parse(log.get_lines()))
+
+    while True:
+      batch = list(itertools.islice(commits, self.BATCH_SIZE))
+      if not batch:
+        return
+      entries = self.cache.get_many([sha for sha, _ in batch])
+      for sha, commit in batch:
+        entry = entries[sha]
+        commit['stats'] = entry['stats']
+        commit['diffs'] = entry['diffs']
+        yield commit
+
+
+def _zip_commits(shas, commits):
+  """Pairs full SHAs with the commit hashes (which have abbreviated SHAs) git log output for them."""
+  commits = iter(commits)
+  for sha in shas:
+    commit = next(commits, None)
+    if commit is None or not sha.startswith(commit['sha']):
+      raise RuntimeError("git log did not output the expected commit {}".format(sha))
+    yield sha, commit
+  if next(commits, None) is not None:
+    raise RuntimeError("git log output more commits than expected")
@@ -0,0 +1,78 @@
+import os
+import re
+
+# (language, file names/extensions, line prefixes, line suffixes) of the comments of each language.
+# A changed line is a comment if, stripped of whitespace, it starts with one of the prefixes or
+# ends with one of the suffixes.
+LANGUAGES = [
+  ('python', ['.py', '.pyw', '.pyi', '.pyx', 'SConstruct', 'SConscript'],
+   ['#', "'''", '"""'], ["'''", '"""']),
+  ('c', ['.c', '.h', '.cc', '.cpp', '.cxx', '.c++', '.hh', '.hpp', '.hxx', '.h++', '.ino', '.m', '.mm',
+         '.java', '.js', '.jsx', '.mjs', '.ts', '.tsx', '.go', '.cs', '.swift', '.kt', '.kts', '.scala',
+         '.rs', '.dart', '.groovy', '.gradle', '.proto', '.scss', '.less'],
+   ['//', '/*', '* ', '*/'], ['*/']),
+  ('css', ['.css'], ['/*', '* ', '*/'], ['*/']),
+  ('php', ['.php'], ['#', '//', '/*', '* ', '*/'], ['*/']),
+  ('hash', ['.sh', '.bash', '.zsh', '.rb', '.pl', '.pm', '.r', '.yml', '.yaml', '.toml', '.cfg', '.conf',
+            '.mk', '.cmake', '.tf', '.ps1', 'Makefile', 'GNUmakefile', 'Dockerfile', 'CMakeLists.txt',
+            'Gemfile', 'Rakefile', '.gitignore', '.gitattributes'],
+   ['#'], []),
+  ('ini', ['.ini', '.properties'], [';', '#'], []),
+  ('dash', ['.sql', '.lua', '.hs', '.elm', '.ada'], ['--'], []),
+  ('lisp', ['.el', '.lisp', '.clj', '.cljs', '.scm', '.asm'], [';'], []),
+  ('percent', ['.erl', '.hrl', '.tex', '.sty'], ['%'], []),
+  ('markup', ['.html', '.htm', '.xml', '.xhtml', '.svg', '.vue', '.md', '.markdown'], ['<!--'], ['-->']),
+  ('vim', ['.vim', 'vimrc', '.vimrc'], ['"'], []),
+]
+
+# the rules for files of any other language, which is a mix of the most common comment styles
+GENERIC = ('generic', [], ["#", "//", "/*", "* ", "*/", "'''", '"""'], ["*/", "'''", '"""'])
+
+
+class CommentClassifier(object):
+  """Tells whether changed lines are comments, by the comment syntax of the file's language.
+
+  The rules of each language (see LANGUAGES) are compiled into a single regex. A diff
+  looks up the matcher of its file once (by file name, then extension) and then calls it
+  on the content of each changed line. Files of unknown languages use the GENERIC rules.
+
+  Usage:
+    is_comment = CommentClassifier().matcher('src/main.c')
+    is_comment(' // a comment')  # truthy
+    is_comment('#include <stdio.h>')  # falsy
+  """
+
+  def __init__(self, languages=LANGUAGES, generic=GENERIC):
+    # NOTE: the regexes are kept rather than their match methods, which can't be pickled
+    self.generic = _comment_regex(generic[2], generic[3])
+    self.regexes = {}
+    for _, names, prefixes, suffixes in languages:
+      regex = _comment_regex(prefixes, suffixes)
+      for name in names:
+        self.regexes[name.lower()] = regex
+
+  def matcher(self, filename):
+    """Returns a function of a line's content that is truthy if it's a comment in filename's language."""
+    name = os.path.basename(filename or '').lower()
+    regex = self.regexes.get(name)
+    if regex is None:
+      regex = self.regexes.get(os.path.splitext(name)[1], self.generic)
+    return regex.match
+
+
+def _comment_regex(prefixes, suffixes):
+  """Returns a regex that matches lines with one of the prefixes or suffixes, ignoring surrounding whitespace."""
+  alternatives = []
+  if prefixes:
+    alternatives.append(r'\s*(?:{})'.format('|'.join(_prefix_regex(prefix) for prefix in prefixes)))
+  if suffixes:
+    alternatives.append(r'.*(?:{})\s*\Z'.format('|'.join(re.escape(suffix) for suffix in suffixes)))
+  return re.compile('|'.join(alternatives) or r'(?!)', re.S)
+
+
+def _prefix_regex(prefix):
+  stripped = prefix.rstrip()
+  if stripped != prefix:
+    # the whitespace ending a prefix (e.g. '* ') only counts when it isn't trailing the line
+    return re.escape(prefix) + r'\s*\S'
+  return re.escape(prefix)
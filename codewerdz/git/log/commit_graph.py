@@ -0,0 +1,146 @@
+import binascii
+import mmap
+import os
+import struct
+
+GRAPH_SIGNATURE = b'CGPH'
+GRAPH_HASH_SHA1 = 1
+
+# the positions of parents that are none, or in the extra edges list
+GRAPH_PARENT_NONE = 0x70000000
+GRAPH_EXTRA_EDGES = 0x80000000
+GRAPH_LAST_EDGE = 0x80000000
+
+
+class CommitGraph(object):
+  """Reads the parents, root tree and commit date of commits from a repository's commit-graph.
+
+  Looking a commit up in the graph is much cheaper than inflating (and undeltifying) it from
+  the object store, and the graph holds everything a history walk needs. Both a single
+  objects/info/commit-graph file and a chain of split graphs (objects/info/commit-graphs) are
+  read; positions are global across a chain, from its base graph up.
+
+  Usage:
+    graph = CommitGraph.load('.git/objects')
+    if graph is not None:
+      position = graph.find(sha)
+      tree, parents, date = graph.commit(position)
+  """
+
+  def __init__(self, layers):
+    """
+    Args:
+        layers: The graph files (memory mapped), from the base of the chain up.
+    """
+    self.layers = []
+    base_count = 0
+    for data in layers:
+      layer = _layer(data, base_count)
+      self.layers.append(layer)
+      base_count += layer['count']
+
+  @staticmethod
+  def load(objects_dir):
+    """Returns the commit-graph of an object directory, None if it has none (or an unsupported one)."""
+    info_dir = os.path.join(objects_dir, 'info')
+    chain_path = os.path.join(info_dir, 'commit-graphs', 'commit-graph-chain')
+    if os.path.exists(chain_path):
+      with open(chain_path) as f:
+        paths = [os.path.join(info_dir, 'commit-graphs', 'graph-{}.graph'.format(line.strip()))
+                 for line in f if line.strip()]
+    elif os.path.exists(os.path.join(info_dir, 'commit-graph')):
+      paths = [os.path.join(info_dir, 'commit-graph')]
+    else:
+      return None
+
+    layers = []
+    for path in paths:
+      with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      if data[:4] != GRAPH_SIGNATURE or data[4:5] != b'\1' or ord(data[5:6]) != GRAPH_HASH_SHA1:
+        return None
+      layers.append(data)
+
+    try:
+      return CommitGraph(layers)
+    except KeyError:
+      # a required chunk is missing
+      return None
+
+  def find(self, sha):
+    """Returns the (global) position of a commit (hex id) in the graph, or None."""
+    sha_bin = binascii.unhexlify(sha)
+    first = ord(sha_bin[0:1])
+    for layer in self.layers:
+      data = layer['data']
+      fanout = layer['fanout']
+      low = struct.unpack('>I', data[fanout + (first - 1) * 4:fanout + first * 4])[0] if first else 0
+      high = struct.unpack('>I', data[fanout + first * 4:fanout + first * 4 + 4])[0]
+      names = layer['names']
+      while low < high:
+        middle = (low + high) // 2
+        name = data[names + middle * 20:names + middle * 20 + 20]
+        if name < sha_bin:
+          low = middle + 1
+        elif name > sha_bin:
+          high = middle
+        else:
+          return layer['base_count'] + middle
+    return None
+
+  def sha(self, position):
+    """Returns the (hex) id of the commit at a position."""
+    layer = self._layer(position)
+    offset = layer['names'] + (position - layer['base_count']) * 20
+    return binascii.hexlify(layer['data'][offset:offset + 20])
+
+  def commit(self, position):
+    """Returns the (tree, parents, date) of the commit at a position, with (hex) ids, and the date as a timestamp."""
+    layer = self._layer(position)
+    data = layer['data']
+    offset = layer['commits'] + (position - layer['base_count']) * 36
+    tree = binascii.hexlify(data[offset:offset + 20])
+    parent1, parent2, generation_date_high, date_low = struct.unpack('>IIII', data[offset + 20:offset + 36])
+
+    parents = []
+    if parent1 != GRAPH_PARENT_NONE:
+      parents.append(self.sha(parent1))
+    if parent2 & GRAPH_EXTRA_EDGES:
+      edge = layer['edges'] + (parent2 & ~GRAPH_EXTRA_EDGES) * 4
+      while True:
+        parent = struct.unpack('>I', data[edge:edge + 4])[0]
+        parents.append(self.sha(parent & ~GRAPH_LAST_EDGE))
+        if parent & GRAPH_LAST_EDGE:
+          break
+        edge += 4
+    elif parent2 != GRAPH_PARENT_NONE:
+      parents.append(self.sha(parent2))
+
+    return tree, parents, ((generation_date_high & 3) << 32) | date_low
+
+  def _layer(self, position):
+    for layer in reversed(self.layers):
+      if position >= layer['base_count']:
+        return layer
+    raise IndexError(position)
+
+
+def _layer(data, base_count):
+  """Returns the chunk offsets of a graph file, and its number of commits."""
+  chunk_count = ord(data[6:7])
+  chunks = {}
+  for i in range(chunk_count):
+    chunk_id, offset = struct.unpack('>4sQ', data[8 + i * 12:8 + i * 12 + 12])
+    chunks[chunk_id] = offset
+
+  fanout = chunks[b'OIDF']
+  return {
+    'data': data,
+    'base_count': base_count,
+    'count': struct.unpack('>I', data[fanout + 255 * 4:fanout + 256 * 4])[0],
+    'fanout': fanout,
+    'names': chunks[b'OIDL'],
+    'commits': chunks[b'CDAT'],
+    # NOTE: only graphs with octopus merges have an extra edges chunk
+    'edges': chunks.get(b'EDGE')
+  }
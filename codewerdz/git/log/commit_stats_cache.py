@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+from codewerdz.git.process.git_process import GitProcess
+
+
+class CommitStatsCache(object):
+  """An on-disk (sqlite3) store of each commit's diff stats.
+
+  Entries are keyed by the full commit SHA plus a fingerprint of the settings that affect how
+  diffs are classified, so changing e.g. --docs-pattern never returns stale stats. A cached
+  entry holds a commit's 'stats' (numstats) and 'diffs' (filename and stats of each file
+  diff, without 'diff_lines'), exactly as GitLogParser produced them.
+  """
+
+  # bump this whenever GitLogParser changes the stats it derives from a diff
+  VERSION = 2
+
+  FILENAME = 'codewerdz-cache.sqlite'
+
+  # sqlite limits the number of host parameters in a single statement
+  QUERY_BATCH_SIZE = 500
+
+  def __init__(self, path, fingerprint):
+    self.path = path
+    self.fingerprint = fingerprint
+    self.connection = sqlite3.connect(path)
+    self.connection.execute(
+      'CREATE TABLE IF NOT EXISTS commit_stats ('
+      ' sha TEXT NOT NULL,'
+      ' fingerprint TEXT NOT NULL,'
+      ' stats TEXT NOT NULL,'
+      ' PRIMARY KEY (sha, fingerprint))')
+    self.connection.commit()
+
+  @staticmethod
+  def default_path(repo=None):
+    """Returns the path of the cache inside the .git directory of the repo at path repo (default the current one's)."""
+    git_dir = list(GitProcess(repo).get_lines("rev-parse", ["--git-dir"]))[0]
+    return os.path.join(repo or '', git_dir, CommitStatsCache.FILENAME)
+
+  @staticmethod
+  def settings_fingerprint(docs_pattern, comments_are_docs, excluded_paths, attributes=None, skip_generated=False):
+    """Returns a digest of the settings that affect the stats GitLogParser derives for a commit."""
+    settings = [
+      CommitStatsCache.VERSION,
+      sorted(docs_pattern or []),
+      bool(comments_are_docs),
+      sorted(excluded_paths or []),
+      attributes.fingerprint() if attributes and attributes.rules else None
+    ]
+    if skip_generated:
+      # (only appended when set, so that the entries cached without it stay valid)
+      settings.append('skip_generated')
+    return hashlib.sha1(json.dumps(settings, sort_keys=True)).hexdigest()
+
+  def cached_shas(self):
+    """Returns the set of commit SHAs that have cached stats for this fingerprint."""
+    rows = self.connection.execute(
+      'SELECT sha FROM commit_stats WHERE fingerprint = ?', (self.fingerprint,))
+    return set(str(row[0]) for row in rows)
+
+  def get_many(self, shas):
+    """Returns a dict of {sha: {'stats': ..., 'diffs': ...}} for the given SHAs found in the cache."""
+    entries = {}
+    for i in range(0, len(shas), self.QUERY_BATCH_SIZE):
+      batch = shas[i:i + self.QUERY_BATCH_SIZE]
+      rows = self.connection.execute(
+        'SELECT sha, stats FROM commit_stats WHERE fingerprint = ? AND sha IN ({})'.format(
+          ', '.join('?' * len(batch))),
+        [self.fingerprint] + list(batch))
+      for sha, stats in rows:
+        entries[str(sha)] = json.loads(stats)
+    return entries
+
+  def put_many(self, commits):
+    """Stores the stats of the given (sha, commit hash) pairs."""
+    self.connection.executemany(
+      'INSERT OR REPLACE INTO commit_stats (sha, fingerprint, stats) VALUES (?, ?, ?)',
+      ((sha, self.fingerprint, json.dumps(self.entry(commit), separators=(',', ':')))
+       for sha, commit in commits))
+    self.connection.commit()
+
+  @staticmethod
+  def entry(commit):
+    """Returns the part of a commit hash that is cached."""
+    return {
+      'stats': commit['stats'],
+      'diffs': [{'filename': diff['filename'], 'stats': diff['stats']} for diff in commit['diffs']]
+    }
+
+  def close(self):
+    self.connection.close()
@@ -0,0 +1,69 @@
+from codewerdz.git.log.cached_git_log import CachedGitLog
+from codewerdz.git.log.commit_stats_cache import CommitStatsCache
+from codewerdz.git.log.git_attributes import GitAttributes
+from codewerdz.git.log.git_log_process import GitLogProcess
+from codewerdz.git.log.git_log_parser import GitLogParser
+from codewerdz.git.log.object_store_log import ObjectStoreLog
+from codewerdz.git.log.sharded_git_log import ShardedGitLog
+from codewerdz.git.profiler import profiled
+
+# with more than one job, each worker runs git log over a shard of the commits (see ShardedGitLog), or a
+# single git log is run and its commits are parsed by the workers (see GitLogParser.parse_in_pool)
+JOB_MODE_SHARDS = 'shards'
+JOB_MODE_DIFFS = 'diffs'
+JOB_MODES = [JOB_MODE_SHARDS, JOB_MODE_DIFFS]
+
+
+def iterate_commits(docs_pattern, comments_are_docs, date_range_start, date_range_end, commits_limit, exclude_path, jobs=1, cache=False,
+                    revisions=None, diff_parser=GitLogParser.DIFF_PARSER_STREAMING, diff_lines=True,
+                    max_diff_bytes=GitLogParser.MAX_DIFF_BYTES, max_diff_lines=GitLogParser.MAX_DIFF_LINES,
+                    skip_generated=False, job_mode=JOB_MODE_SHARDS, job_chunk_size=GitLogParser.POOL_CHUNK_SIZE, repo=None):
+  """Returns an iterator of the parsed commits (see GitLogParser.parse) of the git log of the repo at path repo
+  (default the current directory's)."""
+  attributes = GitAttributes.load(repo)
+  parser = GitLogParser(docs_pattern, comments_are_docs, diff_parser, diff_lines, attributes,
+                        max_diff_bytes, max_diff_lines, skip_generated)
+
+  if cache:
+    # Only parse the commits missing from the stats cache, NOTE: diffs won't include diff_lines
+    parser.diff_lines = False
+    stats_cache = CommitStatsCache(
+      CommitStatsCache.default_path(repo),
+      CommitStatsCache.settings_fingerprint(docs_pattern, comments_are_docs, exclude_path, attributes, skip_generated))
+    cached_log = CachedGitLog(stats_cache, parser, since=date_range_start,
+                              until=date_range_end, limit=commits_limit, excluded_paths=exclude_path, jobs=jobs,
+                              revisions=revisions, repo=repo)
+    return profiled('parse', cached_log.iterate_commits(), commits=True)
+
+  if jobs > 1 and job_mode == JOB_MODE_DIFFS:
+    # Iterate Git Log and Parse Commits in parallel worker processes
+    log = GitLogProcess(since=date_range_start, until=date_range_end, limit=commits_limit, excluded_paths=exclude_path,
+                        revisions=revisions, repo=repo)
+    return profiled('parse', parser.parse_in_pool(log.get_lines(), jobs, job_chunk_size), commits=True)
+
+  if jobs > 1:
+    # Shard the history and run Git Log and Parse Commits in parallel worker processes
+    sharded_log = ShardedGitLog(jobs, parser, since=date_range_start,
+                                until=date_range_end, limit=commits_limit, excluded_paths=exclude_path,
+                                revisions=revisions, repo=repo)
+    return profiled('parse', sharded_log.iterate_commits(), commits=True)
+
+  # Iterate Git Log and Parse Commits
+  log = GitLogProcess(since=date_range_start, until=date_range_end, limit=commits_limit, excluded_paths=exclude_path,
+                      revisions=revisions, repo=repo)
+  return profiled('parse', parser.parse(log.get_lines()), commits=True)
+
+
+def iterate_commit_metadata(date_range_start, date_range_end, commits_limit, exclude_path, revisions=None, repo=None):
+  """Returns an iterator of the commits that iterate_commits would, without their stats or diffs.
+
+  The commits are read from the object store when it can list them (see ObjectStoreLog), and
+  from `git log` without patches otherwise."""
+  object_store_log = ObjectStoreLog.open(since=date_range_start, until=date_range_end, limit=commits_limit,
+                                         excluded_paths=exclude_path, revisions=revisions, repo=repo)
+  if object_store_log is not None:
+    return profiled('object_store', object_store_log.iterate_commits(), commits=True)
+
+  log = GitLogProcess(since=date_range_start, until=date_range_end, limit=commits_limit, excluded_paths=exclude_path,
+                      patches=False, revisions=revisions, repo=repo)
+  return profiled('parse', GitLogParser(diff_lines=False).parse(log.get_lines()), commits=True)
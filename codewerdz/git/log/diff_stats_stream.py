@@ -0,0 +1,159 @@
+import re
+import sys
+
+# NOTE: these are the same expressions whatthepatch uses (see git_log_parser._whatthepatch for the header)
+DIFF_HEADER = re.compile('^diff --git "?a/(.+)"? "?b/(.+)"?$')
+HUNK_HEADER = re.compile('^@@ -(\d+),?(\d*) \+(\d+),?(\d*) @@(.*)$')
+
+
+class DiffStatsStream(object):
+  """Derives the stats of a single file diff from its lines, one line at a time.
+
+  This is a single pass replacement for joining a file's diff into a blob and running it
+  through whatthepatch.patch.parse_unified_diff and GitLogParser.analyze_changes. Each
+  added/removed line is classified as it is fed, and the patch text is only kept when
+  keep_diff_lines is set. The stats are identical to the whatthepatch path, including its
+  quirks (a hunk's line counts bound the lines taken from it, and lines are re-split on
+  carriage returns).
+
+  The patch text kept is bounded by the parser's max_diff_bytes and max_diff_lines: past them,
+  the rest of the lines are only classified, and the diff hash is marked 'truncated'.
+
+  Usage:
+    stream = DiffStatsStream(parser, header_line)
+    for line in lines:
+      stream.feed(line)
+    diff = stream.result()
+  """
+
+  __slots__ = [
+    'parser', 'lines', 'filename', 'is_doc_file', 'is_comment', 'fallback', 'feed',
+    'size', 'max_bytes', 'max_lines', 'truncated',
+    'in_hunk', 'old_len', 'new_len', 'removed', 'added',
+    'lines_added', 'lines_removed', 'lines_of_docs', 'lines_of_code',
+    'chars_added', 'chars_removed', 'chars_of_docs', 'chars_of_code'
+  ]
+
+  def __init__(self, parser, header_line, keep_diff_lines=True):
+    self.parser = parser
+    self.lines = [header_line] if keep_diff_lines else None
+    self.size = len(header_line) + 1
+    self.max_bytes = parser.max_diff_bytes or sys.maxsize
+    self.max_lines = parser.max_diff_lines or sys.maxsize
+    self.truncated = False
+
+    self.in_hunk = False
+    self.old_len = self.new_len = 0
+    self.removed = self.added = 0
+
+    self.lines_added = self.lines_removed = self.lines_of_docs = self.lines_of_code = 0
+    self.chars_added = self.chars_removed = self.chars_of_docs = self.chars_of_code = 0
+
+    filename = diff_filename(header_line)
+    if filename is not None:
+      self.fallback = False
+      self.filename = filename
+    else:
+      # let the whatthepatch path deal with (and warn about) headers it can't parse either
+      self.fallback = True
+      self.filename = ''
+      self.lines = [header_line]
+
+    self.is_doc_file = parser._is_doc_file(self.filename)
+    self.is_comment = parser._comment_matcher(self.filename) if parser.comments_are_docs and not self.is_doc_file else None
+
+    # feed(line) adds the next line of the diff, it's bound once here as it's called for every line
+    self.feed = self._classify if self.lines is None else self._keep_and_classify
+
+  def _keep_and_classify(self, line):
+    if not self.truncated:
+      self.size += len(line) + 1
+      if self.size <= self.max_bytes and len(self.lines) < self.max_lines:
+        self.lines.append(line)
+      else:
+        self.truncated = True
+    if not self.fallback:
+      self._classify(line)
+
+  def _classify(self, line):
+    if '\r' in line:
+      # whatthepatch splits the diff with splitlines(), which also breaks lines on '\r'
+      for segment in line.splitlines():
+        self._classify(segment)
+      return
+
+    kind = line[:1]
+    if kind == '+':
+      if not self.in_hunk or (self.added == self.new_len and self.added != 0):
+        return
+      self.added += 1
+      self.lines_added += 1
+      chars = len(line) - 1
+      self.chars_added += chars
+    elif kind == '-':
+      if not self.in_hunk or (self.removed == self.old_len and self.removed != 0):
+        return
+      self.removed += 1
+      self.lines_removed += 1
+      chars = len(line) - 1
+      self.chars_removed += chars
+    else:
+      if kind == ' ':
+        if self.in_hunk and self.removed != self.old_len and self.added != self.new_len:
+          self.removed += 1
+          self.added += 1
+      elif kind == '@':
+        match = HUNK_HEADER.match(line)
+        if match:
+          self.in_hunk = True
+          self.old_len = int(match.group(2) or 0)
+          self.new_len = int(match.group(4) or 0)
+          self.removed = self.added = 0
+      return
+
+    # the line was added or removed, classify its content
+    if self.is_doc_file or (self.is_comment is not None and self.is_comment(line[1:])):
+      self.lines_of_docs += 1
+      self.chars_of_docs += chars
+    else:
+      self.lines_of_code += 1
+      self.chars_of_code += chars
+
+  def result(self):
+    """Returns the diff hash (see GitLogParser.parse) of the lines fed so far."""
+    if self.fallback:
+      result = self.parser._parse_diff("\n".join(self.lines))
+      if self.truncated:
+        result['truncated'] = True
+      return result
+
+    result = {
+      'filename': self.filename,
+      'stats': {
+        'lines_added': self.lines_added,
+        'lines_removed': self.lines_removed,
+        'lines_changed': self.lines_added + self.lines_removed,
+        'lines_of_docs': self.lines_of_docs,
+        'lines_of_code': self.lines_of_code,
+        'chars_added': self.chars_added,
+        'chars_removed': self.chars_removed,
+        'chars_changed': self.chars_added + self.chars_removed,
+        'chars_of_docs': self.chars_of_docs,
+        'chars_of_code': self.chars_of_code,
+        'is_docfile': self.is_doc_file
+      }
+    }
+    if self.lines is not None:
+      result['diff_lines'] = "\n".join(self.lines)
+    if self.truncated:
+      result['truncated'] = True
+    return result
+
+
+def diff_filename(header_line):
+  """Returns the filename of a file diff (its new name, unless deleted) from its header line, None if unparseable."""
+  match = DIFF_HEADER.match(header_line)
+  if not match:
+    return None
+  old_filename, new_filename = match.group(1), match.group(2)
+  return old_filename if new_filename == '/dev/null' else new_filename
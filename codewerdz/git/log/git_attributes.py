@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import re
+from subprocess import CalledProcessError
+
+from codewerdz.git.process.git_process import GitProcess
+
+
+class GitAttributes(object):
+  """The linguist attributes that .gitattributes files assign to paths.
+
+  Only the attributes in NAMES are kept. The files are read once from the working tree
+  (the .gitattributes of every directory, then .git/info/attributes), so looking up a path
+  never runs `git check-attr`. Patterns follow the gitattributes rules: a pattern without
+  a slash matches a file name at any depth below its .gitattributes file, other patterns
+  are relative to it, and later/deeper rules take precedence.
+
+  NOTE: the attributes of the current working tree apply to the whole history, like
+  linguist does for a repository's languages.
+  """
+
+  DOCUMENTATION = 'linguist-documentation'
+  GENERATED = 'linguist-generated'
+  DIFF = 'diff'
+
+  NAMES = [DOCUMENTATION, GENERATED, DIFF]
+
+  # the built-in macro `binary` is `-diff -merge -text`
+  BINARY = 'binary'
+
+  def __init__(self, rules=None):
+    """
+    Args:
+        rules: A sequence of (directory, pattern, attributes) tuples in increasing order of
+          precedence, where attributes is a dict of {name: True | False | None | value}.
+    """
+    self.rules = list(rules or [])
+    self.matchers = [(_pattern_regex(directory, pattern), attributes)
+                     for directory, pattern, attributes in self.rules]
+
+  @staticmethod
+  def load(repo=None):
+    """Returns the attributes of the working tree of the repo at path repo (none outside of a work tree).
+
+    Args:
+        repo: The path of the repo. Default None (the current directory's)
+    """
+    try:
+      top = list(GitProcess(repo).get_lines("rev-parse", ["--show-toplevel"]))[0]
+      # (relative to the repo's path)
+      git_dir = os.path.join(repo or '', list(GitProcess(repo).get_lines("rev-parse", ["--git-dir"]))[0])
+      paths = "\n".join(GitProcess(repo).get_lines(
+        "ls-files", ["-z", "--full-name", "--", ":(top,glob)**/.gitattributes"])).split('\0')
+    except CalledProcessError:
+      return GitAttributes()
+
+    # shallower files first, as the attributes of deeper directories take precedence
+    paths = sorted((path for path in paths if path), key=lambda path: (path.count('/'), path))
+    files = [(os.path.dirname(path), os.path.join(top, path)) for path in paths]
+    files.append(('', os.path.join(git_dir, 'info', 'attributes')))
+
+    rules = []
+    for directory, path in files:
+      if os.path.isfile(path):
+        with open(path) as f:
+          rules.extend(GitAttributes.parse(f.read(), directory))
+    return GitAttributes(rules)
+
+  @staticmethod
+  def parse(text, directory=''):
+    """Returns the rules (see __init__) of a .gitattributes file in directory (relative to the top)."""
+    rules = []
+    for line in text.splitlines():
+      fields = line.split()
+      if not fields or fields[0].startswith(('#', '[attr]', '!', '"')) or fields[0].endswith('/'):
+        # comments, macros, (forbidden) negative patterns, quoted patterns and
+        # directory patterns (which never match a file) are skipped
+        continue
+
+      attributes = {}
+      for field in fields[1:]:
+        if field.startswith('-'):
+          name, value = field[1:], False
+        elif field.startswith('!'):
+          name, value = field[1:], None
+        elif '=' in field:
+          name, value = field.split('=', 1)
+        else:
+          name, value = field, True
+        if name == GitAttributes.BINARY and value is True:
+          attributes[GitAttributes.DIFF] = False
+        elif name in GitAttributes.NAMES:
+          attributes[name] = value
+
+      if attributes:
+        rules.append((directory, fields[0], attributes))
+    return rules
+
+  def get(self, path, name):
+    """Returns the value of attribute name for path: True (set), False (unset), a string, or None (unspecified)."""
+    for regex, attributes in reversed(self.matchers):
+      if name in attributes and regex.match(path):
+        return attributes[name]
+    return None
+
+  def is_set(self, path, name):
+    """Returns True/False if attribute name is set/unset for path (linguist style, i.e. =true/=false), else None."""
+    value = self.get(path, name)
+    if value is True or value == 'true':
+      return True
+    if value is False or value == 'false':
+      return False
+    return None
+
+  def fingerprint(self):
+    """Returns a digest of the rules, which changes whenever the attributes of any path might."""
+    return hashlib.sha1(json.dumps(self.rules, sort_keys=True)).hexdigest()
+
+
+def _pattern_regex(directory, pattern):
+  """Returns a compiled regex matching the paths (relative to the top) that pattern in directory matches."""
+  prefix = re.escape(directory + '/') if directory else ''
+  if '/' in pattern:
+    # patterns with a slash are relative to the directory of the .gitattributes file
+    return re.compile(prefix + _glob_regex(pattern.lstrip('/')) + r'\Z', re.S)
+  return re.compile(prefix + '(?:.*/)?' + _glob_regex(pattern) + r'\Z', re.S)
+
+
+def _glob_regex(pattern):
+  """Translates a gitattributes glob, in which only '**' matches across slashes, to a regex."""
+  regex = []
+  i, n = 0, len(pattern)
+  while i < n:
+    c = pattern[i]
+    if pattern.startswith('**/', i) and (i == 0 or pattern[i - 1] == '/'):
+      # leading '**/' and '/**/' match any number of directories
+      regex.append('(?:.*/)?')
+      i += 3
+    elif pattern.startswith('/**', i) and i + 3 == n:
+      # trailing '/**' matches everything inside
+      regex.append('/.*')
+      i += 3
+    elif c == '*':
+      while i < n and pattern[i] == '*':
+        i += 1
+      regex.append('[^/]*')
+    elif c == '?':
+      regex.append('[^/]')
+      i += 1
+    elif c == '[':
+      j = i + 1
+      if j < n and pattern[j] in '!^':
+        j += 1
+      if j < n and pattern[j] == ']':
+        j += 1
+      while j < n and pattern[j] != ']':
+        j += 1
+      if j >= n:
+        regex.append(re.escape(c))
+        i += 1
+      else:
+        members = pattern[i + 1:j].replace('\\', '\\\\')
+        if members[0] in '!^':
+          members = '^' + members[1:]
+        regex.append('[' + members + ']')
+        i = j + 1
+    elif c == '\\' and i + 1 < n:
+      regex.append(re.escape(pattern[i + 1]))
+      i += 2
+    else:
+      regex.append(re.escape(c))
+      i += 1
+  return ''.join(regex)
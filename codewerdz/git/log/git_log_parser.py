@@ -1,20 +1,90 @@
-import fnmatch
+import collections
+import itertools
+import re
+import sys
 
+import codewerdz
 import codewerdz.git
+from codewerdz.git.log.comment_classifier import CommentClassifier
+from codewerdz.git.log.diff_stats_stream import DiffStatsStream, diff_filename
 from codewerdz.git.log.git_log_process import GitLogProcess
+from codewerdz.git.log.path_classifier import PathClassifier
+from codewerdz.git.profiler import Profiler
 
-import click
-import whatthepatch
+# whatthepatch (imported on first use, see _whatthepatch)
+whatthepatch = None
 
 
 class GitLogParser(object):
-  def __init__(self, docs_pattern=codewerdz.git.DEFAULT_DOCS_PATTERNS, comments_are_docs=False):
+
+  # derives diff stats in a single pass over the diff lines (see DiffStatsStream)
+  DIFF_PARSER_STREAMING = 'streaming'
+  # joins each file's diff and parses it with whatthepatch before running analyze_changes
+  DIFF_PARSER_WHATTHEPATCH = 'whatthepatch'
+
+  DIFF_PARSERS = [DIFF_PARSER_STREAMING, DIFF_PARSER_WHATTHEPATCH]
+
+  # the size of a file diff past which its patch isn't kept (nor parsed with whatthepatch), 0 for no limit
+  MAX_DIFF_BYTES = 8 * 1024 * 1024
+  MAX_DIFF_LINES = 100000
+
+  # the commits (at most) sent to a worker process at once, see parse_in_pool
+  POOL_CHUNK_SIZE = 16
+  # the bytes of log output (roughly) past which fewer commits are sent at once
+  POOL_CHUNK_BYTES = 1024 * 1024
+  # number of chunks in flight per worker, bounds the output read ahead of the consumer
+  POOL_CHUNKS_IN_FLIGHT_PER_JOB = 4
+
+  # the commit hash key for each field of GitLogProcess.FORMAT
+  FORMAT_KEYS = {
+    GitLogProcess.FORMAT_SHA: 'sha',
+    GitLogProcess.FORMAT_AUTHOR: 'author',
+    GitLogProcess.FORMAT_EMAIL: 'email',
+    GitLogProcess.FORMAT_DATE: 'date',
+    GitLogProcess.FORMAT_DATE_ISO: 'date_iso',
+    GitLogProcess.FORMAT_COMMIT_DATE: 'commit_date',
+    GitLogProcess.FORMAT_COMMIT_DATE_ISO: 'commit_date_iso',
+    GitLogProcess.FORMAT_PARENT: 'parent',
+    GitLogProcess.FORMAT_TREE: 'tree',
+    GitLogProcess.FORMAT_SUBJECT: 'subject'
+  }
+
+  HEADER_KEYS = [FORMAT_KEYS[field] for field in GitLogProcess.FORMAT]
+
+  # states of the NUL framed parser, see _parse_nul_framed
+  _HEADER, _SEPARATOR, _NUMSTATS, _PATCH = range(4)
+
+  def __init__(self, docs_pattern=codewerdz.git.DEFAULT_DOCS_PATTERNS, comments_are_docs=False,
+               diff_parser=DIFF_PARSER_STREAMING, diff_lines=True, attributes=None,
+               max_diff_bytes=MAX_DIFF_BYTES, max_diff_lines=MAX_DIFF_LINES, skip_generated=False):
+    """
+    Args:
+        docs_pattern: A sequence of glob patterns matching doc files.
+        comments_are_docs: Whether comments in code count as docs.
+        diff_parser: One of DIFF_PARSERS. Overriding analyze_changes always uses the whatthepatch parser.
+        diff_lines: Whether each diff hash includes its 'diff_lines'. Default True
+        attributes: The GitAttributes of the repository, see PathClassifier. Default None
+        max_diff_bytes: The bytes of a file diff past which it's truncated: its 'diff_lines' stop there,
+          and its stats are counted as the rest streams in (with the default analyze_changes, even if
+          overridden), so a huge diff is never held in memory. 0 for no limit. Default MAX_DIFF_BYTES
+        max_diff_lines: The lines of a file diff past which it's truncated, 0 for no limit. Default MAX_DIFF_LINES
+        skip_generated: Whether the files marked linguist-generated or -diff (binary) by the attributes
+          are left out of the commits' stats and diffs, without parsing their diffs. Default False
+    """
     self.comments_are_docs = comments_are_docs
     self.docs_pattern = docs_pattern
+    self.path_classifier = PathClassifier(docs_pattern, attributes=attributes)
+    self.comment_classifier = CommentClassifier()
+    self.diff_parser = diff_parser
+    self.diff_lines = diff_lines
+    self.max_diff_bytes = max_diff_bytes
+    self.max_diff_lines = max_diff_lines
+    self.skip_generated = skip_generated
 
   def parse(self, log_output):
     """
     Parses the structured log output that GitLogCommand produces into commit hashes.
+    Either framing of GitLogProcess is accepted, it is detected from the first line.
     Output is a iterator of commit hashes.
     A commit hash has the following structure:
     {
@@ -54,12 +124,154 @@ class GitLogParser(object):
             "chars_of_docs": '<integer>',
             "is_docfile": '<boolean>'
           },
-          'diff_lines': '<string> (all lines of diff, in a single string)'
+          // NOTE: only included if the parser was created with diff_lines=True
+          'diff_lines': '<string> (all lines of diff, in a single string)',
+          // NOTE: only included if the diff was bigger than max_diff_bytes/max_diff_lines,
+          // diff_lines then stops at the limit
+          'truncated': true
         }
         // ...
       ]
     }
     """
+    log_output = iter(log_output)
+    first_line = next(log_output, None)
+    if first_line is None:
+      return
+
+    log_output = itertools.chain([first_line], log_output)
+    if first_line.startswith('\0'):
+      commits = self._parse_nul_framed(log_output)
+    else:
+      commits = self._parse_sentinel_framed(log_output)
+
+    for commit in commits:
+      yield commit
+
+  def parse_in_pool(self, log_output, jobs, chunk_size=POOL_CHUNK_SIZE):
+    """Parses log_output like parse, with the commits' diffs parsed in a pool of worker processes.
+
+    The lines are framed into commits as they're read (which is cheap), and chunks of chunk_size
+    commits (fewer if they're big) are parsed by (a copy of) this parser in one of the jobs worker
+    processes. The chunks are yielded back in order, so the commits are the same as parse's, while
+    only a few chunks per job are ever read ahead.
+
+    NOTE: a commit is sent whole, so max_diff_bytes doesn't bound the memory of the worker.
+    """
+    import multiprocessing
+    pool = multiprocessing.Pool(jobs, _init_pool_worker, (self,))
+    try:
+      pending = collections.deque()
+      max_in_flight = jobs * self.POOL_CHUNKS_IN_FLIGHT_PER_JOB
+      for chunk in self._frame_chunks(log_output, chunk_size):
+        if len(pending) >= max_in_flight:
+          for commit in pending.popleft().get():
+            yield commit
+        pending.append(pool.apply_async(_parse_pool_chunk, (chunk,)))
+
+      while pending:
+        for commit in pending.popleft().get():
+          yield commit
+      pool.close()
+    finally:
+      pool.terminate()
+      pool.join()
+
+  def _frame_chunks(self, log_output, chunk_size):
+    """Yields the output of up to chunk_size commits at a time, as a single string (see parse_in_pool)."""
+    log_output = iter(log_output)
+    first_line = next(log_output, None)
+    if first_line is None:
+      return
+
+    # (like parse, the framing is detected from the first line, as a subject can be the sentinel)
+    nul_framed = first_line.startswith('\0')
+    sentinel = GitLogProcess.FORMAT_START_COMMIT
+    lines = []
+    commits = size = 0
+    for line in itertools.chain([first_line], log_output):
+      if (line[:1] == '\0') if nul_framed else (line == sentinel):
+        if commits >= chunk_size or size >= self.POOL_CHUNK_BYTES:
+          yield "\n".join(lines)
+          lines = []
+          commits = size = 0
+        commits += 1
+      lines.append(line)
+      size += len(line) + 1
+    if lines:
+      yield "\n".join(lines)
+
+  def _parse_nul_framed(self, log_output):
+    """Parses GitLogProcess.FRAMING_NUL output in a single pass over the lines.
+
+    Each commit is a state machine of: header fields, the separator line, numstats
+    and the patch, which is fed to the diff parser line by line as it streams in.
+    """
+    header_size = len(self.HEADER_KEYS)
+    new_diff = self._new_diff
+    HEADER, SEPARATOR, NUMSTATS, PATCH = self._HEADER, self._SEPARATOR, self._NUMSTATS, self._PATCH
+    fields = numstats = diffs = diff = feed = None
+    state = None
+
+    for line in log_output:
+      if line[:1] == '\0':
+        if fields is not None:
+          commit = self._new_commit(fields, numstats, diffs, diff)
+          if commit:
+            yield commit
+        fields = [line[1:]]
+        numstats = []
+        diffs = []
+        diff = feed = None
+        state = HEADER
+      elif state == PATCH:
+        if line.startswith("diff --git "):
+          if diff is not None:
+            diffs.append(diff.result())
+          diff = new_diff(line)
+          feed = diff.feed
+        elif feed is not None:
+          feed(line)
+      elif state == HEADER:
+        fields.append(line)
+        if len(fields) == header_size:
+          state = SEPARATOR
+      elif state == SEPARATOR:
+        # a blank line separates the header from the numstats
+        state = NUMSTATS
+      elif state == NUMSTATS:
+        if line and (line[0].isdigit() or line[0] == '-'):
+          numstats.append(line)
+        else:
+          # a blank line separates the numstats from the patch
+          state = PATCH
+          if line.startswith("diff --git "):
+            diff = new_diff(line)
+            feed = diff.feed
+
+    if fields is not None:
+      commit = self._new_commit(fields, numstats, diffs, diff)
+      if commit:
+        yield commit
+
+  def _new_commit(self, fields, numstats, diffs, diff):
+    if not fields[0]:
+      return None
+
+    if len(fields) < len(self.HEADER_KEYS):
+      fields += [None] * (len(self.HEADER_KEYS) - len(fields))
+    commit = dict(zip(self.HEADER_KEYS, fields))
+
+    numstats = [dict(zip(['ins', 'del', 'path'], line.split('\t'))) for line in numstats]
+    commit['stats'] = self._filter_numstats(numstats)
+
+    if diff is not None:
+      diffs.append(diff.result())
+    commit['diffs'] = self._filter_diffs(diffs)
+    return commit
+
+  def _parse_sentinel_framed(self, log_output):
+    """Parses GitLogProcess.FRAMING_SENTINEL output, one buffered commit at a time."""
     commit_lines = []
     for line in log_output:
       if line == GitLogProcess.FORMAT_START_COMMIT:
@@ -97,7 +309,7 @@ class GitLogParser(object):
 
     # commit stats
     numstats = self._slurp_numstats(lines.values()[offset:])
-    commit['stats'] = filter(lambda x: " => " not in x['path'], numstats)
+    commit['stats'] = self._filter_numstats(numstats)
     offset += len(numstats) + 1
 
     # commit diffs
@@ -117,33 +329,75 @@ class GitLogParser(object):
 
   def _slurp_diffs(self, lines):
     diffs = []
-    diff_blob = None
+    diff = None
     for line in lines:
       if line.startswith("diff --git "):
-        if diff_blob is not None:
-          diffs.append(self._parse_diff(diff_blob))
-        diff_blob = line
-      else:
-        diff_blob += "\n" + line
+        if diff is not None:
+          diffs.append(diff.result())
+        diff = self._new_diff(line)
+      elif diff is not None:
+        diff.feed(line)
+
+    if diff is not None:
+      diffs.append(diff.result())
+
+    return self._filter_diffs(diffs)
+
+  def _filter_numstats(self, numstats):
+    # renames, and the skipped files, are left out
+    if self.skip_generated:
+      return [x for x in numstats if " => " not in x['path'] and not self._is_skipped(x['path'])]
+    return filter(lambda x: " => " not in x['path'], numstats)
+
+  def _filter_diffs(self, diffs):
+    # the skipped files' diffs have no result
+    if self.skip_generated:
+      return [diff for diff in diffs if diff is not None]
+    return diffs
 
-    if diff_blob is not None:
-      diffs.append(self._parse_diff(diff_blob))
+  def _is_skipped(self, filename):
+    return self.path_classifier.is_generated(filename) or self.path_classifier.is_binary(filename)
 
-    return diffs
+  def _new_diff(self, header_line):
+    """Returns the diff parser for a file diff starting at header_line, which is fed the rest of its lines."""
+    if self.skip_generated:
+      filename = diff_filename(header_line)
+      if filename is not None and self._is_skipped(filename):
+        return SKIPPED_DIFF
+
+    if self.diff_parser == self.DIFF_PARSER_WHATTHEPATCH or not self._uses_default_analyze_changes():
+      diff = WhatthepatchDiff(self, header_line)
+    else:
+      diff = DiffStatsStream(self, header_line, self.diff_lines)
+
+    profiler = Profiler.current()
+    if profiler is not None:
+      return profiler.timed_feed('diff', diff)
+    return diff
+
+  def _uses_default_analyze_changes(self):
+    # the streaming parser computes the default stats itself, so it can't honor an override
+    return 'analyze_changes' not in vars(self) and type(self).analyze_changes == GitLogParser.analyze_changes
 
   def _parse_diff(self, diff_lines):
     filename = self._parse_header_filename(diff_lines)
-    changes = whatthepatch.patch.parse_unified_diff(diff_lines)
+    changes = _whatthepatch().patch.parse_unified_diff(diff_lines)
+
+    analyze_changes = self.analyze_changes
+    profiler = Profiler.current()
+    if profiler is not None:
+      analyze_changes = profiler.timed('analyze_changes', analyze_changes, items=1)
 
     stats = {}
     # if changes:
-    stats = self.analyze_changes(filename, changes)
+    stats = analyze_changes(filename, changes)
 
     result = {
       'filename': filename,
-      'stats': stats,
-      'diff_lines': diff_lines
+      'stats': stats
     }
+    if self.diff_lines:
+      result['diff_lines'] = diff_lines
     return result
 
   def _parse_header_filename(self, diff_lines):
@@ -158,13 +412,14 @@ class GitLogParser(object):
     except AttributeError:
       pass
 
+    whatthepatch = _whatthepatch()
     # findall_regex returns an array of indexes where RE matched
     standard_headers = whatthepatch.snippets.findall_regex(
       diff_lines, whatthepatch.patch.git_diffcmd_header)
     # take the first located header and extract the filenames from it
     if not standard_headers:
       # log this so we can debug why certain headers won't parse.
-      click.echo('WARNING: Could not parse this header:\n%s\n' % '\n'.join(diff_lines), err=True)
+      codewerdz.info('WARNING: Could not parse this header:\n%s\n' % '\n'.join(diff_lines))
       return ''
 
     matches = whatthepatch.patch.git_diffcmd_header.match(diff_lines[standard_headers[0]])
@@ -175,22 +430,11 @@ class GitLogParser(object):
     return new_filename
 
   def _is_doc_file(self, filename):
-    if not filename:
-      return False
-
-    return any([fnmatch.fnmatch(filename, pattern) for pattern in self.docs_pattern])
-
-  def _is_comment(self, change):
-    # massage the subject a bit
-    if not change:
-      return False
-    content = (change[2] or '').strip()
-    COMMENT_PREFIXES = ["#", "//", "/*", "* ", "*/", "'''", '"""']
-    COMMENT_SUFFIXES = ["*/", "'''", '"""']
-    return any((
-      any(map(content.startswith, COMMENT_PREFIXES)),
-      any(map(content.endswith, COMMENT_SUFFIXES))
-      ))
+    return self.path_classifier.is_doc_file(filename)
+
+  def _comment_matcher(self, filename):
+    # returns a function of a changed line's content, see CommentClassifier
+    return self.comment_classifier.matcher(filename)
 
   def analyze_changes(self, filename, changes):
     """
@@ -229,6 +473,7 @@ class GitLogParser(object):
     chars_of_code = 0
 
     is_doc_file = self._is_doc_file(filename)
+    is_comment = self._comment_matcher(filename) if self.comments_are_docs and not is_doc_file else None
 
     for change in (changes or []):
       # change is a tuple like (added, deleted, content)
@@ -253,7 +498,7 @@ class GitLogParser(object):
         # by some basic heuristics. If the filename matches on of the docs_patterns,
         # all lines will be considered docs. For all other files,
         # if comments_are_docs is enabled, we'll check each line, and if the line starts
-        # or ends with some common comment characters, we'll consider it docs.
+        # or ends with the comment characters of the file's language, we'll consider it docs.
         # There is handling for C-style block comments, but not Python triple-quote style
         # has some problems.
         #
@@ -267,7 +512,7 @@ class GitLogParser(object):
         # comment block, as the block could have been closed in an unmodified line
         # which was not included in the diff.
 
-        if (is_doc_file or (self.comments_are_docs and self._is_comment(change))):
+        if (is_doc_file or (is_comment is not None and is_comment(change[2] or ''))):
           lines_of_docs += 1
           chars_of_docs += len(change[2])
         else:
@@ -287,3 +532,84 @@ class GitLogParser(object):
       'chars_of_code': chars_of_code,
       'is_docfile': is_doc_file
     }
+
+
+# the parser of a worker process of GitLogParser.parse_in_pool
+_pool_parser = None
+
+
+def _init_pool_worker(parser):
+  global _pool_parser
+  _pool_parser = parser
+  # the profile of the worker would be lost
+  Profiler.stop()
+
+
+def _parse_pool_chunk(chunk):
+  """Worker entry point of GitLogParser.parse_in_pool: returns the parsed commits of a chunk of log output."""
+  return list(_pool_parser.parse(chunk.split("\n")))
+
+
+def _whatthepatch():
+  """Returns the whatthepatch module, imported on first use (it's slow to import, and only parses
+  diffs with the whatthepatch diff parser or a custom analyze_changes)."""
+  global whatthepatch
+  if whatthepatch is None:
+    import whatthepatch as module
+    # monkeypatch whatthepatch regex
+    module.patch.git_diffcmd_header = re.compile('^diff --git "?a/(.+)"? "?b/(.+)"?$')
+    whatthepatch = module
+  return whatthepatch
+
+
+class WhatthepatchDiff(object):
+  """Collects the lines of a file diff, to parse them with whatthepatch (see GitLogParser._parse_diff).
+
+  A diff bigger than the parser's max_diff_bytes or max_diff_lines isn't collected any further:
+  its stats are counted by a DiffStatsStream instead, as the rest of its lines stream in."""
+
+  __slots__ = ['parser', 'lines', 'size', 'max_bytes', 'max_lines', 'stream']
+
+  def __init__(self, parser, header_line):
+    self.parser = parser
+    self.lines = [header_line]
+    self.size = len(header_line) + 1
+    self.max_bytes = parser.max_diff_bytes or sys.maxsize
+    self.max_lines = parser.max_diff_lines or sys.maxsize
+    self.stream = None
+
+  def feed(self, line):
+    if self.stream is None:
+      self.size += len(line) + 1
+      if self.size <= self.max_bytes and len(self.lines) < self.max_lines:
+        self.lines.append(line)
+        return
+      self.stream = DiffStatsStream(self.parser, self.lines[0], keep_diff_lines=False)
+      for collected in itertools.islice(self.lines, 1, None):
+        self.stream.feed(collected)
+    self.stream.feed(line)
+
+  def result(self):
+    if self.stream is None:
+      return self.parser._parse_diff("\n".join(self.lines))
+
+    result = self.stream.result()
+    if self.parser.diff_lines:
+      result['diff_lines'] = "\n".join(self.lines)
+    result['truncated'] = True
+    return result
+
+
+class SkippedDiff(object):
+  """Stands in for the diff of a skipped file (see GitLogParser.skip_generated), ignoring its lines."""
+
+  __slots__ = []
+
+  def feed(self, line):
+    pass
+
+  def result(self):
+    return None
+
+
+SKIPPED_DIFF = SkippedDiff()
@@ -1,12 +1,5 @@
-import re
-
 from codewerdz.git.process.git_process import GitProcess
 
-import whatthepatch
-
-# monkeypatch whatthepatch regex
-whatthepatch.patch.git_diffcmd_header = re.compile('^diff --git "?a/(.+)"? "?b/(.+)"?$')
-
 
 class GitLogProcess(GitProcess):
 
@@ -36,8 +29,15 @@ class GitLogProcess(GitProcess):
   ]
 
   FORMAT_STRING = "%n".join([FORMAT_START_COMMIT] + FORMAT)
+  FORMAT_STRING_NUL = "%x00" + "%n".join(FORMAT)
 
-  def __init__(self, since=None, until=None, limit=None, excluded_paths=None):
+  # each commit starts with a line holding only FORMAT_START_COMMIT (which a subject could also be)
+  FRAMING_SENTINEL = 'sentinel'
+  # each commit starts with a NUL character, which can't occur elsewhere in the (text) output
+  FRAMING_NUL = 'nul'
+
+  def __init__(self, since=None, until=None, limit=None, excluded_paths=None, commits=None, patches=True,
+               revisions=None, framing=FRAMING_NUL, repo=None):
     params = []
     if since:
       params += ['--since=' + since]
@@ -49,16 +49,34 @@ class GitLogProcess(GitProcess):
       params += ['--max-count=' + str(limit)]
 
     params += [
-      '--pretty=tformat:' + self.FORMAT_STRING,
-      '--date=local', '--numstat', '--no-merges',
-      '--follow', '-p', '--', '.'
+      '--pretty=tformat:' + (self.FORMAT_STRING_NUL if framing == self.FRAMING_NUL else self.FORMAT_STRING),
+      '--date=local', '--no-merges'
     ]
 
+    # git only allows --follow with a single pathspec, so it can't be combined with excluded paths
+    if not excluded_paths:
+      params += ['--follow']
+
+    # without patches, only the commit metadata is output (no numstats or diffs)
+    if patches:
+      params += ['--numstat', '-p']
+
+    # show an explicit list of commits (in the given order) instead of walking the history
+    if commits is not None:
+      params += ['--no-walk=unsorted', '--stdin']
+
+    # walk the given revisions (e.g. a range like 'abc123..HEAD') instead of HEAD
+    if revisions:
+      params += list(revisions)
+
+    params += ['--', '.']
+
     if excluded_paths:
       params += [":(exclude)%s" % path for path in excluded_paths]
 
     self.params = params
-    GitProcess.__init__(self)
+    self.commits = commits
+    GitProcess.__init__(self, repo)
 
   def get_lines(self):
-    return super(GitLogProcess, self).get_lines("log", self.params)
+    return super(GitLogProcess, self).get_lines("log", self.params, self.commits)
@@ -0,0 +1,27 @@
+from codewerdz.git.process.git_process import GitProcess
+
+
+class GitRevListProcess(GitProcess):
+  """Lists the commit ids that GitLogProcess would visit with the same options, in the same order."""
+
+  def __init__(self, since=None, until=None, limit=None, excluded_paths=None, revisions=None, repo=None):
+    params = []
+    if since:
+      params += ['--since=' + since]
+
+    if until:
+      params += ['--until=' + until]
+
+    if limit:
+      params += ['--max-count=' + str(limit)]
+
+    params += ['--no-merges'] + list(revisions or ['HEAD']) + ['--', '.']
+
+    if excluded_paths:
+      params += [":(exclude)%s" % path for path in excluded_paths]
+
+    self.params = params
+    GitProcess.__init__(self, repo)
+
+  def get_lines(self):
+    return super(GitRevListProcess, self).get_lines("rev-list", self.params)
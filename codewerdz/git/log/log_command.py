@@ -1,31 +1,42 @@
-from codewerdz.git.log.git_log_process import GitLogProcess
-from codewerdz.git.log.git_log_parser import GitLogParser
+import codewerdz
+from codewerdz.git.buffered_writer import BufferedWriter
+from codewerdz.git.log.commits import iterate_commits
+from codewerdz.git.profiler import profiled_stage
 from codewerdz.git.streaming_json_list_printer import StreamingJsonListPrinter
 
 import click
 
 
 @click.command()
+@click.option('--format', 'output_format', help="Output a JSON array, or NDJSON (one commit per line).", default=StreamingJsonListPrinter.FORMAT_JSON, type=click.Choice(StreamingJsonListPrinter.FORMATS))
+@click.option('--compact', is_flag=True, help="Leave out the indentation and whitespace of the JSON output.")
+@click.option('--flush-size', help="Bytes of output to buffer before writing it.", default=BufferedWriter.DEFAULT_FLUSH_SIZE, type=click.IntRange(1))
+@click.option('--flush-interval', help="Seconds after which buffered output is written, even if --flush-size wasn't reached.", default=BufferedWriter.DEFAULT_FLUSH_INTERVAL, type=float)
 @click.pass_context
-def log(ctx):
+def log(ctx, output_format, compact, flush_size, flush_interval):
 
   options = ctx.obj
 
+  # Print Options
+  codewerdz.debug("Format       : {}{}".format(output_format, " (compact)" if compact else ""))
+
   commits = iterate_commits(
     options['docs_pattern'],
     options['comments_are_docs'],
     options['date_range_start'],
     options['date_range_end'],
     options['commits_limit'],
-    options['exclude_path']
+    options['exclude_path'],
+    options['jobs'],
+    diff_parser=options['diff_parser'],
+    max_diff_bytes=options['max_diff_bytes'],
+    max_diff_lines=options['max_diff_lines'],
+    skip_generated=options['skip_generated'],
+    job_mode=options['job_mode'],
+    job_chunk_size=options['job_chunk_size']
   )
 
   # Output JSON
-  StreamingJsonListPrinter.dump(commits)
-
-
-def iterate_commits(docs_pattern, comments_are_docs, date_range_start, date_range_end, commits_limit, exclude_path):
-  # Iterate Git Log and Parse Commits
-  parser = GitLogParser(docs_pattern, comments_are_docs)
-  log = GitLogProcess(since=date_range_start, until=date_range_end, limit=commits_limit, excluded_paths=exclude_path)
-  return parser.parse(log.get_lines())
+  with profiled_stage('output'):
+    StreamingJsonListPrinter.dump(commits, output_format=output_format, compact=compact, flush_size=flush_size,
+                                  flush_interval=flush_interval)
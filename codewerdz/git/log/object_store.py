@@ -0,0 +1,246 @@
+import binascii
+import glob
+import mmap
+import os
+import struct
+import zlib
+from collections import OrderedDict
+
+# the object types of packfile entries
+PACK_TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+PACK_OFS_DELTA = 6
+PACK_REF_DELTA = 7
+
+PACK_INDEX_SIGNATURE = b'\377tOc'
+
+
+class ObjectStore(object):
+  """Reads objects straight from a repository's object directory, without running git.
+
+  Objects are looked up in the packfiles (through their version 2 indexes) and then among the
+  loose objects, of the object directory and of its alternates. Deltified pack entries (of both
+  kinds) are resolved, with a small cache of the bases resolved last, since the commits of a
+  history are often deltified against each other in chains.
+
+  Usage:
+    store = ObjectStore('.git/objects')
+    object_type, data = store.read('e83c5163316f89bfbde7d9ab23ca2e25604af290')
+  """
+
+  # number of resolved pack entries kept (by pack and offset), for resolving the deltas based on them
+  BASE_CACHE_SIZE = 256
+
+  def __init__(self, objects_dir):
+    self.objects_dirs = _with_alternates(objects_dir)
+    self.packs = None
+    self.base_cache = OrderedDict()
+
+  def load_packs(self):
+    """Opens the packs of the object directories, if they weren't yet.
+
+    Raises:
+        ValueError: If a pack index isn't a version 2 index.
+    """
+    if self.packs is None:
+      self.packs = [_Pack(path) for objects_dir in self.objects_dirs
+                    for path in sorted(glob.glob(os.path.join(objects_dir, 'pack', 'pack-*.idx')))]
+    return self.packs
+
+  def read(self, sha):
+    """Returns the (type, data) of the object with the given (hex) id.
+
+    Raises:
+        KeyError: If there is no such object.
+    """
+    sha_bin = binascii.unhexlify(sha)
+    for pack in self.load_packs():
+      offset = pack.find(sha_bin)
+      if offset is not None:
+        return self._read_packed(pack, offset)
+
+    for objects_dir in self.objects_dirs:
+      path = os.path.join(objects_dir, sha[:2], sha[2:])
+      if os.path.exists(path):
+        with open(path, 'rb') as f:
+          data = zlib.decompress(f.read())
+        header, _, data = data.partition(b'\0')
+        return header.split(b' ', 1)[0], data
+
+    raise KeyError(sha)
+
+  def _read_packed(self, pack, offset):
+    # the chain of deltas down to a (cached or) whole entry, resolved from its base back up
+    deltas = []
+    while True:
+      cached = self.base_cache.get((pack.path, offset))
+      if cached is not None:
+        self.base_cache[(pack.path, offset)] = self.base_cache.pop((pack.path, offset))
+        object_type, data = cached
+        break
+
+      entry_type, size, position, base = pack.entry(offset)
+      if entry_type == PACK_OFS_DELTA:
+        deltas.append((offset, pack.inflate(position, size)))
+        offset = base
+      elif entry_type == PACK_REF_DELTA:
+        deltas.append((offset, pack.inflate(position, size)))
+        object_type, data = self.read(base)
+        break
+      else:
+        object_type, data = PACK_TYPES[entry_type], pack.inflate(position, size)
+        self._cache(pack, offset, object_type, data)
+        break
+
+    for delta_offset, delta in reversed(deltas):
+      data = _apply_delta(data, delta)
+      self._cache(pack, delta_offset, object_type, data)
+    return object_type, data
+
+  def _cache(self, pack, offset, object_type, data):
+    self.base_cache[(pack.path, offset)] = (object_type, data)
+    if len(self.base_cache) > self.BASE_CACHE_SIZE:
+      self.base_cache.popitem(last=False)
+
+
+class _Pack(object):
+  """A packfile and its (version 2) index, both memory mapped."""
+
+  def __init__(self, index_path):
+    self.path = index_path[:-len('.idx')] + '.pack'
+    with open(index_path, 'rb') as f:
+      self.index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with open(self.path, 'rb') as f:
+      self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if self.index[:4] != PACK_INDEX_SIGNATURE or struct.unpack('>I', self.index[4:8])[0] != 2:
+      raise ValueError("Unsupported pack index: {}".format(index_path))
+    self.fanout = struct.unpack('>256I', self.index[8:8 + 1024])
+    self.count = self.fanout[255]
+    self.names_offset = 8 + 1024
+    self.offsets_offset = self.names_offset + self.count * 24
+    self.large_offsets_offset = self.offsets_offset + self.count * 4
+
+  def find(self, sha_bin):
+    """Returns the offset of the object in the pack, or None."""
+    first = ord(sha_bin[0:1])
+    low = self.fanout[first - 1] if first else 0
+    high = self.fanout[first]
+    index = self.index
+    names_offset = self.names_offset
+    while low < high:
+      middle = (low + high) // 2
+      position = names_offset + middle * 20
+      name = index[position:position + 20]
+      if name < sha_bin:
+        low = middle + 1
+      elif name > sha_bin:
+        high = middle
+      else:
+        return self._offset(middle)
+    return None
+
+  def _offset(self, n):
+    position = self.offsets_offset + n * 4
+    offset = struct.unpack('>I', self.index[position:position + 4])[0]
+    if offset & 0x80000000:
+      position = self.large_offsets_offset + (offset & 0x7fffffff) * 8
+      offset = struct.unpack('>Q', self.index[position:position + 8])[0]
+    return offset
+
+  def entry(self, offset):
+    """Returns the (type, size, data position, base) of the entry at offset.
+
+    The base is the offset of the base entry for ofs deltas, the (hex) id of the base object
+    for ref deltas, and None otherwise."""
+    data = self.data
+    c = ord(data[offset:offset + 1])
+    entry_type = (c >> 4) & 7
+    size = c & 15
+    shift = 4
+    position = offset + 1
+    while c & 0x80:
+      c = ord(data[position:position + 1])
+      position += 1
+      size |= (c & 0x7f) << shift
+      shift += 7
+
+    base = None
+    if entry_type == PACK_OFS_DELTA:
+      c = ord(data[position:position + 1])
+      position += 1
+      distance = c & 0x7f
+      while c & 0x80:
+        c = ord(data[position:position + 1])
+        position += 1
+        distance = ((distance + 1) << 7) | (c & 0x7f)
+      base = offset - distance
+    elif entry_type == PACK_REF_DELTA:
+      base = binascii.hexlify(data[position:position + 20])
+      position += 20
+    return entry_type, size, position, base
+
+  def inflate(self, position, size):
+    """Returns the size bytes of the zlib stream at position."""
+    decompressor = zlib.decompressobj()
+    # the stream is rarely longer than its output, a few more bytes make up for its header
+    chunk = size + 64
+    data = decompressor.decompress(self.data[position:position + chunk])
+    while len(data) < size:
+      position += chunk
+      if position >= len(self.data):
+        raise ValueError("Truncated pack entry in {}".format(self.path))
+      data += decompressor.decompress(self.data[position:position + chunk])
+    return data
+
+
+def _apply_delta(base, delta):
+  """Returns the object a (git) delta makes of base."""
+  position = _skip_varint(delta, _skip_varint(delta, 0))
+  parts = []
+  while position < len(delta):
+    c = ord(delta[position:position + 1])
+    position += 1
+    if c & 0x80:
+      # copy a range of the base
+      offset = 0
+      for i in range(4):
+        if c & (1 << i):
+          offset |= ord(delta[position:position + 1]) << (8 * i)
+          position += 1
+      size = 0
+      for i in range(3):
+        if c & (0x10 << i):
+          size |= ord(delta[position:position + 1]) << (8 * i)
+          position += 1
+      parts.append(base[offset:offset + (size or 0x10000)])
+    elif c:
+      # insert the next c bytes of the delta
+      parts.append(delta[position:position + c])
+      position += c
+    else:
+      raise ValueError("Invalid delta opcode 0")
+  return b''.join(parts)
+
+
+def _skip_varint(data, position):
+  # the base and result sizes at the start of a delta (which are not needed)
+  while ord(data[position:position + 1]) & 0x80:
+    position += 1
+  return position + 1
+
+
+def _with_alternates(objects_dir):
+  """Returns the object directory, followed by its alternates (recursively)."""
+  objects_dirs = [objects_dir]
+  for directory in objects_dirs:
+    alternates_path = os.path.join(directory, 'info', 'alternates')
+    if not os.path.exists(alternates_path):
+      continue
+    with open(alternates_path) as f:
+      for line in f:
+        line = line.strip()
+        if line and not line.startswith('#'):
+          alternate = os.path.normpath(os.path.join(directory, line))
+          if alternate not in objects_dirs:
+            objects_dirs.append(alternate)
+  return objects_dirs
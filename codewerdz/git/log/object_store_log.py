@@ -0,0 +1,367 @@
+import heapq
+import itertools
+import os
+import re
+import time
+from subprocess import CalledProcessError
+
+import codewerdz
+from codewerdz.git.log.commit_graph import CommitGraph
+from codewerdz.git.log.object_store import ObjectStore
+from codewerdz.git.process.git_process import GitProcess
+
+# the id of the tree with no entries, which root commits are compared to
+EMPTY_TREE = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+
+# the whitespace that git trims from the end of a subject's lines
+GIT_SPACE = ' \t\n\r'
+
+# the timestamp and timezone of an author or committer, after their email
+IDENT_DATE = re.compile(br'[ \t\n\r]*([0-9]+)[ \t\n\r]*([+-][0-9]+)')
+
+# the environment variables that make git look for objects (or a repository) elsewhere
+GIT_ENVIRONMENT = ['GIT_DIR', 'GIT_COMMON_DIR', 'GIT_OBJECT_DIRECTORY', 'GIT_ALTERNATE_OBJECT_DIRECTORIES',
+                   'GIT_REPLACE_REF_BASE', 'GIT_NO_REPLACE_OBJECTS', 'GIT_GRAFT_FILE', 'GIT_SHALLOW_FILE']
+
+
+class ObjectStoreLog(object):
+  """Lists the commits that a GitLogProcess without patches would, read straight from the object store.
+
+  No git process runs per commit (or at all, once the revisions are resolved): the history is
+  walked in the order `git log --no-merges --follow -- .` walks it, with the parents, root trees
+  and dates of the commits looked up in the commit-graph (see CommitGraph) when the repository
+  has one, and inflated from its loose objects and packs (see ObjectStore) otherwise. Only the
+  commits that are listed are read in full, for their author, committer and subject.
+
+  That is, newest commit date first (and in the order they were reached among equal dates),
+  merges left out, and commits whose tree is their parent's left out (the empty tree for root
+  commits), as `--follow` hides the commits that change nothing. A range (A..B) is walked the
+  way git walks it, up front and only as far past A's history as git does.
+
+  The commit hashes are those of GitLogParser.parse, but without stats or diffs, and with full
+  (40 digit) object ids in 'sha', 'parent' and 'tree'.
+
+  Use ObjectStoreLog.open, which returns None for the repositories and options this can't
+  reproduce `git log` for (a mailmap, grafts, replaced objects, a shallow clone, a date range,
+  excluded paths, ...).
+  """
+
+  # git keeps walking a range this many uninteresting commits past the last interesting one
+  # (see still_interesting in git's revision.c)
+  SLOP = 5
+
+  def __init__(self, store, heads, excluded_heads=(), limit=None, graph=None):
+    """
+    Args:
+        store: The ObjectStore of the repository.
+        heads: The (hex) ids of the commits to walk the history of.
+        excluded_heads: The (hex) ids of the commits whose history is left out, e.g. A in A..B. Default ()
+        limit: The maximum number of commits to list (as `--max-count`). Default None (all of them)
+        graph: The CommitGraph of the repository, if it has one. Default None
+    """
+    self.store = store
+    self.heads = list(heads)
+    self.excluded_heads = list(excluded_heads)
+    # NOTE: like GitLogProcess's, the limit can be given as a string (e.g. '0')
+    self.limit = int(limit) if limit else None
+    self.graph = graph
+    self.headers = {}
+    # the objects of the commits read for their headers (without a commit-graph), until read in full
+    self.objects = {}
+
+  @staticmethod
+  def open(since=None, until=None, limit=None, excluded_paths=None, revisions=None, repo=None):
+    """Returns an ObjectStoreLog for the repository at path repo (default the current directory's),
+    and the given GitLogProcess options, or None if it can't list the same commits (use GitLogProcess then)."""
+    if since or until or excluded_paths or any(os.environ.get(name) for name in GIT_ENVIRONMENT):
+      return None
+
+    revisions = list(revisions or ['HEAD'])
+    if len(revisions) != 1 or '...' in revisions[0] or revisions[0].startswith('^'):
+      return None
+    refs = revisions[0].split('..')
+    if len(refs) > 2 or not all(refs):
+      return None
+
+    try:
+      lines = list(GitProcess(repo).get_lines('rev-parse', [
+        '--is-bare-repository', '--is-shallow-repository', '--git-common-dir', '--show-cdup'
+      ] + [ref + '^{commit}' for ref in refs]))
+    except CalledProcessError:
+      return None
+
+    # NOTE: the mailmap and the log output encoding change the authors and subjects that git outputs
+    if lines[0] != 'false' or lines[1] != 'false' or _has_config(r'^(mailmap|i18n)\.', repo):
+      return None
+    # (relative to the repo's path)
+    common_dir, top = os.path.join(repo or '', lines[2]), os.path.join(repo or '', lines[3])
+    shas = lines[4:]
+
+    if (os.path.exists(os.path.join(top, '.mailmap')) or os.path.exists(os.path.join(common_dir, 'info', 'grafts'))
+        or _has_replace_refs(common_dir) or any(len(sha) != 40 for sha in shas)):
+      return None
+
+    objects_dir = os.path.join(common_dir, 'objects')
+    store = ObjectStore(objects_dir)
+    try:
+      store.load_packs()
+    except ValueError:
+      return None
+
+    graph = CommitGraph.load(objects_dir)
+    codewerdz.debug("Object Store : {} packs{}".format(
+      len(store.packs), ", commit-graph" if graph is not None else ""))
+
+    if len(shas) == 2:
+      return ObjectStoreLog(store, shas[1:], shas[:1], limit=limit, graph=graph)
+    return ObjectStoreLog(store, shas, limit=limit, graph=graph)
+
+  def iterate_commits(self):
+    """Returns an iterator of commit hashes, as produced by GitLogParser.parse (but without stats or diffs)."""
+    count = 0
+    walk = self._walk_range() if self.excluded_heads else self._walk()
+    for sha, (tree, parents, _) in walk:
+      # --no-merges
+      if len(parents) > 1:
+        continue
+      # --follow leaves out the commits without changes
+      if tree == (self._header(parents[0])[0] if parents else EMPTY_TREE):
+        continue
+
+      if self.limit is not None and count >= self.limit:
+        return
+      yield self._commit_hash(sha)
+      count += 1
+
+  def _walk(self):
+    """Yields the (sha, header) of the commits in the order git walks them."""
+    order = itertools.count()
+    queue = []
+    for sha in set(self.heads):
+      self.headers[sha] = self._load(sha)
+    for sha in _by_date(self.heads, self.headers):
+      heapq.heappush(queue, (-self.headers[sha][2], next(order), sha))
+    seen = set(self.heads)
+
+    while queue:
+      _, _, sha = heapq.heappop(queue)
+      header = self.headers[sha]
+      for parent in header[1]:
+        if parent not in seen:
+          seen.add(parent)
+          self.headers[parent] = self._load(parent)
+          heapq.heappush(queue, (-self.headers[parent][2], next(order), parent))
+
+      yield sha, header
+      # NOTE: the headers of the commits in the queue are kept, those of the walked ones are
+      # only needed (by _header) for the children walked after them, when dates are skewed
+      del self.headers[sha]
+      self.objects.pop(sha, None)
+
+  def _walk_range(self):
+    """Yields the (sha, header) of the commits in the order git walks a range (see limit_list in git's revision.c)."""
+    # NOTE: the headers of every commit reached ("parsed") are kept, as git marks the history
+    # below an uninteresting commit through the parents it has parsed
+    uninteresting = set()
+    for sha in self.excluded_heads + self.heads:
+      if sha not in self.headers:
+        self.headers[sha] = self._load(sha)
+      if sha in self.excluded_heads:
+        uninteresting.add(sha)
+        self._mark_parents(sha, uninteresting)
+
+    order = itertools.count()
+    queue = []
+    seen = set()
+    for sha in _by_date(self.excluded_heads + self.heads, self.headers):
+      seen.add(sha)
+      heapq.heappush(queue, (-self.headers[sha][2], next(order), sha))
+    queued = set(seen)
+
+    walked = []
+    date = None
+    slop = self.SLOP
+    # a commit of the queue last found interesting, which is usually still there (and interesting)
+    interesting = None
+    while queue:
+      _, _, sha = heapq.heappop(queue)
+      queued.discard(sha)
+      _, parents, commit_date = self.headers[sha]
+      for parent in parents:
+        if sha in uninteresting:
+          uninteresting.add(parent)
+        if parent not in self.headers:
+          self.headers[parent] = self._load(parent)
+        if sha in uninteresting:
+          self._mark_parents(parent, uninteresting)
+        if parent not in seen:
+          seen.add(parent)
+          queued.add(parent)
+          heapq.heappush(queue, (-self.headers[parent][2], next(order), parent))
+
+      if sha in uninteresting:
+        self._mark_parents(sha, uninteresting)
+        if not queue:
+          break
+        if interesting not in queued or interesting in uninteresting:
+          interesting = next((entry for entry in queued if entry not in uninteresting), None)
+        if (date is not None and date <= -queue[0][0]) or interesting is not None:
+          slop = self.SLOP
+        else:
+          slop -= 1
+        if not slop:
+          break
+        continue
+
+      date = commit_date
+      walked.append(sha)
+
+    walked = [sha for sha in walked if sha not in uninteresting]
+    self.objects = dict((sha, self.objects[sha]) for sha in walked if sha in self.objects)
+    for sha in walked:
+      yield sha, self.headers[sha]
+
+  def _mark_parents(self, sha, uninteresting):
+    """Marks the parents of a commit uninteresting, and the parents of those that were reached."""
+    pending = list(self.headers[sha][1]) if sha in self.headers else []
+    while pending:
+      parent = pending.pop()
+      if parent not in uninteresting:
+        uninteresting.add(parent)
+        pending.extend(self.headers[parent][1] if parent in self.headers else [])
+
+  def _header(self, sha):
+    """Returns the (tree, parents, date) of a commit."""
+    header = self.headers.get(sha)
+    if header is None:
+      header = self._load(sha)
+      self.objects.pop(sha, None)
+    return header
+
+  def _load(self, sha):
+    if self.graph is not None:
+      position = self.graph.find(sha)
+      if position is not None:
+        return self.graph.commit(position)
+    self.objects[sha] = self.store.read(sha)
+    return _parse_header(self.objects[sha][1])
+
+  def _read_commit(self, sha):
+    """Returns the header fields and message of a commit, the latter reencoded to UTF-8 (as git log does)."""
+    object_type, data = self.objects.pop(sha, None) or self.store.read(sha)
+    if object_type != b'commit':
+      raise ValueError("Not a commit: {}".format(sha))
+
+    header, _, message = data.partition(b'\n\n')
+    fields = _header_fields(header)
+    encoding = fields.get(b'encoding', [None])[0]
+    if encoding and encoding.lower() not in (b'utf-8', b'utf8'):
+      try:
+        header, _, message = data.decode(encoding).encode('utf-8').partition(b'\n\n')
+        fields = _header_fields(header)
+      except (LookupError, UnicodeError):
+        pass
+    return fields, message
+
+  def _commit_hash(self, sha):
+    fields, message = self._read_commit(sha)
+    author, email, date, date_iso = _parse_ident(fields.get(b'author', [b''])[0])
+    commit_date, commit_date_iso = _parse_ident(fields.get(b'committer', [b''])[0])[2:]
+    return {
+      'sha': sha,
+      'author': author,
+      'email': email,
+      'date': date,
+      'date_iso': date_iso,
+      'commit_date': commit_date,
+      'commit_date_iso': commit_date_iso,
+      'parent': ' '.join(fields.get(b'parent', [])),
+      'tree': fields.get(b'tree', [''])[0],
+      'subject': _subject(message),
+      'stats': [],
+      'diffs': []
+    }
+
+
+def _by_date(shas, headers):
+  """Returns the (distinct) commits, newest first, and in the given order among equal dates."""
+  distinct = []
+  for sha in shas:
+    if sha not in distinct:
+      distinct.append(sha)
+  return sorted(distinct, key=lambda sha: -headers[sha][2])
+
+
+def _header_fields(header):
+  """Returns the values of each field of a commit's header, up to its message."""
+  fields = {}
+  for line in header.split(b'\n'):
+    if not line:
+      break
+    name, _, value = line.partition(b' ')
+    fields.setdefault(name, []).append(value)
+  return fields
+
+
+def _parse_header(data):
+  """Returns the (tree, parents, date) of a commit's header, the date as git reads it for walking."""
+  fields = _header_fields(data)
+  committer = fields.get(b'committer', [b''])[0]
+  date = committer.partition(b'>')[2].lstrip()
+  digits = len(date) - len(date.lstrip(b'0123456789'))
+  return fields[b'tree'][0], fields.get(b'parent', []), int(date[:digits] or 0)
+
+
+def _parse_ident(ident):
+  """Returns the (name, email, timestamp, ISO date) of an author or committer, as git log formats them."""
+  mail_begin = ident.find(b'<')
+  mail_end = ident.find(b'>', mail_begin + 1)
+  if mail_begin < 0 or mail_end < 0:
+    # git formats nothing for a broken ident
+    return '', '', '', ''
+  name = ident[:mail_begin].rstrip(GIT_SPACE)
+  email = ident[mail_begin + 1:mail_end]
+
+  # NOTE: the date follows the last '>', in case the email is broken
+  date = IDENT_DATE.match(ident, ident.rfind(b'>') + 1)
+  timestamp, timezone = (int(date.group(1)), int(date.group(2))) if date else (0, 0)
+  return name, email, str(timestamp), _iso_date(timestamp, timezone)
+
+
+def _iso_date(timestamp, timezone):
+  """Formats a timestamp in a (git) timezone, like `+0200` as 200, the way git's %ai does."""
+  minutes = abs(timezone) // 100 * 60 + abs(timezone) % 100
+  local = time.gmtime(timestamp + (minutes if timezone >= 0 else -minutes) * 60)
+  return '%04d-%02d-%02d %02d:%02d:%02d %+05d' % (local[:6] + (timezone,))
+
+
+def _subject(message):
+  """Returns the first paragraph of a commit message, its lines joined by spaces (as git's %s)."""
+  lines = []
+  for line in message.split(b'\n'):
+    line = line.rstrip(GIT_SPACE)
+    if line:
+      lines.append(line)
+    elif lines:
+      break
+  return b' '.join(lines)
+
+
+def _has_config(pattern, repo=None):
+  try:
+    return bool(list(GitProcess(repo).get_lines('config', ['--get-regexp', pattern])))
+  except CalledProcessError as e:
+    # NOTE: `git config --get-regexp` exits with 1 when no key matches
+    return e.returncode != 1
+
+
+def _has_replace_refs(common_dir):
+  for _, _, files in os.walk(os.path.join(common_dir, 'refs', 'replace')):
+    if files:
+      return True
+
+  packed_refs = os.path.join(common_dir, 'packed-refs')
+  if os.path.exists(packed_refs):
+    with open(packed_refs) as f:
+      return any(' refs/replace/' in line for line in f)
+  return False
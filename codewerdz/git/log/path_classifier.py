@@ -0,0 +1,96 @@
+import fnmatch
+import re
+from collections import OrderedDict
+
+from codewerdz.git.log.git_attributes import GitAttributes
+
+
+class PathClassifier(object):
+  """Classifies the file paths of diffs as docs, generated and/or binary.
+
+  All the docs patterns are compiled into a single regex, and the classification of the most
+  recently seen paths is remembered, as the same paths show up in diff after diff. The globs
+  match like fnmatch.fnmatch.
+
+  NOTE: excluded paths are left out by git (see GitLogProcess), whose pathspecs also limit the
+  commits walked, so they never reach the classifier.
+
+  When GitAttributes are given, `linguist-documentation` overrides the docs patterns for the
+  paths it is set or unset on, `linguist-generated` marks paths as GENERATED, and `-diff` (or
+  `binary`) marks paths as BINARY.
+  """
+
+  DOCS = 1
+  GENERATED = 2
+  BINARY = 4
+
+  # number of paths whose classification is remembered
+  CACHE_SIZE = 8192
+
+  def __init__(self, docs_pattern, attributes=None, cache_size=CACHE_SIZE):
+    """
+    Args:
+        docs_pattern: A sequence of glob patterns matching doc files.
+        attributes: The GitAttributes of the repository. Default None
+        cache_size: The number of paths whose classification is remembered. Default CACHE_SIZE
+    """
+    self.docs_regex = _compile_globs(docs_pattern)
+    self.attributes = attributes
+    self.cache_size = cache_size
+    self.cache = OrderedDict()
+
+  def classify(self, path):
+    """Returns the DOCS, GENERATED and BINARY flags of path, or'ed together."""
+    cache = self.cache
+    try:
+      flags = cache.pop(path)
+    except KeyError:
+      flags = self._classify(path)
+      if len(cache) >= self.cache_size:
+        # forget the least recently used path
+        cache.popitem(last=False)
+    cache[path] = flags
+    return flags
+
+  def is_doc_file(self, path):
+    return bool(path) and bool(self.classify(path) & self.DOCS)
+
+  def is_generated(self, path):
+    return bool(path) and bool(self.classify(path) & self.GENERATED)
+
+  def is_binary(self, path):
+    return bool(path) and bool(self.classify(path) & self.BINARY)
+
+  def _classify(self, path):
+    flags = 0
+
+    documentation = self.attributes.is_set(path, GitAttributes.DOCUMENTATION) if self.attributes else None
+    if documentation is None:
+      documentation = self.docs_regex is not None and self.docs_regex.match(path) is not None
+    if documentation:
+      flags |= self.DOCS
+
+    if self.attributes and self.attributes.is_set(path, GitAttributes.GENERATED):
+      flags |= self.GENERATED
+
+    if self.attributes and self.attributes.get(path, GitAttributes.DIFF) is False:
+      flags |= self.BINARY
+
+    return flags
+
+
+def _compile_globs(patterns):
+  """Returns a single compiled regex matching any of the fnmatch patterns, or None."""
+  if not patterns:
+    return None
+  return re.compile('(?:{})'.format('|'.join(_translate(pattern) for pattern in patterns)) + r'\Z', re.S)
+
+
+def _translate(pattern):
+  regex = fnmatch.translate(pattern)
+  # python 2 appends '\Z(?ms)' to the regex, python 3 wraps it in '(?s:...)\Z'
+  if regex.endswith('(?ms)'):
+    regex = regex[:-len('(?ms)')]
+  if regex.endswith(r'\Z'):
+    regex = regex[:-len(r'\Z')]
+  return '(?:{})'.format(regex)
@@ -0,0 +1,89 @@
+import collections
+
+import codewerdz
+from codewerdz.git.log.git_log_parser import GitLogParser
+from codewerdz.git.log.git_log_process import GitLogProcess
+from codewerdz.git.log.git_rev_list_process import GitRevListProcess
+
+
+class ShardedGitLog(object):
+  """Runs `git log` over shards of the history in a pool of worker processes.
+
+  The commits that a serial GitLogProcess would visit are listed up front with `git rev-list`,
+  split into contiguous shards, and each shard is run through its own GitLogProcess and
+  (a copy of the given) GitLogParser in a worker process. Shards are yielded back in their original order, so the
+  resulting commits are identical to (and in the same order as) a serial run.
+  """
+
+  # upper bound on the number of commits handed to a worker at once
+  MAX_SHARD_SIZE = 250
+
+  # number of shards in flight per worker, bounds the memory held by finished shards
+  SHARDS_IN_FLIGHT_PER_JOB = 2
+
+  def __init__(self, jobs, parser=None, since=None, until=None, limit=None, excluded_paths=None, revisions=None,
+               repo=None):
+    self.jobs = jobs
+    self.parser = parser or GitLogParser()
+    self.since = since
+    self.until = until
+    self.limit = limit
+    self.excluded_paths = excluded_paths
+    self.revisions = revisions
+    self.repo = repo
+
+  def iterate_commits(self):
+    """Returns an iterator of commit hashes, as produced by GitLogParser.parse."""
+    rev_list = GitRevListProcess(since=self.since, until=self.until, limit=self.limit,
+                                 excluded_paths=self.excluded_paths, revisions=self.revisions, repo=self.repo)
+    shas = list(rev_list.get_lines())
+    return self.iterate_shards(self.split(shas))
+
+  def split(self, shas):
+    """Splits a list of commit ids into contiguous shards, at least one per job."""
+    if not shas:
+      return []
+    shard_size = max(1, min(self.MAX_SHARD_SIZE, -(-len(shas) // self.jobs)))
+    return [shas[i:i + shard_size] for i in range(0, len(shas), shard_size)]
+
+  def iterate_shards(self, shards):
+    """Parses each shard in the worker pool and yields its commits in shard order."""
+    if not shards:
+      return
+
+    codewerdz.debug("Shards       : {} ({} jobs)".format(len(shards), self.jobs))
+
+    import multiprocessing
+    pool = multiprocessing.Pool(self.jobs)
+    try:
+      pending = collections.deque()
+      shards = iter(shards)
+      max_in_flight = self.jobs * self.SHARDS_IN_FLIGHT_PER_JOB
+
+      for shard in shards:
+        pending.append(pool.apply_async(_parse_shard, (self._shard_task(shard),)))
+        if len(pending) >= max_in_flight:
+          break
+
+      while pending:
+        commits = pending.popleft().get()
+        for shard in shards:
+          pending.append(pool.apply_async(_parse_shard, (self._shard_task(shard),)))
+          break
+        for commit in commits:
+          yield commit
+
+      pool.close()
+    finally:
+      pool.terminate()
+      pool.join()
+
+  def _shard_task(self, shard):
+    return (shard, self.parser, self.excluded_paths, self.repo)
+
+
+def _parse_shard(task):
+  """Worker entry point: runs git log over one shard and returns its parsed commits as a list."""
+  shard, parser, excluded_paths, repo = task
+  log = GitLogProcess(excluded_paths=excluded_paths, commits=shard, repo=repo)
+  return list(parser.parse(log.get_lines()))
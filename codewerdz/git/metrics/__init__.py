@@ -51,7 +51,29 @@ EMPTY_CONTRIBUTOR_METRICS = {
 
 EMPTY_REPO_METRICS.update(EMPTY_CONTRIBUTOR_METRICS)
 
-DEFAULT_METRICS = METRICS_CHOICES = EMPTY_REPO_METRICS.keys()
+DEFAULT_METRICS = EMPTY_REPO_METRICS.keys()
+
+# metrics that are only output when asked for: quantiles of the values of commits (see QuantileSketch)
+QUANTILE_METRICS = [
+  'docs_density_p50', 'docs_density_p90', 'docs_density_p99',
+  'code_density_p50', 'code_density_p90', 'code_density_p99',
+  'docs_to_code_p50', 'docs_to_code_p90', 'docs_to_code_p99'
+]
+
+# and the top contributors of buckets, by commits, chars of docs and chars of code (see HeavyHitters)
+TOP_CONTRIBUTOR_METRICS = [
+  'top_contributors_by_commits', 'top_contributors_by_docs_chars', 'top_contributors_by_code_chars'
+]
+
+EXTRA_METRICS = QUANTILE_METRICS + TOP_CONTRIBUTOR_METRICS
+
+# the number of top contributors output
+DEFAULT_TOP_CONTRIBUTORS = 10
+
+METRICS_CHOICES = DEFAULT_METRICS + EXTRA_METRICS
+
+# the metrics that need only the commits' metadata (authors and dates), not their stats
+METADATA_METRICS = ['commit_count', 'contributor_count', 'contributor_stats', 'top_contributors_by_commits']
 
 EMPTY_METRICS_PRECISIONS = {
   'total': copy.deepcopy(EMPTY_REPO_METRICS),
@@ -61,4 +83,9 @@ EMPTY_METRICS_PRECISIONS = {
   'daily': {}
 }
 
-DEFAULT_PRECISION = PRECISION_CHOICES = EMPTY_METRICS_PRECISIONS.keys()
+DEFAULT_PRECISION = EMPTY_METRICS_PRECISIONS.keys()
+
+# precisions that are only output when asked for (see TimeBuckets)
+EXTRA_PRECISIONS = ['quarterly', 'isoweekly', 'hourly']
+
+PRECISION_CHOICES = DEFAULT_PRECISION + EXTRA_PRECISIONS
@@ -0,0 +1,181 @@
+import codewerdz
+import codewerdz.git.metrics
+
+from codewerdz.git.log.commit_stats_cache import CommitStatsCache
+from codewerdz.git.log.commits import iterate_commit_metadata, iterate_commits
+from codewerdz.git.log.git_attributes import GitAttributes
+from codewerdz.git.metrics.analysis_state import AnalysisState, head_commit, resolve_dates
+from codewerdz.git.metrics.columnar_commit_analyzer import ColumnarCommitAnalyzer
+from codewerdz.git.metrics.commit_analyzer import CommitAnalyzer
+from codewerdz.git.profiler import Profiler, profiled_stage
+
+# folds each commit into the metrics as it's parsed (streaming), or collects the commits into
+# columns and aggregates them at the end (columnar, faster on long histories at fine precisions)
+ANALYZERS = {
+  'streaming': CommitAnalyzer,
+  'columnar': ColumnarCommitAnalyzer
+}
+
+
+def analyze(options, analyzer, timezone, metrics_precision, metric, incremental=None, lazy=False, repo=None):
+  """Returns the metrics of a repo (see CommitAnalyzer.finalize_metrics), and the number of commits analyzed.
+
+  Args:
+      options: The CLI's options (see cli), e.g. docs_pattern, date_range_start and jobs, and the
+        metrics command's contributor_error and top_contributors (see CommitAnalyzer).
+      analyzer: The name of the analyzer, one of ANALYZERS.
+      timezone: The timezone commits are bucketed in, see TimeBuckets.
+      metrics_precision: The precisions to output.
+      metric: The metrics to output.
+      incremental: The path of the analysis state to resume from, and save. Default None
+      lazy: Whether to finalize the buckets of each precision as they are looked up, see FinalizedBuckets. Default False
+      repo: The path of the repo. Default None (the current directory's)
+  """
+  analyzer = ANALYZERS[analyzer](timezone, options.get('contributor_error'),
+                                 options.get('top_contributors') or codewerdz.git.metrics.DEFAULT_TOP_CONTRIBUTORS)
+  counter = {'commits': 0}
+
+  if incremental:
+    with profiled_stage('analyze'):
+      analysis_results = analyze_incrementally(analyzer, incremental, options, metrics_precision, metric, timezone,
+                                               counter, lazy, repo)
+  elif set(metric) <= set(codewerdz.git.metrics.METADATA_METRICS):
+    # Read the Commits' Metadata only, as no metric needs their stats
+    commits = iterate_commit_metadata(
+      options['date_range_start'],
+      options['date_range_end'],
+      options['commits_limit'],
+      options['exclude_path'],
+      repo=repo
+    )
+  else:
+    # Iterate Log and Parse Commits
+    commits = iterate_commits(
+      options['docs_pattern'],
+      options['comments_are_docs'],
+      options['date_range_start'],
+      options['date_range_end'],
+      options['commits_limit'],
+      options['exclude_path'],
+      options['jobs'],
+      options['cache'],
+      diff_parser=options['diff_parser'],
+      diff_lines=False,
+      max_diff_bytes=options['max_diff_bytes'],
+      max_diff_lines=options['max_diff_lines'],
+      skip_generated=options['skip_generated'],
+      job_mode=options['job_mode'],
+      job_chunk_size=options['job_chunk_size'],
+      repo=repo
+    )
+
+  if not incremental:
+    # Analyze Commits
+    with profiled_stage('analyze'):
+      accumulators = analyzer.aggregate_commits(count_commits(commits, counter), metrics_precision, metric)
+      analysis_results = analyzer.finalize_metrics(accumulators, metric, lazy)
+
+  profiler = Profiler.current()
+  if profiler is not None:
+    profiler.count('analyze', items=counter['commits'])
+
+  return analysis_results, counter['commits']
+
+
+def count_commits(commits, counter):
+  """Yields the commits, counting them in counter['commits']."""
+  for commit in commits:
+    counter['commits'] += 1
+    yield commit
+
+
+def analyze_incrementally(analyzer, state_path, options, metrics_precision, metric, timezone, counter, lazy=False,
+                          repo=None):
+  """Analyzes the commits since the run that saved the state at state_path, and saves the new state."""
+  if options['commits_limit']:
+    raise ValueError("A commits limit can't be combined with an incremental analysis.")
+
+  # (the dates the bounds resolve to, which change with relative bounds, e.g. '2 weeks ago')
+  date_range_start, date_range_end = resolve_dates(options['date_range_start'], options['date_range_end'], repo)
+  settings = {
+    'docs_pattern': sorted(options['docs_pattern']),
+    'comments_are_docs': options['comments_are_docs'],
+    'exclude_path': sorted(options['exclude_path']),
+    'attributes': GitAttributes.load(repo).fingerprint(),
+    'stats_version': CommitStatsCache.VERSION,
+    'timezone': timezone,
+    'date_range_start': date_range_start,
+    'date_range_end': date_range_end
+  }
+  if options['skip_generated']:
+    # (only set when skipping, so that the states saved without it can still be resumed)
+    settings['skip_generated'] = True
+  head = head_commit(repo)
+
+  # the quantiles are only accumulated once they are asked for
+  # NOTE: the top contributors are ranked from the contributors, which the state always keeps
+  extra_metrics = set(name for name in metric if name in codewerdz.git.metrics.QUANTILE_METRICS)
+
+  state = AnalysisState.load(state_path)
+  if state and any(name not in state.metrics for name in metrics_precision):
+    codewerdz.info("Precisions were added since the last incremental run, rebuilding metrics.")
+    precisions = set(state.metrics) | set(metrics_precision)
+    extra_metrics |= set(state.settings.get('extra_metrics', []))
+    state = None
+  else:
+    precisions = set(codewerdz.git.metrics.DEFAULT_PRECISION) | set(metrics_precision)
+
+  if state:
+    saved_extra_metrics = set(state.settings.get('extra_metrics', []))
+    if not extra_metrics <= saved_extra_metrics:
+      codewerdz.info("Metrics were added since the last incremental run, rebuilding metrics.")
+      state = None
+    extra_metrics |= saved_extra_metrics
+  if extra_metrics:
+    # (only set with extra metrics, so that the states saved without them can still be resumed)
+    settings['extra_metrics'] = sorted(extra_metrics)
+  metric_names = list(codewerdz.git.metrics.DEFAULT_METRICS) + sorted(extra_metrics)
+
+  if state and state.can_resume(settings, head, repo):
+    codewerdz.debug("Resuming     : {}..{}".format(state.head, head))
+    revisions = ['{}..{}'.format(state.head, head)]
+    previous = analyzer.import_metrics(state.metrics)
+    precisions = set(previous)
+  else:
+    # accumulate every (default) metric, and the default precisions, so later runs can output any of them
+    state = AnalysisState(None, settings, None)
+    revisions = [head]
+    previous = None
+  accumulators = analyzer.empty_metrics(precisions, metric_names)
+
+  commits = iterate_commits(
+    options['docs_pattern'],
+    options['comments_are_docs'],
+    options['date_range_start'],
+    options['date_range_end'],
+    None,
+    options['exclude_path'],
+    options['jobs'],
+    options['cache'],
+    revisions,
+    diff_parser=options['diff_parser'],
+    diff_lines=False,
+    max_diff_bytes=options['max_diff_bytes'],
+    max_diff_lines=options['max_diff_lines'],
+    skip_generated=options['skip_generated'],
+    job_mode=options['job_mode'],
+    job_chunk_size=options['job_chunk_size'],
+    repo=repo
+  )
+  analyzer.accumulate_commits(accumulators, count_commits(commits, counter), metric_names)
+  if previous is not None:
+    # the log is read newest first, so a full run sees the contributors of the new commits first:
+    # the previous contributors of each bucket are merged after them, which keeps that order
+    analyzer.merge_metrics(accumulators, previous)
+
+  state.head = head
+  state.metrics = analyzer.export_metrics(accumulators)
+  state.save(state_path)
+
+  metrics = dict((name, accumulators[name]) for name in metrics_precision)
+  return analyzer.finalize_metrics(metrics, metric, lazy)
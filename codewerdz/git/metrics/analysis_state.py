@@ -0,0 +1,113 @@
+import json
+import os
+from subprocess import CalledProcessError
+
+import codewerdz
+from codewerdz.git.process.git_process import GitProcess
+
+
+class AnalysisState(object):
+  """The unfinalized accumulators of a CommitAnalyzer, saved between incremental metrics runs.
+
+  Alongside the accumulators (see CommitAnalyzer.export_metrics), the state records the HEAD
+  commit they were built from and the settings they were built with. A later run on the same
+  settings only needs to fold the commits in `head..HEAD` into them, as long as the old head
+  is still an ancestor of the new one (i.e. history wasn't rewritten).
+  """
+
+  VERSION = 4
+
+  def __init__(self, head, settings, metrics):
+    self.head = head
+    self.settings = settings
+    self.metrics = metrics
+
+  @staticmethod
+  def load(path):
+    """Loads the state saved at path. Returns None if there is no (usable) saved state."""
+    if not os.path.exists(path):
+      return None
+
+    try:
+      with open(path) as f:
+        data = _encode_strings(json.load(f))
+    except ValueError:
+      codewerdz.info("WARNING: Ignoring unreadable incremental state: {}".format(path))
+      return None
+
+    if data.get('version') != AnalysisState.VERSION:
+      return None
+    return AnalysisState(data['head'], data['settings'], data['metrics'])
+
+  def save(self, path):
+    """Saves the state to path, replacing any previously saved state atomically."""
+    data = {
+      'version': self.VERSION,
+      'head': self.head,
+      'settings': self.settings,
+      'metrics': self.metrics
+    }
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+      json.dump(data, f, sort_keys=True, separators=(',', ':'))
+    os.rename(temp_path, path)
+
+  def can_resume(self, settings, head, repo=None):
+    """Returns True if this state can be brought up to date with head by folding in `self.head..head` (of the repo
+    at path repo, default the current directory's)."""
+    if self.settings != _encode_strings(json.loads(json.dumps(settings))):
+      codewerdz.info("Settings changed since the last incremental run, rebuilding metrics.")
+      return False
+
+    if self.head != head and not is_ancestor(self.head, head, repo):
+      codewerdz.info("History was rewritten since the last incremental run, rebuilding metrics.")
+      return False
+
+    return True
+
+
+def head_commit(repo=None):
+  """Returns the full SHA of the HEAD commit of the repo at path repo (default the current directory's)."""
+  return list(GitProcess(repo).get_lines("rev-parse", ["HEAD"]))[0]
+
+
+def resolve_dates(since, until, repo=None):
+  """Returns the unix timestamps git resolves since and until to (None when there's no bound).
+
+  The same bound can mean another date on each run, e.g. '2 weeks ago' (or a day without a
+  time, which git completes with the current time), so states record what it resolved to."""
+  params = []
+  if since:
+    params.append('--since={}'.format(since))
+  if until:
+    params.append('--until={}'.format(until))
+  if not params:
+    return None, None
+
+  resolved = {}
+  for line in GitProcess(repo).get_lines('rev-parse', params):
+    name, _, value = line.partition('=')
+    resolved[name] = int(value)
+  return resolved.get('--max-age'), resolved.get('--min-age')
+
+
+def is_ancestor(ancestor, commit, repo=None):
+  """Returns True if ancestor is an ancestor of (or the same as) commit, in the repo at path repo (default the
+  current directory's)."""
+  try:
+    list(GitProcess(repo).get_lines("merge-base", ["--is-ancestor", ancestor, commit]))
+  except CalledProcessError:
+    # exits with 1 when it's not an ancestor, and 128 when ancestor doesn't exist (anymore)
+    return False
+  return True
+
+
+def _encode_strings(value):
+  # json loads strings as unicode, but the accumulators are keyed by the (utf-8) str git outputs
+  if isinstance(value, dict):
+    return dict((_encode_strings(k), _encode_strings(v)) for k, v in value.items())
+  if isinstance(value, list):
+    return [_encode_strings(v) for v in value]
+  if isinstance(value, unicode):
+    return value.encode('utf-8')
+  return value
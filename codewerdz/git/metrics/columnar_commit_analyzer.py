@@ -0,0 +1,297 @@
+from collections import OrderedDict
+
+import codewerdz.git.metrics
+from codewerdz.git.metrics.commit_analyzer import CommitAnalyzer
+from codewerdz.git.metrics.commit_table import CommitTable
+from codewerdz.git.metrics.contributor_sketch import ContributorSketch
+from codewerdz.git.metrics.heavy_hitters import HeavyHitters
+from codewerdz.git.metrics.metrics_accumulator import (AVERAGES, QUANTILES, SUM_SCALE, TOP_CONTRIBUTORS,
+                                                      MetricsAccumulator)
+from codewerdz.git.metrics.quantile_sketch import QuantileSketch
+
+# NumPy (imported by the first aggregation, see _import_numpy), None when it's not installed
+numpy = False
+
+# the column each field sums up
+SUMS = {
+  'code_count': 'code',
+  'docs_count': 'docs',
+  'only_code_count': 'only_code',
+  'only_docs_count': 'only_docs',
+  'chars_changed_count': 'chars_changed',
+  'code_chars_count': 'chars_of_code',
+  'docs_chars_count': 'chars_of_docs',
+}
+
+# the column of each max field, and the value that is thrown out (None keeps all values)
+MAXES = {
+  'docs_density_max': ('docs_density', 1.0),
+  'code_density_max': ('code_density', 1.0),
+  'docs_to_code_max': ('docs_to_code', None),
+}
+
+# the column of each min field (0.0 values are thrown out)
+MINS = {
+  'docs_density_min': 'docs_density',
+  'code_density_min': 'code_density',
+  'docs_to_code_min': 'docs_to_code',
+}
+
+# the column of each sum of the values of an average (see SUM_SCALE)
+VALUE_SUMS = {
+  'docs_density_sum': 'docs_density',
+  'code_density_sum': 'code_density',
+  'docs_to_code_sum': 'docs_to_code',
+}
+
+# the column of each sketch of the values of quantiles
+SKETCHES = {
+  'docs_density_sketch': 'docs_density',
+  'code_density_sketch': 'code_density',
+  'docs_to_code_sketch': 'docs_to_code',
+}
+
+# the column weighing contributors in each contributor field ranking top contributors (None weighs 1)
+TOP_WEIGHTS = {
+  'commit_count': None,
+  'docs_chars_count': 'chars_of_docs',
+  'code_chars_count': 'chars_of_code',
+}
+
+
+class ColumnarCommitAnalyzer(CommitAnalyzer):
+  """A CommitAnalyzer that computes metrics with sort-and-reduce passes over a CommitTable.
+
+  Instead of folding each commit into the buckets of every precision, the commits are first
+  collected into columns. The rows of each precision (and of each contributor in it) are then
+  grouped by a stable sort on their bucket key, and every field is reduced per group, with
+  NumPy when it's available. A stable sort keeps the commits of a group in their original
+  order, so the first-seen order of contributors comes out exactly as CommitAnalyzer computes it
+  (the other fields don't depend on the order).
+
+  NOTE: Only aggregate_commits is columnar. Accumulating more commits into existing metrics
+  (i.e. incremental runs) goes through CommitAnalyzer.
+  """
+
+  def aggregate_commits(self, commits, metrics_precisions, metric_names):
+    _import_numpy()
+    updater = self.updater(metric_names)
+    precisions = [name for name in codewerdz.git.metrics.PRECISION_CHOICES if name in metrics_precisions]
+    table = CommitTable.collect(commits, [name for name in precisions if name != 'total'],
+                                updater.tracks_contributors or updater.sketches_contributors or
+                                updater.summarizes_top_contributors, self.time_buckets)
+    columns = _Columns(table)
+
+    metrics = {}
+    for name in precisions:
+      buckets = self._aggregate(table, columns, name, updater)
+      metrics[name] = buckets.get('', updater.new_accumulator()) if name == 'total' else buckets
+    return metrics
+
+  def _aggregate(self, table, columns, precision, updater):
+    """Returns the accumulators of each bucket of precision, keyed like CommitAnalyzer does."""
+    keys = columns.bucket_keys(precision)
+
+    buckets = {}
+    groups = _Groups(columns, keys)
+    for start, accumulator in zip(groups.starts, groups.accumulators(updater.fields)):
+      if updater.tracks_contributors:
+        accumulator.contributors = OrderedDict()
+      buckets[_bucket_name(table, precision, groups.first_rows[start])] = accumulator
+
+    if updater.sketches_contributors:
+      contributor_hashes = [self.contributor_hash(contributor) for contributor in table.contributors]
+      for start, sketch in zip(groups.starts, groups.contributor_sketches(updater.contributor_precision,
+                                                                          contributor_hashes)):
+        buckets[_bucket_name(table, precision, groups.first_rows[start])].contributor_sketch = sketch
+
+    if updater.summarizes_top_contributors:
+      for summary, field in TOP_CONTRIBUTORS.values():
+        if field in updater.top_fields:
+          summaries = groups.heavy_hitters(updater.top_contributors, TOP_WEIGHTS[field], table.contributors)
+          for start, heavy_hitters in zip(groups.starts, summaries):
+            setattr(buckets[_bucket_name(table, precision, groups.first_rows[start])], summary, heavy_hitters)
+
+    if updater.tracks_contributors:
+      authors = columns.column('author')
+      contributor_keys = _combine(keys, authors, len(table.contributors))
+      groups = _Groups(columns, contributor_keys)
+
+      # insert the contributors of each bucket in the order they were first seen, like CommitAnalyzer
+      first_rows = groups.first_rows
+      contributor_groups = sorted(zip(groups.starts, groups.accumulators(updater.contributor_fields)),
+                                  key=lambda group: first_rows[group[0]])
+      for start, accumulator in contributor_groups:
+        row = first_rows[start]
+        bucket = buckets[_bucket_name(table, precision, row)]
+        bucket.contributors[table.contributors[table.author[row]]] = accumulator
+
+    return buckets
+
+
+def _import_numpy():
+  # (it takes longer to import than most runs take to start, so it's only imported when needed)
+  global numpy
+  if numpy is False:
+    try:
+      import numpy as module
+    except ImportError:
+      module = None
+    numpy = module
+
+
+def _bucket_name(table, precision, row):
+  """Returns the key CommitAnalyzer uses for the bucket of the commit in row."""
+  if precision == 'total':
+    return ''
+  return table.bucket_names[precision][table.buckets[precision][row]]
+
+
+def _combine(keys, authors, author_count):
+  """Returns the key of each (bucket key, author) pair."""
+  if numpy is not None:
+    return keys * author_count + authors
+  return [key * author_count + author for key, author in zip(keys, authors)]
+
+
+class _Columns(object):
+  """The columns of a CommitTable, as NumPy arrays when NumPy is available, else as the table's arrays."""
+
+  def __init__(self, table):
+    self.table = table
+    self.cache = {}
+
+  def column(self, name):
+    if name not in self.cache:
+      column = self.table.buckets[name] if name in self.table.buckets else getattr(self.table, name)
+      if numpy is not None:
+        # the arrays hold C longs ('l') or doubles ('d'), which NumPy can use without a copy
+        dtype = numpy.int_ if column.typecode == 'l' else numpy.float64
+        column = numpy.frombuffer(column, dtype=dtype) if len(column) else numpy.array([], dtype=dtype)
+      self.cache[name] = column
+    return self.cache[name]
+
+  def bucket_keys(self, precision):
+    """Returns an integer key per row, equal for the rows in the same bucket of precision."""
+    if precision != 'total':
+      return self.column(precision)
+    if numpy is not None:
+      return numpy.zeros(len(self.table), dtype=numpy.int_)
+    return [0] * len(self.table)
+
+
+class _Groups(object):
+  """The rows of the columns grouped by key: a stable sort by key, and the start of each group in it."""
+
+  def __init__(self, columns, keys):
+    self.columns = columns
+    if numpy is not None:
+      self.order = numpy.argsort(keys, kind='mergesort')
+      sorted_keys = keys[self.order]
+      self.starts = [0] + (numpy.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1).tolist() if len(keys) else []
+      order = self.order.tolist()
+    else:
+      self.order = order = sorted(range(len(keys)), key=keys.__getitem__)
+      self.starts = [i for i in range(len(order)) if i == 0 or keys[order[i]] != keys[order[i - 1]]]
+    self.ends = self.starts[1:] + [len(order)]
+    # the first row (in the original order) of each group, by its start
+    self.first_rows = dict((start, order[start]) for start in self.starts)
+
+  def accumulators(self, fields):
+    """Returns a MetricsAccumulator per group, with the given fields reduced from its rows."""
+    # the averages are accumulated as sums, and the quantiles as (their own) sketches
+    fields = set(AVERAGES.get(name, name) for name in fields if name not in QUANTILES)
+    columns = [(name, self.reduce(name)) for name in sorted(fields)]
+    accumulators = []
+    for i in range(len(self.starts)):
+      accumulator = MetricsAccumulator()
+      for name, values in columns:
+        setattr(accumulator, name, values[i])
+      accumulators.append(accumulator)
+    return accumulators
+
+  def reduce(self, name):
+    """Returns the value of field name for each group."""
+    if name == 'commit_count':
+      return [end - start for start, end in zip(self.starts, self.ends)]
+    if name in SUMS:
+      return self._reduce(SUMS[name], numpy.add if numpy is not None else sum)
+    if name in MAXES:
+      column, thrown_out = MAXES[name]
+      return self._reduce(column, numpy.maximum if numpy is not None else max, thrown_out, 0.0)
+    if name in MINS:
+      # values that are thrown out are replaced by inf, and groups without any other value are 0.0
+      return [0.0 if value == float('inf') else value
+              for value in self._reduce(MINS[name], numpy.minimum if numpy is not None else min, 0.0, float('inf'))]
+    if name in VALUE_SUMS:
+      return self._sums(VALUE_SUMS[name])
+    return self._sketches(SKETCHES[name])
+
+  def _reduce(self, column, function, thrown_out=None, replacement=None):
+    values = self._sorted(column)
+    if numpy is not None:
+      if thrown_out is not None:
+        values = numpy.where(values != thrown_out, values, replacement)
+      return function.reduceat(values, self.starts).tolist() if self.starts else []
+
+    if thrown_out is not None:
+      values = [replacement if value == thrown_out else value for value in values]
+    return [function(values[start:end]) for start, end in zip(self.starts, self.ends)]
+
+  def _sums(self, column):
+    # the sums are (unbounded) integers, see SUM_SCALE
+    values = self._sorted(column)
+    if numpy is not None:
+      values = values.tolist()
+    return [sum(int(value * SUM_SCALE) for value in values[start:end]) for start, end in zip(self.starts, self.ends)]
+
+  def contributor_sketches(self, precision, contributor_hashes):
+    """Returns a ContributorSketch of precision per group, of the contributors (hashes by author id) of its rows."""
+    authors, docs, code = [self._sorted(column) for column in ('author', 'docs', 'code')]
+    if numpy is not None:
+      authors, docs, code = authors.tolist(), docs.tolist(), code.tolist()
+
+    sketches = []
+    for start, end in zip(self.starts, self.ends):
+      sketch = ContributorSketch(precision)
+      for i in range(start, end):
+        sketch.add(contributor_hashes[authors[i]], docs[i], code[i])
+      sketches.append(sketch)
+    return sketches
+
+  def heavy_hitters(self, k, column, contributors):
+    """Returns a HeavyHitters of k per group, of the contributors (by author id) of its rows, weighed by column."""
+    authors = self._sorted('author')
+    weights = self._sorted(column) if column is not None else None
+    if numpy is not None:
+      authors = authors.tolist()
+      weights = weights.tolist() if weights is not None else None
+
+    summaries = []
+    for start, end in zip(self.starts, self.ends):
+      heavy_hitters = HeavyHitters(k)
+      for i in range(start, end):
+        weight = weights[i] if weights is not None else 1
+        if weight:
+          heavy_hitters.add(contributors[authors[i]], weight)
+      summaries.append(heavy_hitters)
+    return summaries
+
+  def _sketches(self, column):
+    values = self._sorted(column)
+    if numpy is not None:
+      values = values.tolist()
+
+    sketches = []
+    for start, end in zip(self.starts, self.ends):
+      sketch = QuantileSketch()
+      for value in values[start:end]:
+        sketch.add(value)
+      sketches.append(sketch)
+    return sketches
+
+  def _sorted(self, name):
+    column = self.columns.column(name)
+    if numpy is not None:
+      return column[self.order]
+    return [column[i] for i in self.order]
@@ -1,29 +1,101 @@
-import copy
 import codewerdz.git.metrics
 import codewerdz
-import datetime
-import iso8601
+
+try:
+  from collections.abc import Mapping
+except ImportError:
+  from collections import Mapping
+
+from codewerdz.git.metrics.contributor_sketch import ContributorSketch
+from codewerdz.git.metrics.metrics_accumulator import FIELDS, SUM_SCALE, TOP_CONTRIBUTORS, MetricsAccumulator
+from codewerdz.git.metrics.metrics_updater import CONTRIBUTOR_METRICS, MetricsUpdater
+from codewerdz.git.metrics.time_buckets import TimeBuckets
+
+# the contributor counts, in the order ContributorSketch.counts returns them
+CONTRIBUTOR_COUNTS = ['contributor_count', 'contributor_docs_count', 'contributor_code_count',
+                      'contributor_only_docs_count', 'contributor_only_code_count']
 
 
 class CommitAnalyzer(object):
-  def __init__(self):
-    pass
+  def __init__(self, timezone=TimeBuckets.TIMEZONE_COMMITTER, contributor_error=None,
+               top_contributors=codewerdz.git.metrics.DEFAULT_TOP_CONTRIBUTORS):
+    """
+    Args:
+        timezone: The timezone commits are bucketed in, see TimeBuckets. Default committer
+        contributor_error: The standard error of the counts of contributors, which are then
+          counted by ContributorSketches when no contributor list (or contributor_stats) is
+          output. Default None (contributors are counted exactly)
+        top_contributors: The number of contributors output by the top contributors metrics
+          (see HeavyHitters). Default 10
+    """
+    # the MetricsUpdater of each selection of metrics
+    self.updaters = {}
+    self.time_buckets = TimeBuckets(timezone)
+    self.top_contributors = top_contributors
+    self.contributor_precision = None
+    if contributor_error is not None:
+      self.contributor_precision = ContributorSketch.precision_for(contributor_error)
+    # the ContributorSketch.hash of each contributor
+    self.contributor_hashes = {}
 
   def analyze_commits(self, commits, metrics_precisions, metric_names):
+    return self.finalize_metrics(self.aggregate_commits(commits, metrics_precisions, metric_names), metric_names)
 
-    metrics = copy.deepcopy(codewerdz.git.metrics.EMPTY_METRICS_PRECISIONS)
+  def aggregate_commits(self, commits, metrics_precisions, metric_names):
+    """Returns the (unfinalized) accumulators of the commits in each of metrics_precisions, see finalize_metrics."""
+    metrics = self.empty_metrics(metrics_precisions, metric_names)
+    self.accumulate_commits(metrics, commits, metric_names)
+    return metrics
+
+  def updater(self, metric_names=None):
+    """Returns the MetricsUpdater for metric_names (None for all metrics)."""
+    key = frozenset(metric_names) if metric_names is not None else None
+    if key not in self.updaters:
+      self.updaters[key] = MetricsUpdater(metric_names, self.contributor_precision, self.top_contributors)
+    return self.updaters[key]
+
+  def contributor_hash(self, contributor):
+    """Returns the ContributorSketch.hash of a contributor, e.g. 'Ann <ann@example.com>'."""
+    contributor_hash = self.contributor_hashes.get(contributor)
+    if contributor_hash is None:
+      contributor_hash = self.contributor_hashes[contributor] = ContributorSketch.hash(contributor)
+    return contributor_hash
+
+  def empty_metrics(self, metrics_precisions, metric_names=None):
+    """Returns empty accumulators for the given precisions, see accumulate_commits."""
+    metrics = {}
+    for name in codewerdz.git.metrics.PRECISION_CHOICES:
+      if name in metrics_precisions:
+        metrics[name] = self.updater(metric_names).new_accumulator() if name == 'total' else {}
+    return metrics
 
-    total = get_precision('total', metrics, metrics_precisions)
-    yearly = get_precision('yearly', metrics, metrics_precisions)
-    monthly = get_precision('monthly', metrics, metrics_precisions)
-    weekly = get_precision('weekly', metrics, metrics_precisions)
-    daily = get_precision('daily', metrics, metrics_precisions)
+  def accumulate_commits(self, metrics, commits, metric_names=None):
+    """Folds the commits into the accumulators of each precision in metrics (see empty_metrics).
+
+    Only the fields metric_names (None for all metrics) depend on are updated. The accumulators
+    are left unfinalized, so more commits can be folded into them later."""
+    updater = self.updater(metric_names)
+    update = updater.update
+    new_accumulator = updater.new_accumulator
+    names_contributors = updater.tracks_contributors or updater.summarizes_top_contributors
+    sketches_contributors = updater.sketches_contributors
+    contributor_hash = self.contributor_hash
+
+    total = metrics.get('total')
+    precisions = [name for name in metrics if name != 'total']
+    buckets = [metrics[name] for name in precisions]
+    bucket_keys = self.time_buckets.keys
 
     for commit in commits:
       chars_changed = 0
       chars_of_code = 0
       chars_of_docs = 0
-      contributor = "{} <{}>".format(commit['author'], commit['email'])
+      contributor = None
+      hashed_contributor = None
+      if names_contributors or sketches_contributors:
+        contributor = "{} <{}>".format(commit['author'], commit['email'])
+        if sketches_contributors:
+          hashed_contributor = contributor_hash(contributor)
 
       # rollup stats from diffs
       for diff in commit['diffs']:
@@ -32,222 +104,180 @@ class CommitAnalyzer(object):
         chars_of_code += stats['chars_of_code']
         chars_of_docs += stats['chars_of_docs']
 
-      commit_metrics = copy.deepcopy(codewerdz.git.metrics.EMPTY_CONTRIBUTOR_METRICS)
-      commit_metrics['commit_count'] = 1
-
-      if chars_of_code > 0:
-        commit_metrics['code_count'] = 1
-        if chars_of_docs == 0:
-          commit_metrics['only_code_count'] = 1
-
-      if chars_of_docs > 0:
-        commit_metrics['docs_count'] = 1
-        if chars_of_code == 0:
-          commit_metrics['only_docs_count'] = 1
-
-      commit_metrics['chars_changed_count'] = chars_changed
-      commit_metrics['code_chars_count'] = chars_of_code
-      commit_metrics['docs_chars_count'] = chars_of_docs
-
-      commit_metrics['docs_density_avg'] = chars_of_docs / float(chars_changed) if chars_changed > 0 else 0.0
-      commit_metrics['docs_density_min'] = commit_metrics['docs_density_max'] = commit_metrics['docs_density_avg']
-
-      commit_metrics['code_density_avg'] = chars_of_code / float(chars_changed) if chars_changed > 0 else 0.0
-      commit_metrics['code_density_min'] = commit_metrics['code_density_max'] = commit_metrics['code_density_avg']
+      code = 1 if chars_of_code > 0 else 0
+      docs = 1 if chars_of_docs > 0 else 0
 
+      docs_density = chars_of_docs / float(chars_changed) if chars_changed > 0 else 0.0
+      code_density = chars_of_code / float(chars_changed) if chars_changed > 0 else 0.0
       # NOTE: Unlike others, if code == 0: value is 1.0
-      commit_metrics['docs_to_code_avg'] = chars_of_docs / float(chars_of_code) if chars_of_code > 0 else 1.0
-      commit_metrics['docs_to_code_min'] = commit_metrics['docs_to_code_max'] = commit_metrics['docs_to_code_avg']
+      docs_to_code = chars_of_docs / float(chars_of_code) if chars_of_code > 0 else 1.0
+
+      sample = (contributor, hashed_contributor, code, docs, code & (1 - docs), docs & (1 - code), chars_changed,
+                chars_of_code, chars_of_docs, docs_density, code_density, docs_to_code, int(docs_density * SUM_SCALE),
+                int(code_density * SUM_SCALE), int(docs_to_code * SUM_SCALE))
 
       if total is not None:
         # total stats
-        accumulate_metrics(total, commit_metrics, contributor)
-
-      year = commit['commit_date_iso'][:4]
-      if yearly is not None:
-        # yearly
-        if year not in yearly:
-          yearly[year] = copy.deepcopy(codewerdz.git.metrics.EMPTY_REPO_METRICS)
-        accumulate_metrics(yearly[year], commit_metrics, contributor)
-
-      if monthly is not None:
-         # monthly
-        month = "{0}-month{1:0>2}".format(year, month_of_year(commit['commit_date_iso']))
-        if month not in monthly:
-          monthly[month] = copy.deepcopy(codewerdz.git.metrics.EMPTY_REPO_METRICS)
-        accumulate_metrics(monthly[month], commit_metrics, contributor)
-
-      if weekly is not None:
-        # weekly
-        week = "{0}-week{1:0>2}".format(year, week_of_year(commit['commit_date_iso']))
-        if week not in weekly:
-          weekly[week] = copy.deepcopy(codewerdz.git.metrics.EMPTY_REPO_METRICS)
-        accumulate_metrics(weekly[week], commit_metrics, contributor)
-
-      if daily is not None:
-        # daily
-        day = "{0}-day{1:0>3}".format(year, day_of_year(commit['commit_date_iso']))
-        if day not in daily:
-          daily[day] = copy.deepcopy(codewerdz.git.metrics.EMPTY_REPO_METRICS)
-        accumulate_metrics(daily[day], commit_metrics, contributor)
-
-    if total is not None:
-      accumulate_contributor_metrics(total)
-      filter_metrics(total, metric_names)
-
-    if yearly is not None:
-      for year in yearly:
-        accumulate_contributor_metrics(yearly[year])
-        filter_metrics(yearly[year], metric_names)
-
-    if monthly is not None:
-      for month in monthly:
-        accumulate_contributor_metrics(monthly[month])
-        filter_metrics(monthly[month], metric_names)
-
-    if weekly is not None:
-      for week in weekly:
-        accumulate_contributor_metrics(weekly[week])
-        filter_metrics(weekly[week], metric_names)
-
-    if daily is not None:
-      for day in daily:
-        accumulate_contributor_metrics(daily[day])
-        filter_metrics(daily[day], metric_names)
-
+        update(total, *sample)
+
+      # the commit's bucket in each of the other precisions, e.g. 2017-month05
+      for accumulators, key in zip(buckets, bucket_keys(commit, precisions)):
+        accumulator = accumulators.get(key)
+        if accumulator is None:
+          accumulator = accumulators[key] = new_accumulator()
+        update(accumulator, *sample)
+
+  def finalize_metrics(self, metrics, metric_names, lazy=False):
+    """Returns the hashes of metric_names, including the contributor metrics, of each accumulator.
+
+    Args:
+        metrics: The accumulators of each precision.
+        metric_names: The metrics to output.
+        lazy: Whether to finalize the buckets of each precision as they are looked up (see
+          FinalizedBuckets) rather than all at once. Default False
+    """
+    results = {}
+    for name, accumulators in metrics.items():
+      if name == 'total':
+        results[name] = finalize_accumulator(accumulators, metric_names, self.top_contributors)
+      elif lazy:
+        results[name] = FinalizedBuckets(accumulators, metric_names, self.top_contributors)
+      else:
+        results[name] = dict((key, finalize_accumulator(accumulator, metric_names, self.top_contributors))
+                             for key, accumulator in accumulators.items())
+    return results
+
+  def export_metrics(self, metrics):
+    """Returns the accumulators of metrics as (json serializable) hashes, see MetricsAccumulator.to_dict."""
+    exported = {}
+    for name, accumulators in metrics.items():
+      if name == 'total':
+        exported[name] = accumulators.to_dict()
+      else:
+        exported[name] = dict((key, accumulator.to_dict()) for key, accumulator in accumulators.items())
+    return exported
+
+  def import_metrics(self, data):
+    """Returns the accumulators of hashes returned by export_metrics."""
+    metrics = {}
+    for name, accumulators in data.items():
+      if name == 'total':
+        metrics[name] = MetricsAccumulator.from_dict(accumulators)
+      else:
+        metrics[name] = dict((key, MetricsAccumulator.from_dict(accumulator))
+                             for key, accumulator in accumulators.items())
     return metrics
 
+  def merge_metrics(self, metrics, other):
+    """Merges the accumulators of other into metrics, bucket by bucket (see MetricsAccumulator.merge).
+
+    e.g. the metrics of separate runs over disjoint commits merge into the metrics of all of them,
+    exactly. Both need the same precisions, and other can't have metrics that metrics doesn't.
+    Returns metrics."""
+    for name, accumulators in other.items():
+      if name == 'total':
+        metrics[name].merge(accumulators)
+        continue
+      buckets = metrics[name]
+      for key, accumulator in accumulators.items():
+        bucket = buckets.get(key)
+        if bucket is None:
+          bucket = buckets[key] = MetricsAccumulator()
+        bucket.merge(accumulator)
+    return metrics
 
-def get_precision(name, metrics, metrics_precisions):
-  if name not in metrics_precisions:
-    del metrics[name]
-    return None
-  return metrics[name]
-
-
-def filter_metrics(accumulator, metric_names):
-  if 'contributor_stats' in accumulator:
-    for contributor in accumulator['contributor_stats']:
-      filter_metrics(accumulator['contributor_stats'][contributor], metric_names)
-
-  def remove_key(key):
-    del accumulator[key]
-
-  map(remove_key, filter(lambda key: key not in metric_names, accumulator.keys()))
-
-
-def accumulate_contributor_metrics(accumulator):
-
-  contributor_docs_list = accumulator['contributor_docs_list']
-  contributor_only_docs_list = accumulator['contributor_only_docs_list']
-  contributor_code_list = accumulator['contributor_code_list']
-  contributor_only_code_list = accumulator['contributor_only_code_list']
-
-  for contributor_key in accumulator['contributor_stats'].keys():
-    contributor_metrics = accumulator['contributor_stats'][contributor_key]
-
-    if contributor_metrics['docs_count'] > 0:
-      contributor_docs_list.append(contributor_key)
-      if contributor_metrics['code_count'] == 0:
-        contributor_only_docs_list.append(contributor_key)
-
-    if contributor_metrics['code_count'] > 0:
-      contributor_code_list.append(contributor_key)
-      if contributor_metrics['docs_count'] == 0:
-        contributor_only_code_list.append(contributor_key)
-
-    accumulator['contributor_count'] = len(accumulator['contributor_stats'].keys())
-    accumulator['contributor_docs_count'] = len(contributor_docs_list)
-    accumulator['contributor_code_count'] = len(contributor_code_list)
-    accumulator['contributor_only_docs_count'] = len(contributor_only_docs_list)
-    accumulator['contributor_only_code_count'] = len(contributor_only_code_list)
-
-
-def accumulate_metrics(accumulator, sample, contributor):
-  # commit counts
-  accumulator['commit_count'] += sample['commit_count']
-  accumulator['code_count'] += sample['code_count']
-  accumulator['docs_count'] += sample['docs_count']
-  accumulator['only_code_count'] += sample['only_code_count']
-  accumulator['only_docs_count'] += sample['only_docs_count']
-  accumulator['chars_changed_count'] += sample['chars_changed_count']
-  accumulator['code_chars_count'] += sample['code_chars_count']
-  accumulator['docs_chars_count'] += sample['docs_chars_count']
-
-  # throw out 1.0 values for max
-  if accumulator['docs_density_max'] < sample['docs_density_max'] and sample['docs_density_max'] != 1.0:
-    accumulator['docs_density_max'] = sample['docs_density_max']
-
-  # throw out 0.0 values for min
-  if (accumulator['docs_density_min'] == 0.0 or (accumulator['docs_density_min'] > sample['docs_density_min'] and sample['docs_density_min'] != 0.0)):
-    accumulator['docs_density_min'] = sample['docs_density_min']
-
-  accumulator['docs_density_avg'] = (
-    accumulator['commit_count'] * accumulator['docs_density_avg'] + sample['docs_density_avg']
-    ) / (accumulator['commit_count'] + 1)
-
-  # throw out 1.0 values for max
-  if accumulator['code_density_max'] < sample['code_density_max'] and sample['code_density_max'] != 1.0:
-    accumulator['code_density_max'] = sample['code_density_max']
-
-  # throw out 0.0 values for min
-  if (accumulator['code_density_min'] == 0.0 or (accumulator['code_density_min'] > sample['code_density_min'] and sample['code_density_min'] != 0.0)):
-    accumulator['code_density_min'] = sample['code_density_min']
-
-  accumulator['code_density_avg'] = (
-    accumulator['commit_count'] * accumulator['code_density_avg'] + sample['code_density_avg']
-    ) / (accumulator['commit_count'] + 1)
 
-  # keep all positive values for max, since we can exceed 1.0 for this measure
-  if accumulator['docs_to_code_max'] < sample['docs_to_code_max']:
-    accumulator['docs_to_code_max'] = sample['docs_to_code_max']
+class FinalizedBuckets(Mapping):
+  """The finalized metrics of each bucket of a precision, finalized when looked up (and not kept).
 
-  # throw out 0.0 values for min
-  if (accumulator['docs_to_code_min'] == 0.0 or (accumulator['docs_to_code_min'] > sample['docs_to_code_min'] and sample['docs_to_code_min'] != 0.0)):
-    accumulator['docs_to_code_min'] = sample['docs_to_code_min']
+  Lets the metrics of many (e.g. daily) buckets be output one at a time, see StreamingJsonPrinter."""
 
-  accumulator['docs_to_code_avg'] = (
-    accumulator['commit_count'] * accumulator['docs_to_code_avg'] + sample['docs_to_code_avg']
-    ) / (accumulator['commit_count'] + 1)
+  def __init__(self, accumulators, metric_names, top_contributors=codewerdz.git.metrics.DEFAULT_TOP_CONTRIBUTORS):
+    self.accumulators = accumulators
+    self.metric_names = metric_names
+    self.top_contributors = top_contributors
 
-  # contributor stats
-  if 'contributor_stats' in accumulator:
-    contributors = accumulator['contributor_stats']
-    if not contributor in contributors:
-      contributors[contributor] = copy.deepcopy(codewerdz.git.metrics.EMPTY_CONTRIBUTOR_METRICS)
+  def __getitem__(self, key):
+    return finalize_accumulator(self.accumulators[key], self.metric_names, self.top_contributors)
 
-    accumulate_metrics(contributors[contributor], sample, None)
+  def __iter__(self):
+    return iter(self.accumulators)
 
+  def __len__(self):
+    return len(self.accumulators)
 
-class UTC(datetime.tzinfo):
-  """UTC"""
 
-  def utcoffset(self, dt):
-    return datetime.timedelta(0)
+def finalize_accumulator(accumulator, metric_names, top_contributors=codewerdz.git.metrics.DEFAULT_TOP_CONTRIBUTORS):
+  """Returns the hash of metric_names of a bucket's accumulator.
 
-  def tzname(self, dt):
-    return "UTC"
+  The top contributors metrics list the top_contributors heaviest [contributor, value] pairs,
+  heaviest first (then by contributor)."""
+  result = dict((name, getattr(accumulator, name)) for name in FIELDS if name in metric_names)
 
-  def dst(self, dt):
-    return datetime.timedelta(0)
+  for name in codewerdz.git.metrics.TOP_CONTRIBUTOR_METRICS:
+    if name in metric_names:
+      summary, field = TOP_CONTRIBUTORS[name]
+      if getattr(accumulator, summary) is not None:
+        result[name] = getattr(accumulator, summary).top()
+      elif accumulator.contributors is not None:
+        result[name] = top_contributors_by(accumulator.contributors, field, top_contributors)
 
+  if accumulator.contributor_sketch is not None and accumulator.contributors is None:
+    # only the counts of contributors are output (see MetricsUpdater)
+    for name, value in zip(CONTRIBUTOR_COUNTS, accumulator.contributor_sketch.counts()):
+      if name in metric_names:
+        result[name] = value
+    return result
 
-def parse_git_iso(isodate_string):
-  # eg: 2017-05-13 17:22:39 -0700
-  return iso8601.parse_date(isodate_string.replace(" -", "-").replace(" +", "+"))
+  contributors = accumulator.contributors
+  if contributors is None or not any(name in metric_names for name in CONTRIBUTOR_METRICS):
+    return result
 
+  contributor_docs_list = []
+  contributor_only_docs_list = []
+  contributor_code_list = []
+  contributor_only_code_list = []
 
-def week_of_year(isodate_string):
-  """ NOTE: Not ISO week number... TODO, decide if we care about this or not... """
-  date = parse_git_iso(isodate_string)
-  return ((date - datetime.datetime(date.year, 1, 1, tzinfo=UTC())).days // 7) + 1
+  for contributor_key in contributors.keys():
+    contributor_metrics = contributors[contributor_key]
 
+    if contributor_metrics.docs_count > 0:
+      contributor_docs_list.append(contributor_key)
+      if contributor_metrics.code_count == 0:
+        contributor_only_docs_list.append(contributor_key)
 
-def day_of_year(isodate_string):
-  date = parse_git_iso(isodate_string)
-  return date.timetuple().tm_yday
+    if contributor_metrics.code_count > 0:
+      contributor_code_list.append(contributor_key)
+      if contributor_metrics.docs_count == 0:
+        contributor_only_code_list.append(contributor_key)
 
+  contributor_metrics = {
+    'contributor_count': len(contributors),
+    'contributor_docs_count': len(contributor_docs_list),
+    'contributor_code_count': len(contributor_code_list),
+    'contributor_only_docs_count': len(contributor_only_docs_list),
+    'contributor_only_code_count': len(contributor_only_code_list),
+    'contributor_docs_list': contributor_docs_list,
+    'contributor_code_list': contributor_code_list,
+    'contributor_only_docs_list': contributor_only_docs_list,
+    'contributor_only_code_list': contributor_only_code_list
+  }
+  for name, value in contributor_metrics.items():
+    if name in metric_names:
+      result[name] = value
+
+  if 'contributor_stats' in metric_names:
+    result['contributor_stats'] = dict(
+      (contributor, dict((name, getattr(stats, name)) for name in FIELDS if name in metric_names))
+      for contributor, stats in contributors.items())
+
+  return result
+
+
+def top_contributors_by(contributors, field, count):
+  """Returns the [contributor, value] pairs of the count contributors (accumulators by contributor) with the
+  highest (positive) field, highest first (then by contributor)."""
+  values = [(contributor, getattr(stats, field)) for contributor, stats in contributors.items()]
+  values = sorted((item for item in values if item[1] > 0), key=lambda item: (-item[1], item[0]))
+  return [[contributor, value] for contributor, value in values[:count]]
 
-def month_of_year(isodate_string):
-  date = parse_git_iso(isodate_string)
-  return date.timetuple().tm_mon
@@ -0,0 +1,95 @@
+from array import array
+
+from codewerdz.git.metrics.time_buckets import TimeBuckets
+
+
+class CommitTable(object):
+  """The per-commit rollups that metrics are computed from, stored in columns (arrays).
+
+  Each commit is a row, in the order the commits were collected. The bucket columns hold an id
+  per bucket of each precision (see TimeBuckets), numbered in the order they were first seen and
+  named in `bucket_names`, and the author column holds an id per contributor, likewise.
+
+  Usage:
+    table = CommitTable.collect(commits, ['monthly'])
+    table.chars_of_docs[0]  # the chars of docs of the first commit
+    table.bucket_names['monthly'][table.buckets['monthly'][0]]  # the month of the first commit
+  """
+
+  INT_COLUMNS = ['author', 'chars_changed', 'chars_of_code', 'chars_of_docs', 'code', 'docs', 'only_code', 'only_docs']
+  FLOAT_COLUMNS = ['docs_density', 'code_density', 'docs_to_code']
+
+  def __init__(self, precisions=()):
+    for name in self.INT_COLUMNS:
+      setattr(self, name, array('l'))
+    for name in self.FLOAT_COLUMNS:
+      setattr(self, name, array('d'))
+    self.buckets = dict((precision, array('l')) for precision in precisions)
+    self.bucket_names = dict((precision, []) for precision in precisions)
+    self.contributors = []
+
+  def __len__(self):
+    return len(self.author)
+
+  @staticmethod
+  def collect(commits, precisions=(), contributors=True, time_buckets=None):
+    """Returns the table of commits (commit hashes, as produced by GitLogParser.parse).
+
+    Args:
+        commits: An iterable of commit hashes.
+        precisions: The precisions (but total) to number the buckets of. Default none
+        contributors: Whether to number the contributors, else every author id is 0. Default True
+        time_buckets: The TimeBuckets computing the bucket keys. Default TimeBuckets()
+    """
+    precisions = list(precisions)
+    table = CommitTable(precisions)
+    bucket_keys = (time_buckets or TimeBuckets()).keys
+    author_ids = {}
+    append = dict((name, getattr(table, name).append) for name in table.INT_COLUMNS + table.FLOAT_COLUMNS)
+    # the column, bucket ids and names of each precision
+    buckets = [(table.buckets[precision].append, {}, table.bucket_names[precision]) for precision in precisions]
+
+    for commit in commits:
+      chars_changed = 0
+      chars_of_code = 0
+      chars_of_docs = 0
+      for diff in commit['diffs']:
+        stats = diff['stats']
+        chars_changed += stats['chars_changed']
+        chars_of_code += stats['chars_of_code']
+        chars_of_docs += stats['chars_of_docs']
+
+      author = 0
+      if contributors:
+        contributor = "{} <{}>".format(commit['author'], commit['email'])
+        author = author_ids.get(contributor)
+        if author is None:
+          author = author_ids[contributor] = len(table.contributors)
+          table.contributors.append(contributor)
+
+      append['author'](author)
+      if buckets:
+        for (append_bucket, bucket_ids, bucket_names), key in zip(buckets, bucket_keys(commit, precisions)):
+          bucket = bucket_ids.get(key)
+          if bucket is None:
+            bucket = bucket_ids[key] = len(bucket_names)
+            bucket_names.append(key)
+          append_bucket(bucket)
+
+      code = 1 if chars_of_code > 0 else 0
+      docs = 1 if chars_of_docs > 0 else 0
+      append['chars_changed'](chars_changed)
+      append['chars_of_code'](chars_of_code)
+      append['chars_of_docs'](chars_of_docs)
+      append['code'](code)
+      append['docs'](docs)
+      append['only_code'](code & (1 - docs))
+      append['only_docs'](docs & (1 - code))
+
+      # NOTE: the same expressions as CommitAnalyzer.accumulate_commits, so the floats are identical
+      append['docs_density'](chars_of_docs / float(chars_changed) if chars_changed > 0 else 0.0)
+      append['code_density'](chars_of_code / float(chars_changed) if chars_changed > 0 else 0.0)
+      append['docs_to_code'](chars_of_docs / float(chars_of_code) if chars_of_code > 0 else 1.0)
+
+    return table
+
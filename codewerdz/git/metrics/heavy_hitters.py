@@ -0,0 +1,122 @@
+from heapq import heapify, heappop, heappush
+
+
+class HeavyHitters(object):
+  """The heaviest keys of a stream of weighted keys (e.g. the contributors with the most commits), in bounded memory.
+
+  Keys are counted with the Space-Saving algorithm: up to CAPACITY_FACTOR * k keys have a count,
+  and a key without one replaces the lightest key, whose count it inherits before adding its
+  own weight. So every count is at least the key's total weight, and overcounts it by at most
+  the total weight of the stream divided by the capacity; any key weighing more than that is
+  counted. While there are no more keys than the capacity, the counts are exact.
+
+  Once the summary is full, the lightest key is found with a heap of a (count, key) entry per
+  key, which is only updated when the lightest entry is stale (its key has been added to since),
+  so adding to a counted key stays a dict update. Ties are broken by key, so the counts don't
+  depend on the order of dicts.
+
+  Memory: a count per key (and a heap entry once full), up to the capacity, however many keys
+  there are.
+
+  Summaries merge by adding their counts (see merge), a key missing from a full summary counting
+  as its lightest count, then keeping the heaviest keys. Unlike the other sketches, the merged
+  summary isn't always the one of all of their keys: its counts are only bounded the same way.
+
+  Usage:
+    heavy_hitters = HeavyHitters(10)
+    heavy_hitters.add('Ann <ann@example.com>', 120)
+    heavy_hitters.top()  # [['Ann <ann@example.com>', 120]]
+  """
+
+  CAPACITY_FACTOR = 10
+
+  __slots__ = ['k', 'capacity', 'counts', 'heap']
+
+  def __init__(self, k):
+    """
+    Args:
+        k: The number of heaviest keys to output.
+    """
+    self.k = k
+    self.capacity = k * HeavyHitters.CAPACITY_FACTOR
+    # the count of each key
+    self.counts = {}
+    # a (count, key) entry per key, whose count is at most the key's (see _pop_lightest), once full (else None)
+    self.heap = None
+
+  def add(self, key, weight):
+    """Adds the (positive) weight of a key."""
+    counts = self.counts
+    count = counts.get(key)
+    if count is not None:
+      counts[key] = count + weight
+      return
+
+    if len(counts) < self.capacity:
+      counts[key] = weight
+      return
+
+    if self.heap is None:
+      self._set_counts(counts)
+    count = counts[key] = self._pop_lightest() + weight
+    heappush(self.heap, (count, key))
+
+  def merge(self, other):
+    """Adds the keys of another summary (of the same k). Returns self."""
+    floor = self._floor()
+    other_floor = other._floor()
+    counts = self.counts
+    other_counts = other.counts
+
+    merged = [(key, count + other_counts.get(key, other_floor)) for key, count in counts.items()]
+    merged += [(key, floor + count) for key, count in other_counts.items() if key not in counts]
+    if len(merged) > self.capacity:
+      merged = sorted(merged, key=lambda item: (-item[1], item[0]))[:self.capacity]
+    self._set_counts(dict(merged))
+    return self
+
+  def copy(self):
+    """Returns a copy of the summary."""
+    copy = HeavyHitters(self.k)
+    copy.counts = dict(self.counts)
+    copy.heap = list(self.heap) if self.heap is not None else None
+    return copy
+
+  def top(self):
+    """Returns the k heaviest [key, count] pairs, heaviest first (then by key)."""
+    return [[key, count] for key, count in sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:self.k]]
+
+  def to_dict(self):
+    """Returns the summary as a (json serializable) hash."""
+    return {'k': self.k, 'counts': sorted([key, count] for key, count in self.counts.items())}
+
+  @staticmethod
+  def from_dict(data):
+    """Returns the summary of a hash returned by to_dict."""
+    heavy_hitters = HeavyHitters(data['k'])
+    heavy_hitters._set_counts(dict((key, count) for key, count in data['counts']))
+    return heavy_hitters
+
+  def _set_counts(self, counts):
+    self.counts = counts
+    self.heap = None
+    if len(counts) >= self.capacity:
+      self.heap = [(count, key) for key, count in counts.items()]
+      heapify(self.heap)
+
+  def _pop_lightest(self):
+    # removes the lightest key, returning its count: stale entries are pushed back with their
+    # key's count until the lightest entry is up to date, as every key's count is at least its entry's
+    counts = self.counts
+    heap = self.heap
+    while True:
+      count, key = heappop(heap)
+      current = counts[key]
+      if current == count:
+        del counts[key]
+        return count
+      heappush(heap, (current, key))
+
+  def _floor(self):
+    # the most an uncounted key can weigh: nothing until the summary is full (no key was replaced)
+    return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
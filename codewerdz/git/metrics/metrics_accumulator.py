@@ -0,0 +1,206 @@
+from __future__ import division
+
+from collections import OrderedDict
+
+import codewerdz.git.metrics
+from codewerdz.git.metrics.contributor_sketch import ContributorSketch
+from codewerdz.git.metrics.heavy_hitters import HeavyHitters
+from codewerdz.git.metrics.quantile_sketch import QuantileSketch
+
+# the metrics accumulated from each commit, for a whole bucket as well as for each of its contributors
+FIELDS = sorted(list(codewerdz.git.metrics.EMPTY_CONTRIBUTOR_METRICS.keys()) + codewerdz.git.metrics.QUANTILE_METRICS)
+
+# the field summing up the values of each average
+AVERAGES = {
+  'docs_density_avg': 'docs_density_sum',
+  'code_density_avg': 'code_density_sum',
+  'docs_to_code_avg': 'docs_to_code_sum',
+}
+
+# the sketch and the quantile of each quantile, e.g. docs_density_p90 is the 0.9 quantile of docs_density_sketch
+QUANTILES = dict((name, (name[:-len('_p90')] + '_sketch', int(name[-2:]) / 100))
+                 for name in codewerdz.git.metrics.QUANTILE_METRICS)
+
+# the summary of each top contributors metric, and the contributor field ranking them (see HeavyHitters)
+TOP_CONTRIBUTORS = {
+  'top_contributors_by_commits': ('top_commits_summary', 'commit_count'),
+  'top_contributors_by_docs_chars': ('top_docs_chars_summary', 'docs_chars_count'),
+  'top_contributors_by_code_chars': ('top_code_chars_summary', 'code_chars_count'),
+}
+
+# the sums are integers counting units of 2**-83: every double of at least 2**-83 (e.g. any ratio
+# of two counts below 2**31) is a whole number of them, so the sums are exact whatever the order
+# the values are added or merged in
+SUM_SCALE = 2 ** 83
+
+# the fields of an accumulator, i.e. of the state of a bucket
+STATE_FIELDS = (sorted(name for name in FIELDS if name not in AVERAGES and name not in QUANTILES) +
+                sorted(AVERAGES.values()))
+
+# the sketches of the quantiles, which are None until a value is added to them (see MetricsUpdater)
+SKETCHES = sorted(set(sketch for sketch, _ in QUANTILES.values()))
+
+# the summaries of the top contributors, which are None unless they are selected (see MetricsUpdater)
+SUMMARIES = sorted(summary for summary, _ in TOP_CONTRIBUTORS.values())
+
+_DEFAULTS = [(name, codewerdz.git.metrics.EMPTY_CONTRIBUTOR_METRICS[name]) for name in STATE_FIELDS
+             if name not in AVERAGES.values()] + [(name, 0) for name in AVERAGES.values()]
+
+
+class MetricsAccumulator(object):
+  """The running values of the metrics of one bucket (e.g. a month), or of one contributor in it.
+
+  A bucket's accumulator holds a contributor accumulator per contributor in `contributors`
+  (an OrderedDict), in the order they were first seen, while contributors' accumulators have None. When only the
+  counts of contributors are needed, they can be counted by a `contributor_sketch` instead (see
+  ContributorSketch), and when only the top contributors are needed, they are kept by summaries
+  (e.g. `top_commits_summary`, see HeavyHitters), and `contributors` is None.
+  The fields are updated by MetricsUpdater, and two accumulators merge into the accumulator
+  of all of their commits (see merge), so buckets can be built from smaller ones.
+
+  Averages are accumulated as sums (see SUM_SCALE), and quantiles as sketches (see QuantileSketch),
+  and both are computed when they are read.
+  """
+
+  __slots__ = STATE_FIELDS + SKETCHES + SUMMARIES + ['contributors', 'contributor_sketch']
+
+  def __init__(self, contributors=None):
+    for name, value in _DEFAULTS:
+      setattr(self, name, value)
+    for name in SKETCHES + SUMMARIES:
+      setattr(self, name, None)
+    self.contributors = contributors
+    self.contributor_sketch = None
+
+  @property
+  def docs_density_avg(self):
+    return _average(self.docs_density_sum, self.commit_count)
+
+  @property
+  def code_density_avg(self):
+    return _average(self.code_density_sum, self.commit_count)
+
+  @property
+  def docs_to_code_avg(self):
+    return _average(self.docs_to_code_sum, self.commit_count)
+
+  def merge(self, other):
+    """Folds another accumulator into this one, as if its commits had been folded into this one too.
+
+    Counts and sums add up, maxes and mins follow the rules of MetricsUpdater (the values it
+    throws out were never kept, and a 0.0 min is no min at all), and the contributors of other
+    are merged into this one's, the new ones after the others. Merging is exact, in any order
+    and grouping, but for the summaries of top contributors (see HeavyHitters.merge). Returns self.
+    """
+    self.commit_count += other.commit_count
+    self.code_count += other.code_count
+    self.docs_count += other.docs_count
+    self.only_code_count += other.only_code_count
+    self.only_docs_count += other.only_docs_count
+    self.chars_changed_count += other.chars_changed_count
+    self.code_chars_count += other.code_chars_count
+    self.docs_chars_count += other.docs_chars_count
+
+    self.docs_density_sum += other.docs_density_sum
+    if self.docs_density_max < other.docs_density_max:
+      self.docs_density_max = other.docs_density_max
+    if other.docs_density_min != 0.0 and (self.docs_density_min == 0.0 or
+                                          self.docs_density_min > other.docs_density_min):
+      self.docs_density_min = other.docs_density_min
+
+    self.code_density_sum += other.code_density_sum
+    if self.code_density_max < other.code_density_max:
+      self.code_density_max = other.code_density_max
+    if other.code_density_min != 0.0 and (self.code_density_min == 0.0 or
+                                          self.code_density_min > other.code_density_min):
+      self.code_density_min = other.code_density_min
+
+    self.docs_to_code_sum += other.docs_to_code_sum
+    if self.docs_to_code_max < other.docs_to_code_max:
+      self.docs_to_code_max = other.docs_to_code_max
+    if other.docs_to_code_min != 0.0 and (self.docs_to_code_min == 0.0 or
+                                          self.docs_to_code_min > other.docs_to_code_min):
+      self.docs_to_code_min = other.docs_to_code_min
+
+    for name in SKETCHES + SUMMARIES:
+      sketch = getattr(other, name)
+      if sketch is not None:
+        mine = getattr(self, name)
+        if mine is None:
+          setattr(self, name, sketch.copy())
+        else:
+          mine.merge(sketch)
+
+    if other.contributor_sketch is not None:
+      if self.contributor_sketch is None:
+        self.contributor_sketch = other.contributor_sketch.copy()
+      else:
+        self.contributor_sketch.merge(other.contributor_sketch)
+
+    if other.contributors is not None:
+      if self.contributors is None:
+        self.contributors = OrderedDict()
+      contributors = self.contributors
+      for contributor, accumulator in other.contributors.items():
+        mine = contributors.get(contributor)
+        if mine is None:
+          mine = contributors[contributor] = MetricsAccumulator()
+        mine.merge(accumulator)
+    return self
+
+  def to_dict(self):
+    """Returns the fields (and contributors' fields) as the hash saved by AnalysisState.
+
+    The contributors are saved as a list of [contributor, fields] pairs, in their order."""
+    data = dict((name, getattr(self, name)) for name in STATE_FIELDS)
+    for name in SKETCHES:
+      sketch = getattr(self, name)
+      data[name] = sketch.to_dict() if sketch is not None else None
+    if self.contributors is not None:
+      data['contributor_stats'] = [
+        [contributor, accumulator.to_dict()] for contributor, accumulator in self.contributors.items()]
+    if self.contributor_sketch is not None:
+      data['contributor_sketch'] = self.contributor_sketch.to_dict()
+    for name in SUMMARIES:
+      summary = getattr(self, name)
+      if summary is not None:
+        data[name] = summary.to_dict()
+    return data
+
+  @staticmethod
+  def from_dict(data):
+    """Returns the accumulator of a hash returned by to_dict."""
+    contributor_stats = data.get('contributor_stats')
+    contributors = None
+    if contributor_stats is not None:
+      contributors = OrderedDict((contributor, MetricsAccumulator.from_dict(stats))
+                                 for contributor, stats in contributor_stats)
+
+    accumulator = MetricsAccumulator(contributors)
+    for name in STATE_FIELDS:
+      setattr(accumulator, name, data[name])
+    for name in SKETCHES:
+      if data[name] is not None:
+        setattr(accumulator, name, QuantileSketch.from_dict(data[name]))
+    if data.get('contributor_sketch') is not None:
+      accumulator.contributor_sketch = ContributorSketch.from_dict(data['contributor_sketch'])
+    for name in SUMMARIES:
+      if data.get(name) is not None:
+        setattr(accumulator, name, HeavyHitters.from_dict(data[name]))
+    return accumulator
+
+
+def _quantile_property(sketch_name, q):
+  def quantile(self):
+    sketch = getattr(self, sketch_name)
+    return sketch.quantile(q) if sketch is not None else 0.0
+  return property(quantile)
+
+
+for _name, (_sketch_name, _q) in QUANTILES.items():
+  setattr(MetricsAccumulator, _name, _quantile_property(_sketch_name, _q))
+
+
+def _average(total, commit_count):
+  # NOTE: divided by commit_count + 1, which is what the running averages always came to
+  return total / (SUM_SCALE * (commit_count + 1))
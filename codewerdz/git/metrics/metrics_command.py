@@ -1,47 +1,115 @@
 import datetime
-import json
-import sys
+import os
+import time
 
 import codewerdz
 import codewerdz.git
-import codewerdz.git.cli
 
-from codewerdz.git.metrics.commit_analyzer import CommitAnalyzer
-from codewerdz.git.log.log_command import iterate_commits
+from codewerdz.git.metrics.analysis import ANALYZERS, analyze
+from codewerdz.git.metrics.contributor_sketch import ContributorSketch
+from codewerdz.git.metrics.metrics_csv_printer import MetricsCsvPrinter
+from codewerdz.git.metrics.metrics_updater import counts_contributors_only
+from codewerdz.git.metrics.repo_batch import RepoBatch
+from codewerdz.git.metrics.time_buckets import TimeBuckets, parse_timezone
+from codewerdz.git.profiler import profiled_stage
+from codewerdz.git.repo_config import repo_name, repo_url
+from codewerdz.git.streaming_json_printer import StreamingJsonPrinter
 
 import click
 
+FORMAT_JSON = 'json'
+FORMAT_CSV = 'csv'
+FORMATS = [FORMAT_JSON, FORMAT_CSV]
+
+
+def validate_timezone(ctx, param, timezone):
+  try:
+    parse_timezone(timezone)
+  except ValueError as e:
+    raise click.BadParameter(str(e))
+  return timezone
+
 
 @click.command()
 @click.option('--metrics-precision', help="Precision levels to output.", multiple=True, default=codewerdz.git.metrics.DEFAULT_PRECISION, type=click.Choice(codewerdz.git.metrics.PRECISION_CHOICES))
-@click.option('--metric', help="Metrics to output.", multiple=True, default=codewerdz.git.metrics.DEFAULT_METRICS, type=click.Choice(codewerdz.git.metrics.METRICS_CHOICES))
+@click.option('--metric', help="Metrics to output. The quantiles (e.g. docs_density_p90) and top contributors (e.g. top_contributors_by_commits) are only output when asked for.", multiple=True, default=codewerdz.git.metrics.DEFAULT_METRICS, type=click.Choice(codewerdz.git.metrics.METRICS_CHOICES))
+@click.option('--incremental', help="Save the analysis state to this file, and only analyze the commits since the last run.", default=None, type=click.Path(dir_okay=False))
+@click.option('--analyzer', help="How commits are aggregated into metrics.", default='streaming', type=click.Choice(sorted(ANALYZERS)))
+@click.option('--timezone', help="Timezone to bucket commits in: committer (each commit's own), local, utc or an offset like +0200.", default=TimeBuckets.TIMEZONE_COMMITTER, callback=validate_timezone)
+@click.option('--repo', help="Path of a repo to analyze, instead of the current one. --jobs repos are analyzed at once.", multiple=True, type=click.Path(exists=True, file_okay=False))
+@click.option('--repos-file', help="File listing repos to analyze, one per line: a path, optionally followed by a name and a URL.", default=None, type=click.Path(exists=True, dir_okay=False))
+@click.option('--approximate-contributors', 'contributor_error', help="Count contributors with HyperLogLog sketches of this standard error (e.g. 0.02) instead of keeping every contributor of every bucket, when no contributor list or contributor_stats is output.", default=None, type=click.FloatRange(0.001, 0.5))
+@click.option('--top-contributors', help="Output the top contributors of each bucket, this many, by commits, chars of docs and chars of code (the top_contributors_by_* metrics, which are summarized in bounded memory when no other contributor metric is output). Default 10 when one of them is selected with --metric.", default=None, type=click.IntRange(1, None))
+@click.option('--format', 'output_format', help="Output JSON, or a CSV table with a row per bucket and a column per metric.", default=FORMAT_JSON, type=click.Choice(FORMATS))
 @click.pass_context
-def metrics(ctx, metrics_precision, metric):
+def metrics(ctx, metrics_precision, metric, incremental, analyzer, timezone, repo, repos_file, contributor_error,
+            top_contributors, output_format):
 
   options = ctx.obj.copy()
+  options['contributor_error'] = contributor_error
+  options['top_contributors'] = top_contributors
+  top_metrics = codewerdz.git.metrics.TOP_CONTRIBUTOR_METRICS
+  if top_contributors and not any(name in top_metrics for name in metric):
+    metric = tuple(metric) + tuple(top_metrics)
 
   # Print Options
   codewerdz.debug("Precision    : {}".format(', '.join(sorted(metrics_precision))))
   codewerdz.debug("Metrics      : {}".format(', '.join(sorted(metric))))
+  if incremental:
+    codewerdz.debug("Incremental  : {}".format(incremental))
+  codewerdz.debug("Analyzer     : {}".format(analyzer))
+  codewerdz.debug("Timezone     : {}".format(timezone))
+  if contributor_error:
+    precision = ContributorSketch.precision_for(contributor_error)
+    codewerdz.debug("Contributors : approximate, {:.2%} standard error ({} registers)".format(
+      ContributorSketch.error(precision), 2 ** precision))
+  if any(name in codewerdz.git.metrics.TOP_CONTRIBUTOR_METRICS for name in metric):
+    codewerdz.debug("Top          : {} contributors".format(
+      top_contributors or codewerdz.git.metrics.DEFAULT_TOP_CONTRIBUTORS))
+  codewerdz.debug("Format       : {}".format(output_format))
+
+  if incremental and options['commits_limit']:
+    raise click.UsageError("--commits-limit can't be combined with --incremental.")
+
+  repos = [(path, None, None) for path in repo]
+  if repos_file:
+    repos += read_repos_file(repos_file)
+
+  if repos:
+    output = analyze_repos(repos, options, analyzer, timezone, metrics_precision, metric, incremental)
+  else:
+    url = options['repo_url'] or repo_url()
+    name = options['repo_name'] or repo_name(url)
+    codewerdz.debug("Repo Name    : {}".format(name))
+    codewerdz.debug("Repo URL     : {}".format(url))
 
-  # Iterate Log and Parse Commits
-  commits = iterate_commits(
-    options['docs_pattern'],
-    options['comments_are_docs'],
-    options['date_range_start'],
-    options['date_range_end'],
-    options['commits_limit'],
-    options['exclude_path']
-  )
+    # the buckets are finalized as they are output
+    repo_output, _ = analyze_repo(url, options, analyzer, timezone, metrics_precision, metric, incremental,
+                                  lazy=True)
+    output = {'repos': {name: repo_output}}
 
-  # Analyze Commits
-  analyzer = CommitAnalyzer()
-  analysis_results = analyzer.analyze_commits(commits, metrics_precision, metric)
+  # Output JSON (or CSV)
+  with profiled_stage('output'):
+    if output_format == FORMAT_CSV:
+      MetricsCsvPrinter.dump(output, metric)
+    else:
+      StreamingJsonPrinter.dump(output)
+
+  if any('error' in repo_output for repo_output in output['repos'].values()):
+    ctx.exit(1)
+
+
+def analyze_repo(url, options, analyzer, timezone, metrics_precision, metric, incremental, lazy=False, repo=None):
+  """Returns the output of the repo at path repo (default the current one, see metrics), and the number of commits
+  analyzed.
+
+  If lazy, the buckets of each precision are finalized as they are looked up, see FinalizedBuckets."""
+  analysis_results, commit_count = analyze(options, analyzer, timezone, metrics_precision, metric, incremental, lazy,
+                                           repo)
 
   # Prepare Output
-  output = {'repos': {}}
-  output['repos'][options['repo_name']] = {
-    "url": options['repo_url'],
+  repo_output = {
+    "url": url,
     "analysis_date": json_date(datetime.datetime.utcnow()),
     "date_range": {
       "start_date": options['date_range_start'],
@@ -49,9 +117,77 @@ def metrics(ctx, metrics_precision, metric):
     },
     "metrics": analysis_results
   }
+  if options.get('contributor_error') and not incremental and counts_contributors_only(metric):
+    # (the counts are sketched, see MetricsUpdater, and only approximate beyond a few contributors per bucket)
+    repo_output["contributor_count_error"] = ContributorSketch.error(
+      ContributorSketch.precision_for(options['contributor_error']))
+  return repo_output, commit_count
+
+
+def analyze_repos(repos, options, analyzer, timezone, metrics_precision, metric, incremental):
+  """Returns the output of each of repos, a list of (path, name, url) tuples (name and url can be None).
+
+  Up to options['jobs'] repos are analyzed at once (each one with a single job), and each repo's
+  output also holds its wall_time (in seconds) and commit_count (the commits analyzed), or an
+  error if it couldn't be analyzed."""
+  if options['repo_name'] or options['repo_url']:
+    raise click.UsageError("--repo-name and --repo-url can't be combined with --repo or --repos-file.")
+  if incremental and os.path.isabs(incremental):
+    raise click.UsageError("--incremental must be a path relative to each repo with --repo or --repos-file.")
+
+  names = {}
+  for path, name, url in repos:
+    name = name or os.path.basename(os.path.abspath(path))
+    if name in names.values():
+      raise click.UsageError("Two repos are named {}, name them in the --repos-file.".format(name))
+    names[path] = name
+  urls = dict((path, url) for path, name, url in repos)
+
+  jobs = options['jobs']
+  options = dict(options, jobs=1)
+  batch = RepoBatch(jobs, analyze_batch_repo,
+                    (options, analyzer, timezone, metrics_precision, metric, incremental, urls))
+
+  output = {'repos': {}}
+  for count, (path, repo_output, error) in enumerate(batch.iterate_results([path for path, _, _ in repos]), 1):
+    if error:
+      codewerdz.info("ERROR: Failed to analyze {} ({}): {}".format(names[path], path, error))
+      repo_output = {'error': error}
+    else:
+      codewerdz.info("Analyzed     : {} ({} commits in {:.1f}s) [{}/{}]".format(
+        names[path], repo_output['commit_count'], repo_output['wall_time'], count, len(repos)))
+    output['repos'][names[path]] = repo_output
+  return output
+
+
+def analyze_batch_repo(options, analyzer, timezone, metrics_precision, metric, incremental, urls, repo):
+  """RepoBatch entry point: returns the output of the repo at path repo, with its wall_time and commit_count.
+
+  Its URL is the one in urls (by path), if the repos file gave it one, or its origin's."""
+  start = time.time()
+  url = urls[repo] or repo_url(repo)
+  if incremental:
+    incremental = os.path.join(repo, incremental)
+  repo_output, commit_count = analyze_repo(url, options, analyzer, timezone, metrics_precision, metric, incremental,
+                                           repo=repo)
+  repo_output['commit_count'] = commit_count
+  repo_output['wall_time'] = round(time.time() - start, 3)
+  return repo_output
+
+
+def read_repos_file(path):
+  """Returns the (path, name, url) of each repo listed in the file at path (name and url can be None).
 
-  # Output JSON
-  sys.stdout.write(json.dumps(output, sort_keys=True, indent=2))
+  Blank lines and lines starting with # are skipped."""
+  repos = []
+  with open(path) as f:
+    for line in f:
+      fields = line.split()
+      if not fields or fields[0].startswith('#'):
+        continue
+      fields += [None] * (3 - len(fields))
+      repos.append(tuple(fields[:3]))
+  return repos
 
 
 def json_date(d):
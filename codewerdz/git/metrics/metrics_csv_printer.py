@@ -0,0 +1,54 @@
+import csv
+import sys
+
+from codewerdz.git.buffered_writer import BufferedWriter
+
+
+class MetricsCsvPrinter():
+  """ Outputs the metrics of the `metrics` command as a CSV table, which BI tools can load directly.
+
+  There is a row per bucket of each precision of each repo, and a column per metric, after the
+  repo, precision and bucket columns (the total's bucket is empty). Rows are sorted by those
+  three columns, and written as each bucket is looked up (see FinalizedBuckets). Contributor
+  lists are joined with semicolons (the top contributors as contributor=value), and
+  contributor_stats (which is nested) is left out.
+  """
+
+  LIST_SEPARATOR = ';'
+
+  @staticmethod
+  def dump(output, metric_names, f=None, flush_size=BufferedWriter.DEFAULT_FLUSH_SIZE,
+           flush_interval=BufferedWriter.DEFAULT_FLUSH_INTERVAL):
+    """ Outputs the metrics of each repo in output (see the metrics command) to a file handle (f).
+
+    Args:
+        output: The output of the metrics command, i.e. {'repos': {name: {'metrics': ...}}}
+        metric_names: The metrics (columns) to output.
+        f: The file to output to. Default None (sys.stdout)
+        flush_size: See BufferedWriter. Default 64KiB
+        flush_interval: See BufferedWriter. Default 1.0
+    """
+    columns = sorted(name for name in metric_names if name != 'contributor_stats')
+
+    with BufferedWriter(f or sys.stdout, flush_size, flush_interval) as writer:
+      rows = csv.writer(writer, lineterminator='\n')
+      rows.writerow(['repo', 'precision', 'bucket'] + columns)
+
+      for repo_name in sorted(output['repos']):
+        # NOTE: repos that failed to be analyzed have no metrics, only an error
+        metrics = output['repos'][repo_name].get('metrics', {})
+        for precision in sorted(metrics):
+          if precision == 'total':
+            buckets = [('', metrics[precision])]
+          else:
+            buckets = ((key, metrics[precision][key]) for key in sorted(metrics[precision]))
+
+          for key, bucket in buckets:
+            rows.writerow([repo_name, precision, key] + [_cell(bucket.get(name)) for name in columns])
+
+
+def _cell(value):
+  if isinstance(value, list):
+    return MetricsCsvPrinter.LIST_SEPARATOR.join(
+      item if not isinstance(item, list) else '{}={}'.format(*item) for item in value)
+  return value
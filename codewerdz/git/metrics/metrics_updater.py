@@ -0,0 +1,183 @@
+from collections import OrderedDict
+
+import codewerdz.git.metrics
+from codewerdz.git.metrics.metrics_accumulator import FIELDS, QUANTILES, TOP_CONTRIBUTORS, MetricsAccumulator
+from codewerdz.git.metrics.contributor_sketch import ContributorSketch
+from codewerdz.git.metrics.heavy_hitters import HeavyHitters
+from codewerdz.git.metrics.quantile_sketch import QuantileSketch
+
+# the arguments of an update routine, which are the values of a single commit
+# (the *_units are the values of the averages, in the units of their sums, see SUM_SCALE)
+SAMPLE = [
+  'code', 'docs', 'only_code', 'only_docs', 'chars_changed', 'chars_of_code', 'chars_of_docs',
+  'docs_density', 'code_density', 'docs_to_code', 'docs_density_units', 'code_density_units', 'docs_to_code_units'
+]
+
+# the statement folding a commit into each field of an accumulator `a`, in the order they run
+# NOTE: the averages are accumulated as sums (see SUM_SCALE), and the quantiles as sketches
+UPDATES = [
+  ('commit_count', "a.commit_count += 1"),
+  ('code_count', "a.code_count += code"),
+  ('docs_count', "a.docs_count += docs"),
+  ('only_code_count', "a.only_code_count += only_code"),
+  ('only_docs_count', "a.only_docs_count += only_docs"),
+  ('chars_changed_count', "a.chars_changed_count += chars_changed"),
+  ('code_chars_count', "a.code_chars_count += chars_of_code"),
+  ('docs_chars_count', "a.docs_chars_count += chars_of_docs"),
+
+  # throw out 1.0 values for max
+  ('docs_density_max',
+   "if a.docs_density_max < docs_density and docs_density != 1.0: a.docs_density_max = docs_density"),
+  # throw out 0.0 values for min
+  ('docs_density_min',
+   "if a.docs_density_min == 0.0 or (a.docs_density_min > docs_density and docs_density != 0.0):"
+   " a.docs_density_min = docs_density"),
+  ('docs_density_avg', "a.docs_density_sum += docs_density_units"),
+  ('docs_density_sketch', "if a.docs_density_sketch is None: a.docs_density_sketch = QuantileSketch()"),
+  ('docs_density_sketch', "a.docs_density_sketch.add(docs_density)"),
+
+  # throw out 1.0 values for max
+  ('code_density_max',
+   "if a.code_density_max < code_density and code_density != 1.0: a.code_density_max = code_density"),
+  # throw out 0.0 values for min
+  ('code_density_min',
+   "if a.code_density_min == 0.0 or (a.code_density_min > code_density and code_density != 0.0):"
+   " a.code_density_min = code_density"),
+  ('code_density_avg', "a.code_density_sum += code_density_units"),
+  ('code_density_sketch', "if a.code_density_sketch is None: a.code_density_sketch = QuantileSketch()"),
+  ('code_density_sketch', "a.code_density_sketch.add(code_density)"),
+
+  # keep all positive values for max, since we can exceed 1.0 for this measure
+  ('docs_to_code_max', "if a.docs_to_code_max < docs_to_code: a.docs_to_code_max = docs_to_code"),
+  # throw out 0.0 values for min
+  ('docs_to_code_min',
+   "if a.docs_to_code_min == 0.0 or (a.docs_to_code_min > docs_to_code and docs_to_code != 0.0):"
+   " a.docs_to_code_min = docs_to_code"),
+  ('docs_to_code_avg', "a.docs_to_code_sum += docs_to_code_units"),
+  ('docs_to_code_sketch', "if a.docs_to_code_sketch is None: a.docs_to_code_sketch = QuantileSketch()"),
+  ('docs_to_code_sketch', "a.docs_to_code_sketch.add(docs_to_code)"),
+]
+
+# the sample value weighing the contributor of a commit in each contributor field ranking top contributors
+TOP_WEIGHTS = {
+  'commit_count': '1',
+  'docs_chars_count': 'chars_of_docs',
+  'code_chars_count': 'chars_of_code',
+}
+
+# the metrics derived from the contributors of a bucket (see CommitAnalyzer.finalize_metrics)
+CONTRIBUTOR_METRICS = [
+  name for name in codewerdz.git.metrics.METRICS_CHOICES if name.startswith('contributor_')
+]
+
+
+class MetricsUpdater(object):
+  """Folds a commit into MetricsAccumulators, with a routine generated for the selected metrics.
+
+  Only the fields of the selected metrics, and the fields they depend on, are updated:
+  the averages need commit_count, the quantiles need the sketch of their values (e.g.
+  docs_density_sketch), and the contributor counts and lists need the docs_count and code_count
+  of each contributor. Contributors aren't tracked at all unless a contributor metric is
+  selected, and with a contributor_precision, they are only counted by a ContributorSketch
+  (of their `contributor_hash`, see ContributorSketch.hash) when no contributor list (or
+  contributor_stats) is selected. Likewise, the top contributors are ranked from the tracked
+  contributors, or kept by a HeavyHitters summary per metric when contributors aren't tracked.
+
+  Usage:
+    updater = MetricsUpdater(['commit_count', 'docs_density_avg'])
+    accumulator = updater.new_accumulator()
+    updater.update(accumulator, contributor, contributor_hash, *sample)  # see SAMPLE
+  """
+
+  def __init__(self, metric_names=None, contributor_precision=None,
+               top_contributors=codewerdz.git.metrics.DEFAULT_TOP_CONTRIBUTORS):
+    """
+    Args:
+        metric_names: The metrics to accumulate. Default None (all of them)
+        contributor_precision: The precision of the ContributorSketch counting the contributors
+          of each bucket, when only their counts are selected. Default None (contributors are
+          always tracked exactly)
+        top_contributors: The number of top contributors the summaries keep. Default 10
+    """
+    if metric_names is None:
+      metric_names = codewerdz.git.metrics.METRICS_CHOICES
+    self.metric_names = frozenset(metric_names)
+    self.contributor_precision = contributor_precision
+    self.top_contributors = top_contributors
+
+    self.fields = _with_dependencies(name for name in FIELDS if name in self.metric_names)
+    contributor_metrics = [name for name in CONTRIBUTOR_METRICS if name in self.metric_names]
+    self.sketches_contributors = contributor_precision is not None and counts_contributors_only(self.metric_names)
+    self.tracks_contributors = bool(contributor_metrics) and not self.sketches_contributors
+    # the contributor field ranking each selected top contributors metric
+    self.top_fields = [TOP_CONTRIBUTORS[name][1] for name in codewerdz.git.metrics.TOP_CONTRIBUTOR_METRICS
+                       if name in self.metric_names]
+    self.summarizes_top_contributors = bool(self.top_fields) and not self.tracks_contributors
+
+    contributor_fields = []
+    if 'contributor_stats' in self.metric_names:
+      contributor_fields += self.fields
+    if self.tracks_contributors:
+      contributor_fields += ['docs_count', 'code_count'] + self.top_fields
+    self.contributor_fields = _with_dependencies(contributor_fields)
+
+    self.source = self._source()
+    namespace = {'MetricsAccumulator': MetricsAccumulator, 'QuantileSketch': QuantileSketch}
+    exec(compile(self.source, '<MetricsUpdater {}>'.format(sorted(self.metric_names)), 'exec'), namespace)
+    self.update = namespace['update']
+
+  def new_accumulator(self):
+    """Returns an empty accumulator for a bucket."""
+    accumulator = MetricsAccumulator(OrderedDict() if self.tracks_contributors else None)
+    if self.sketches_contributors:
+      accumulator.contributor_sketch = ContributorSketch(self.contributor_precision)
+    if self.summarizes_top_contributors:
+      for summary, field in TOP_CONTRIBUTORS.values():
+        if field in self.top_fields:
+          setattr(accumulator, summary, HeavyHitters(self.top_contributors))
+    return accumulator
+
+  def _source(self):
+    lines = ["def update(a, contributor, contributor_hash, {}):".format(', '.join(SAMPLE))]
+    lines += ["  " + statement for name, statement in UPDATES if name in self.fields]
+    if self.sketches_contributors:
+      lines += ["  a.contributor_sketch.add(contributor_hash, docs, code)"]
+    if self.summarizes_top_contributors:
+      for summary, field in sorted(TOP_CONTRIBUTORS.values()):
+        if field in self.top_fields:
+          # a counted contributor's count is added to in place (see HeavyHitters.add), and contributors
+          # who committed no docs (or no code) aren't ranked by them
+          weight = TOP_WEIGHTS[field]
+          indent = "  " if weight == '1' else "    "
+          if weight != '1':
+            lines += ["  if {}:".format(weight)]
+          lines += [
+            indent + "counts = a.{}.counts".format(summary),
+            indent + "if contributor in counts: counts[contributor] += {}".format(weight),
+            indent + "else: a.{}.add(contributor, {})".format(summary, weight),
+          ]
+    if self.tracks_contributors:
+      lines += [
+        "  contributors = a.contributors",
+        "  a = contributors.get(contributor)",
+        "  if a is None:",
+        "    a = contributors[contributor] = MetricsAccumulator()",
+      ]
+      lines += ["  " + statement for name, statement in UPDATES if name in self.contributor_fields]
+    lines += ["  return"]
+    return "\n".join(lines) + "\n"
+
+
+def counts_contributors_only(metric_names):
+  """Returns True if contributor counts are the only contributor metrics among metric_names (and there is one),
+  i.e. if a ContributorSketch can count the contributors."""
+  contributor_metrics = [name for name in CONTRIBUTOR_METRICS if name in metric_names]
+  return bool(contributor_metrics) and all(name.endswith('_count') for name in contributor_metrics)
+
+
+def _with_dependencies(fields):
+  fields = set(fields)
+  if any(name.endswith('_avg') for name in fields):
+    fields.add('commit_count')
+  fields.update(QUANTILES[name][0] for name in fields & set(QUANTILES))
+  return fields
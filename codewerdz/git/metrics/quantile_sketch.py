@@ -0,0 +1,117 @@
+import math
+
+
+class QuantileSketch(object):
+  """The distribution of a stream of non-negative values, in bounded memory, for their quantiles.
+
+  Values are counted in logarithmic buckets, like a DDSketch: bucket i holds the values around
+  GAMMA ** i, from GAMMA ** (i - 1/2) to GAMMA ** (i + 1/2), where GAMMA = (1 + ALPHA) ** 2, and
+  0.0 values are counted apart. The quantile q is the value of rank floor(q * (count - 1)) in the
+  sorted values, estimated by the GAMMA ** i of its bucket (clamped to the min and max values,
+  which are exact, as are 0.0 and 1.0), so:
+
+    |quantile(q) - value of rank floor(q * (count - 1))| <= ALPHA * that value
+
+  i.e. the estimates are within 1% of the exact quantile with the default ALPHA, whatever the
+  distribution and the number of values.
+
+  Memory: a count per bucket holding values. Values from 2**-31 to 2**31 (e.g. any ratio of two
+  counts below 2**31, like the densities of commits) fit in 2,200 buckets, however many there are.
+
+  Sketches merge by adding their counts (see merge), which is exact: merged sketches are the
+  sketch of all of their values, in any order and grouping.
+
+  Usage:
+    sketch = QuantileSketch()
+    sketch.add(0.25)
+    sketch.quantile(0.9)
+  """
+
+  ALPHA = 0.01
+  GAMMA = (1 + ALPHA) ** 2
+  LOG_GAMMA = math.log(GAMMA)
+
+  __slots__ = ['count', 'zero_count', 'counts', 'min', 'max']
+
+  def __init__(self):
+    self.count = 0
+    self.zero_count = 0
+    # the count of values in each bucket, by index
+    self.counts = {}
+    self.min = 0.0
+    self.max = 0.0
+
+  def add(self, value):
+    """Adds a (non-negative) value."""
+    if self.count == 0 or value < self.min:
+      self.min = value
+    if value > self.max:
+      self.max = value
+    self.count += 1
+
+    if value > 0.0:
+      index = int(math.floor(math.log(value) / QuantileSketch.LOG_GAMMA + 0.5))
+      counts = self.counts
+      counts[index] = counts.get(index, 0) + 1
+    else:
+      self.zero_count += 1
+
+  def merge(self, other):
+    """Adds the values of another sketch. Returns self."""
+    if other.count == 0:
+      return self
+    if self.count == 0 or other.min < self.min:
+      self.min = other.min
+    if other.max > self.max:
+      self.max = other.max
+    self.count += other.count
+    self.zero_count += other.zero_count
+
+    counts = self.counts
+    for index, count in other.counts.items():
+      counts[index] = counts.get(index, 0) + count
+    return self
+
+  def quantile(self, q):
+    """Returns the estimated quantile q (from 0.0 to 1.0) of the values, or 0.0 without any."""
+    if self.count == 0:
+      return 0.0
+    rank = int(q * (self.count - 1))
+    if rank == 0:
+      return self.min
+    if rank == self.count - 1:
+      return self.max
+    if rank < self.zero_count:
+      return 0.0
+
+    seen = self.zero_count
+    for index in sorted(self.counts):
+      seen += self.counts[index]
+      if seen > rank:
+        return min(max(QuantileSketch.GAMMA ** index, self.min), self.max)
+    return self.max
+
+  def copy(self):
+    """Returns a copy of the sketch."""
+    return QuantileSketch().merge(self)
+
+  def to_dict(self):
+    """Returns the sketch as a (json serializable) hash."""
+    return {
+      'count': self.count,
+      'zero_count': self.zero_count,
+      'counts': dict((str(index), count) for index, count in self.counts.items()),
+      'min': self.min,
+      'max': self.max
+    }
+
+  @staticmethod
+  def from_dict(data):
+    """Returns the sketch of a hash returned by to_dict."""
+    sketch = QuantileSketch()
+    sketch.count = data['count']
+    sketch.zero_count = data['zero_count']
+    sketch.counts = dict((int(index), count) for index, count in data['counts'].items())
+    sketch.min = data['min']
+    sketch.max = data['max']
+    return sketch
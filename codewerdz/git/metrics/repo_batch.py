@@ -0,0 +1,65 @@
+import multiprocessing
+import traceback
+
+import codewerdz
+
+
+class RepoBatch(object):
+  """Runs a function in each of a list of local repositories, in a bounded pool of worker processes.
+
+  Each call is given the path of its repository as repo (which git commands run in, see
+  GitProcess), the working directory of the process is left alone. Every repository
+  gets a freshly forked worker (which doesn't pay for interpreter startup or imports), so the
+  memory of a large one is given back when it's done. Results are yielded as each repository
+  finishes, not in the given order.
+
+  Usage:
+    batch = RepoBatch(4, analyze_repo, (options,))  # calls analyze_repo(options, repo='../a')
+    for repo, result, error in batch.iterate_results(['../a', '../b']):
+      ...
+  """
+
+  def __init__(self, jobs, function, args=()):
+    """
+    Args:
+        jobs: The number of repositories analyzed at once.
+        function: A (module-level) function called with args and the repo=path of each repository,
+          and whose (picklable) return value is the repository's result.
+        args: The arguments of function. Default ()
+    """
+    self.jobs = jobs
+    self.function = function
+    self.args = tuple(args)
+
+  def iterate_results(self, repos):
+    """Yields a (repo, result, error) tuple per repo (a path) as it finishes.
+
+    If the function raised, result is None and error is a description of the exception,
+    the other repositories are still analyzed."""
+    tasks = [(repo, self.function, self.args) for repo in repos]
+    if self.jobs == 1 or len(tasks) <= 1:
+      for task in tasks:
+        yield _run_in_repo(task)
+      return
+
+    codewerdz.debug("Repos        : {} ({} jobs)".format(len(tasks), self.jobs))
+
+    pool = multiprocessing.Pool(min(self.jobs, len(tasks)), maxtasksperchild=1)
+    try:
+      for result in pool.imap_unordered(_run_in_repo, tasks):
+        yield result
+      pool.close()
+    finally:
+      pool.terminate()
+      pool.join()
+
+
+def _run_in_repo(task):
+  """Worker entry point: calls the function on the repository, returns (repo, result, error)."""
+  repo, function, args = task
+  try:
+    return repo, function(*args, repo=repo), None
+  except Exception as e:
+    # NOTE: not all exceptions can be pickled back from a worker (e.g. CalledProcessError)
+    codewerdz.debug(traceback.format_exc())
+    return repo, None, "{}: {}".format(type(e).__name__, e)
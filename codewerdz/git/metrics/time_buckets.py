@@ -0,0 +1,123 @@
+import calendar
+import datetime
+import re
+import time
+
+# e.g. +0200, -07:00 or +05
+UTC_OFFSET = re.compile(r'([+-])(\d\d):?(\d\d)?\Z')
+
+EPOCH = datetime.date(1970, 1, 1)
+
+
+class TimeBuckets(object):
+  """Computes the bucket keys of commits (e.g. '2017-month05') from their unix timestamps.
+
+  A commit's commit_date is shifted into the timezone the buckets are in: the committer's own
+  (the offset git shows in commit_date_iso, the default), the system's, UTC or a fixed offset.
+  Everything about a local day (its year, month, day of year, quarter and ISO week) is computed
+  once, the first time a commit falls on it, and kept in a calendar table for the rest of the
+  history, so bucketing a commit takes a few integer operations and lookups.
+
+  Precisions:
+    yearly, monthly, daily, hourly and quarterly are the local calendar's.
+    weekly counts the whole days from Jan 1st 00:00 UTC (of the local year) to the commit,
+    which is how the metrics have always been bucketed by week (weeks 0 to 53).
+    isoweekly is the ISO 8601 week, keyed by the ISO year it belongs to.
+
+  Usage:
+    buckets = TimeBuckets('utc')
+    buckets.keys(commit, ['yearly', 'monthly'])  # e.g. ['2017', '2017-month05']
+  """
+
+  TIMEZONE_COMMITTER = 'committer'
+  TIMEZONE_LOCAL = 'local'
+  TIMEZONE_UTC = 'utc'
+
+  # the precisions that only depend on the local day, which are kept in the calendar table
+  DAY_PRECISIONS = ['yearly', 'monthly', 'daily', 'quarterly', 'isoweekly']
+
+  def __init__(self, timezone=TIMEZONE_COMMITTER):
+    """
+    Args:
+        timezone: committer, local (the system's timezone), utc or a fixed offset like +0200.
+          Default committer
+    """
+    self.timezone = timezone
+    self.fixed_offset = parse_timezone(timezone)
+    # the calendar table: the row of each local day, by days since the epoch
+    self.days = {}
+    # the offset in seconds of each of the committers' timezones, e.g. -0700
+    self.offsets = {}
+
+  def local_time(self, commit):
+    """Returns the (timestamp, offset) of a commit, the offset being the timezone's in seconds."""
+    timestamp = int(commit['commit_date'])
+    if self.fixed_offset is not None:
+      return timestamp, self.fixed_offset
+
+    if self.timezone == self.TIMEZONE_LOCAL:
+      return timestamp, calendar.timegm(time.localtime(timestamp)) - timestamp
+
+    zone = commit['commit_date_iso'][-5:]
+    offset = self.offsets.get(zone)
+    if offset is None:
+      offset = self.offsets[zone] = parse_timezone(zone)
+    return timestamp, offset
+
+  def keys(self, commit, precisions):
+    """Returns the key of the commit's bucket for each of precisions (but total)."""
+    timestamp, offset = self.local_time(commit)
+    local = timestamp + offset
+    day = self.day(local // 86400)
+
+    keys = []
+    for precision in precisions:
+      if precision == 'weekly':
+        keys.append("{0}-week{1:0>2}".format(day['year'], (timestamp - day['year_start']) // 86400 // 7 + 1))
+      elif precision == 'hourly':
+        keys.append("{0}-hour{1:0>2}".format(day['daily'], local % 86400 // 3600))
+      else:
+        keys.append(day[precision])
+    return keys
+
+  def day(self, number):
+    """Returns the calendar table's row for the day number days after the epoch."""
+    row = self.days.get(number)
+    if row is None:
+      row = self.days[number] = calendar_day(number)
+    return row
+
+
+def calendar_day(number):
+  """Returns the keys of the day number days after the epoch, in each precision that only depends on the day."""
+  date = EPOCH + datetime.timedelta(days=number)
+  year = "{0:0>4}".format(date.year)
+  iso_year, iso_week, _ = date.isocalendar()
+  return {
+    'year': year,
+    'year_start': calendar.timegm((date.year, 1, 1, 0, 0, 0)),
+    'yearly': year,
+    'quarterly': "{0}-quarter{1}".format(year, (date.month - 1) // 3 + 1),
+    'monthly': "{0}-month{1:0>2}".format(year, date.month),
+    'isoweekly': "{0:0>4}-isoweek{1:0>2}".format(iso_year, iso_week),
+    'daily': "{0}-day{1:0>3}".format(year, date.timetuple().tm_yday)
+  }
+
+
+def parse_timezone(timezone):
+  """Returns the offset in seconds of a fixed timezone (utc or e.g. +0200), or None for committer and local.
+
+  Raises:
+      ValueError: If timezone isn't a valid timezone.
+  """
+  if timezone in (TimeBuckets.TIMEZONE_COMMITTER, TimeBuckets.TIMEZONE_LOCAL):
+    return None
+  if timezone.lower() == TimeBuckets.TIMEZONE_UTC:
+    return 0
+
+  match = UTC_OFFSET.match(timezone)
+  if not match:
+    raise ValueError("Not a timezone: {} (committer, local, utc or an offset like +0200)".format(timezone))
+  sign, hours, minutes = match.groups()
+  offset = int(hours) * 3600 + int(minutes or 0) * 60
+  return -offset if sign == '-' else offset
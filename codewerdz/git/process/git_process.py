@@ -7,15 +7,20 @@ class GitProcess(LineOutputShellProcess):
   GIT_EXECUTABLE = 'git'
   GIT_PAGER_OPTION = '--no-pager'
 
-  def __init__(self):
-    pass
+  def __init__(self, repo=None):
+    """
+    Args:
+        repo: The path of the repo to execute git commands in. Default None (the current directory's)
+    """
+    self.repo = repo
 
-  def get_lines(self, subcommand, params=[]):
+  def get_lines(self, subcommand, params=[], input_lines=None):
     """Executes an external git command and returns its output as an iterator of lines.
 
     Args:
         subcommand: The git subcommand to execute (e.g. 'log', 'clone', etc.)
         params: A sequence of strings to be passed as parameters to the subcommand. Default []
+        input_lines: An optional sequence of strings to be written to the subcommand's stdin. Default None
 
     Returns:
         A iterator of strings, with each string being a single line of output from the command.
@@ -24,4 +29,4 @@ class GitProcess(LineOutputShellProcess):
         CalledProcessError: Raised if the shell command returns a non-zero exit code.
     """
     git_command = [GitProcess.GIT_EXECUTABLE, GitProcess.GIT_PAGER_OPTION, subcommand] + params
-    return super(GitProcess, self).get_lines(git_command)
+    return super(GitProcess, self).get_lines(git_command, input_lines, self.repo)
@@ -1,16 +1,34 @@
 from subprocess import CalledProcessError, Popen, PIPE
 
 import codewerdz
+from codewerdz.git.process.threaded_line_reader import ThreadedLineReader
+from codewerdz.git.profiler import profiled
 
 
 class LineOutputShellProcess(object):
   """A class for executing a shell command, and returning each line of output in an interator."""
 
-  def get_lines(self, command):
+  # reads the output one line at a time, taking turns with the command on the pipe
+  READER_LINES = 'lines'
+  # reads the output in large chunks on a background thread, while the lines are consumed (see ThreadedLineReader)
+  READER_THREADED = 'threaded'
+
+  READERS = [READER_THREADED, READER_LINES]
+
+  # the reader of every command's output (set once, e.g. by the CLI)
+  reader = READER_THREADED
+
+  def get_lines(self, command, input_lines=None, cwd=None):
     """Executes a shell command and returns its output as an iterator of lines.
 
+    If the iterator isn't consumed to its end (e.g. it's closed, or the consumer fails),
+    the command is killed.
+
     Args:
         command: A sequence of strings to be executed as a shell command.
+        input_lines: An optional sequence of strings to be written to the command's stdin,
+          one per line, before its output is read. Default None (stdin is inherited).
+        cwd: The directory to execute the command in. Default None (the current directory)
 
     Returns:
         An iterator of strings. Each string is one line of output.
@@ -19,12 +37,36 @@ class LineOutputShellProcess(object):
         CalledProcessError: Raised if the shell command returns a non-zero exit code.
     """
     codewerdz.debug("Executing    : {}".format(" ".join(command)))
-    p = Popen(command, stdout=PIPE, bufsize=1)
-    with p.stdout:
-      for line in iter(p.stdout.readline, b''):
-        yield line[:-1]
+    if input_lines is None:
+      p = Popen(command, stdout=PIPE, bufsize=1, cwd=cwd)
+    else:
+      p = Popen(command, stdin=PIPE, stdout=PIPE, bufsize=1, cwd=cwd)
+      # NOTE: this assumes the command consumes all of its input before producing output
+      # (e.g. `git log --stdin`), otherwise the pipes could deadlock.
+      with p.stdin:
+        for line in input_lines:
+          p.stdin.write(line + "\n")
+
+    reader = None
+    completed = False
+    try:
+      if self.reader == self.READER_THREADED:
+        reader = ThreadedLineReader(p.stdout)
+        lines = iter(reader)
+      else:
+        lines = (line[:-1] for line in iter(p.stdout.readline, b''))
+
+      for line in profiled('git', lines, size=len, batch_size=1024):
+        yield line
+      completed = True
+    finally:
+      if not completed and p.poll() is None:
+        p.kill()
+      if reader is not None:
+        reader.close()
+      p.stdout.close()
+      # wait for the subprocess to exit
+      return_code = p.wait()
 
-    # wait for the subprocess to exit
-    return_code = p.wait()
     if return_code != 0:
       raise CalledProcessError(return_code, command)
@@ -0,0 +1,83 @@
+import os
+import threading
+
+try:
+  from queue import Empty, Queue
+except ImportError:
+  from Queue import Empty, Queue
+
+
+class ThreadedLineReader(object):
+  """Reads the lines of a file (e.g. the stdout pipe of a process) on a background thread.
+
+  The thread reads large chunks as soon as they're available (with os.read, bypassing the
+  file's own buffering) into a bounded queue, so that the writer (e.g. git) keeps producing
+  output while the lines already read are being consumed, instead of both taking turns on a
+  pipe buffer. The chunks are split into lines as they're consumed.
+
+  Usage:
+    reader = ThreadedLineReader(p.stdout)
+    try:
+      for line in reader:
+        ...
+    finally:
+      reader.close()
+  """
+
+  CHUNK_SIZE = 1024 * 1024
+  QUEUE_SIZE = 8
+
+  def __init__(self, f, chunk_size=CHUNK_SIZE, queue_size=QUEUE_SIZE):
+    """
+    Args:
+        f: The file to read, nothing must have been read from it yet.
+        chunk_size: The maximum bytes of a read. Default CHUNK_SIZE
+        queue_size: The maximum chunks read ahead of the consumer. Default QUEUE_SIZE
+    """
+    self.fd = f.fileno()
+    self.chunk_size = chunk_size
+    self.queue = Queue(queue_size)
+    self.stopped = False
+    self.thread = threading.Thread(target=self._produce, name='ThreadedLineReader')
+    self.thread.daemon = True
+    self.thread.start()
+
+  def __iter__(self):
+    """Yields the lines of the file (without their line feed), until the end of the file."""
+    get = self.queue.get
+    pending = b''
+    while True:
+      chunk = get()
+      if isinstance(chunk, Exception):
+        raise chunk
+      if not chunk:
+        break
+      lines = (pending + chunk).split(b'\n') if pending else chunk.split(b'\n')
+      # the last line is incomplete (or empty), until the next chunk or the end of the file
+      pending = lines.pop()
+      for line in lines:
+        yield line
+    if pending:
+      yield pending
+
+  def close(self):
+    """Stops the thread, once the file was read to its end (or its writer is gone)."""
+    self.stopped = True
+    while self.thread.is_alive():
+      # unblock the thread if it's waiting on a full queue
+      try:
+        self.queue.get_nowait()
+      except Empty:
+        pass
+      self.thread.join(0.01)
+
+  def _produce(self):
+    read, put = os.read, self.queue.put
+    try:
+      while not self.stopped:
+        chunk = read(self.fd, self.chunk_size)
+        put(chunk)
+        if not chunk:
+          return
+    except (IOError, OSError) as e:
+      put(e)
@@ -0,0 +1,277 @@
+import contextlib
+import heapq
+import itertools
+import json
+import sys
+import time
+
+import codewerdz
+
+try:
+  import resource
+except ImportError:
+  resource = None
+
+try:
+  import tracemalloc
+except ImportError:
+  tracemalloc = None
+
+# the stage of the time spent outside of every other stage
+STAGE_OTHER = 'other'
+
+# the CPU time of this process (which time.clock measures on Unix, before Python 3.3)
+try:
+  _cpu_time = time.process_time
+except AttributeError:
+  _cpu_time = time.clock
+
+
+class Profiler(object):
+  """Records where the time of a run goes, stage by stage.
+
+  The stages are nested blocks of code (see enter and exit): the wall and CPU time spent in a
+  stage is its own, the time of the stages entered while in it is theirs. The stages of a run are:
+
+    git: waiting on (and reading) the output of git
+    parse/object_store: reading commits out of git log's output, or out of the object store
+    diff: deriving the stats of a file diff (with whatthepatch or DiffStatsStream)
+    analyze_changes: GitLogParser.analyze_changes (whatthepatch diffs only)
+    analyze: the metrics' accumulation (and finalization, unless done lazily while output)
+    output: formatting and writing the output
+    other: everything else (e.g. startup)
+
+  Each stage also counts its items (lines, commits, diffs) and bytes, the slowest commits to read
+  are kept by sha, and a line of progress (commits/sec) is logged every progress_interval seconds.
+
+  There is a single profiler per process (see start and current), and none unless profiling,
+  so that the instrumented code costs next to nothing (see profiled and profiled_stage). Worker
+  processes (--jobs) aren't profiled, the time spent waiting on them is their consumer's.
+
+  Usage:
+    profiler = Profiler.start()
+    with profiled_stage('analyze'):
+      for commit in profiled('parse', commits, commits=True):
+        ...
+    Profiler.stop().dump('-')
+  """
+
+  PROGRESS_INTERVAL = 10.0
+  SLOWEST_COUNT = 10
+
+  _current = None
+
+  def __init__(self, progress_interval=PROGRESS_INTERVAL, slowest_count=SLOWEST_COUNT):
+    """
+    Args:
+        progress_interval: The seconds between lines of progress, None for none. Default 10.0
+        slowest_count: The number of slowest commits to keep. Default 10
+    """
+    self.progress_interval = progress_interval
+    self.slowest_count = slowest_count
+    # [wall time, CPU time, items, bytes] by stage name
+    self.stages = {}
+    self.stack = [self._stage(STAGE_OTHER)]
+    self.start_wall = self.wall = time.time()
+    self.start_cpu = self.cpu = _cpu_time()
+    self.commits = 0
+    self.slowest = []
+    self.last_progress = self.start_wall
+
+  @staticmethod
+  def start(**kwargs):
+    """Starts profiling this process, returns the new current profiler (see __init__ for kwargs)."""
+    Profiler._current = Profiler(**kwargs)
+    return Profiler._current
+
+  @staticmethod
+  def stop():
+    """Stops profiling this process, returns the profiler that was current (None if none)."""
+    profiler, Profiler._current = Profiler._current, None
+    return profiler
+
+  @staticmethod
+  def current():
+    """Returns the profiler of this process, None unless profiling."""
+    return Profiler._current
+
+  def enter(self, name):
+    """Starts timing stage name, until the matching exit."""
+    self._switch()
+    self.stack.append(self._stage(name))
+
+  def exit(self, items=0, size=0):
+    """Stops timing the stage entered last, adding items and (bytes of) size to it."""
+    self._switch()
+    stage = self.stack.pop()
+    stage[2] += items
+    stage[3] += size
+
+  def count(self, name, items=0, size=0):
+    """Adds items and (bytes of) size to stage name, without timing it."""
+    stage = self._stage(name)
+    stage[2] += items
+    stage[3] += size
+
+  def iterate(self, name, iterable, size=None, commits=False, batch_size=1):
+    """Yields the items of iterable, timing their production as stage name.
+
+    Args:
+        name: The stage name.
+        iterable: The items.
+        size: A function of an item, returning its size in bytes. Default None
+        commits: Whether the items are commit hashes, to keep the slowest ones and log progress. Default False
+        batch_size: The number of items produced (read ahead) at once, so that they're timed at once. Default 1
+    """
+    iterator = iter(iterable)
+    while True:
+      self.enter(name)
+      start = self.wall
+      try:
+        items = list(itertools.islice(iterator, batch_size))
+      finally:
+        self.exit(len(items), sum(size(item) for item in items) if size is not None and items else 0)
+      if not items:
+        return
+
+      for item in items:
+        if commits:
+          self._commit(item, self.wall - start)
+        yield item
+
+  def timed(self, name, function, items=0):
+    """Returns function, with each call timed as stage name (adding items to it)."""
+    def timed_function(*args, **kwargs):
+      self.enter(name)
+      try:
+        return function(*args, **kwargs)
+      finally:
+        self.exit(items)
+    return timed_function
+
+  def timed_feed(self, name, obj, batch_size=1024):
+    """Returns a stand-in for obj, an object that's fed items (e.g. a diff's lines) then asked for its result.
+
+    The items are buffered, and fed to obj batch_size at a time (and when its result is asked for),
+    each batch timed as a single call of stage name, instead of timing each feed on its own."""
+    def feed_all(items):
+      feed = obj.feed
+      for item in items:
+        feed(item)
+    return _BufferedFeed(self.timed(name, feed_all), self.timed(name, obj.result, items=1), batch_size)
+
+  def report(self):
+    """Returns the profile so far, as a (JSON serializable) dict."""
+    self._switch()
+    wall_time = self.wall - self.start_wall
+    stages = dict((name, {
+      'wall_time': round(wall, 6),
+      'cpu_time': round(cpu, 6),
+      'items': items,
+      'bytes': size
+    }) for name, (wall, cpu, items, size) in self.stages.items())
+
+    report = {
+      'wall_time': round(wall_time, 6),
+      'cpu_time': round(self.cpu - self.start_cpu, 6),
+      'commits': self.commits,
+      'commits_per_sec': round(self.commits / wall_time, 1) if wall_time else None,
+      'stages': stages,
+      'slowest_commits': [{'sha': sha, 'wall_time': round(seconds, 6)}
+                          for seconds, sha in sorted(self.slowest, reverse=True)],
+      'peak_rss': None,
+      'git_cpu_time': None,
+      'peak_traced_memory': None
+    }
+    if resource is not None:
+      # NOTE: ru_maxrss is in KiB on Linux, and child processes (git) are only counted once they exit
+      report['peak_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+      children = resource.getrusage(resource.RUSAGE_CHILDREN)
+      report['git_cpu_time'] = round(children.ru_utime + children.ru_stime, 6)
+    if tracemalloc is not None and tracemalloc.is_tracing():
+      report['peak_traced_memory'] = tracemalloc.get_traced_memory()[1]
+    return report
+
+  def dump(self, path):
+    """Writes the report as JSON to the file at path, or to stderr if path is '-'."""
+    if path == '-':
+      json.dump(self.report(), sys.stderr, indent=2, sort_keys=True)
+      sys.stderr.write("\n")
+      return
+    with open(path, 'w') as f:
+      json.dump(self.report(), f, indent=2, sort_keys=True)
+      f.write("\n")
+
+  def _stage(self, name):
+    stage = self.stages.get(name)
+    if stage is None:
+      stage = self.stages[name] = [0.0, 0.0, 0, 0]
+    return stage
+
+  def _switch(self):
+    # charges the time since the last switch to the current stage
+    wall = time.time()
+    cpu = _cpu_time()
+    stage = self.stack[-1]
+    stage[0] += wall - self.wall
+    stage[1] += cpu - self.cpu
+    self.wall = wall
+    self.cpu = cpu
+
+  def _commit(self, commit, seconds):
+    self.commits += 1
+    entry = (seconds, commit.get('sha'))
+    if len(self.slowest) < self.slowest_count:
+      heapq.heappush(self.slowest, entry)
+    elif self.slowest_count:
+      heapq.heappushpop(self.slowest, entry)
+
+    if self.progress_interval is not None and self.wall - self.last_progress >= self.progress_interval:
+      self.last_progress = self.wall
+      codewerdz.info("Progress     : {} commits ({:.0f} commits/sec)".format(
+        self.commits, self.commits / (self.wall - self.start_wall)))
+
+
+class _BufferedFeed(object):
+  """A stand-in for an object that's fed items, see Profiler.timed_feed."""
+
+  __slots__ = ['items', 'feed_all', 'fed_result', 'batch_size']
+
+  def __init__(self, feed_all, fed_result, batch_size):
+    self.items = []
+    self.feed_all = feed_all
+    self.fed_result = fed_result
+    self.batch_size = batch_size
+
+  def feed(self, item):
+    self.items.append(item)
+    if len(self.items) >= self.batch_size:
+      self.feed_all(self.items)
+      self.items = []
+
+  def result(self):
+    if self.items:
+      self.feed_all(self.items)
+      self.items = []
+    return self.fed_result()
+
+
+def profiled(name, iterable, size=None, commits=False, batch_size=1):
+  """Returns iterable, timed as stage name if profiling (see Profiler.iterate)."""
+  profiler = Profiler.current()
+  return iterable if profiler is None else profiler.iterate(name, iterable, size, commits, batch_size)
+
+
+@contextlib.contextmanager
+def profiled_stage(name):
+  """Times the block as stage name, if profiling."""
+  profiler = Profiler.current()
+  if profiler is None:
+    yield
+    return
+
+  profiler.enter(name)
+  try:
+    yield
+  finally:
+    profiler.exit()
@@ -0,0 +1,196 @@
+import os
+import re
+
+try:
+  from urlparse import urlparse
+except ImportError:
+  from urllib.parse import urlparse
+
+# e.g. [core], [remote "origin"] or the legacy [branch.main]
+SECTION = re.compile(r'\s*\[\s*([-.\w]+?)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+KEY = re.compile(r'\s*([A-Za-z][-\w]*)\s*(=?)')
+ESCAPES = {'n': '\n', 't': '\t', 'b': '\b', '"': '"', '\\': '\\'}
+
+
+class RepoConfig(object):
+  """The git configuration of a repository, read from its config files without running git.
+
+  The system, global (and XDG) and repository config files are read in the order git reads
+  them, so the last value of a key is the one `git config` would output. Config files that
+  include others aren't followed, and values this parser can't read (e.g. an unterminated quote)
+  aren't guessed at: load returns None for them instead, so that git reads them.
+
+  Usage:
+    config = RepoConfig.load()
+    config.remote_url('origin')  # e.g. 'git@github.com:codewerdz/codewerdz-git.git'
+  """
+
+  def __init__(self, values=None):
+    """
+    Args:
+        values: The values of each (section, subsection, key), in the order they were read. Default {}
+    """
+    self.values = values if values is not None else {}
+
+  @staticmethod
+  def load(path='.'):
+    """Returns the RepoConfig of the repository at (or above) path, or None if it can't be read without git."""
+    git_dir = RepoConfig.git_dir(path)
+    if git_dir is None:
+      return None
+
+    # the worktrees of a repository share its config
+    common_dir = git_dir
+    commondir_path = os.path.join(git_dir, 'commondir')
+    if os.path.isfile(commondir_path):
+      with open(commondir_path) as f:
+        common_dir = os.path.join(git_dir, f.read().strip())
+
+    config = RepoConfig()
+    for config_path in _config_paths() + [os.path.join(common_dir, 'config')]:
+      if os.path.isfile(config_path):
+        with open(config_path) as f:
+          try:
+            config.read(f)
+          except ValueError:
+            return None
+    if any(section in ('include', 'includeif') for section, _, _ in config.values):
+      return None
+    return config
+
+  @staticmethod
+  def git_dir(path='.'):
+    """Returns the git directory of the repository at (or above) path, or None."""
+    if os.environ.get('GIT_DIR'):
+      return os.path.abspath(os.environ['GIT_DIR'])
+
+    path = os.path.abspath(path)
+    while True:
+      dot_git = os.path.join(path, '.git')
+      if os.path.isdir(dot_git):
+        return dot_git
+      if os.path.isfile(dot_git):
+        # a worktree or submodule: "gitdir: <path>"
+        with open(dot_git) as f:
+          line = f.readline().strip()
+        if line.startswith('gitdir:'):
+          return os.path.join(path, line[len('gitdir:'):].strip())
+      if os.path.isfile(os.path.join(path, 'HEAD')) and os.path.isdir(os.path.join(path, 'objects')):
+        # a bare repository
+        return path
+
+      parent = os.path.dirname(path)
+      if parent == path:
+        return None
+      path = parent
+
+  def read(self, f):
+    """Reads the values of a config file (f), after the values already read."""
+    section = subsection = None
+    lines = iter(f)
+    for line in lines:
+      match = SECTION.match(line)
+      if match:
+        section, subsection = match.groups()
+        if subsection is not None:
+          subsection = re.sub(r'\\(.)', r'\1', subsection)
+        elif '.' in section:
+          # [section.subsection] is the legacy (case insensitive) syntax of [section "subsection"]
+          section, subsection = section.split('.', 1)
+          subsection = subsection.lower()
+        section = section.lower()
+        line = line[match.end():]
+
+      match = KEY.match(line)
+      if not match or section is None:
+        continue
+      key, equals = match.groups()
+      # a key without a value is a true boolean
+      value = _parse_value(line[match.end():], lines) if equals else 'true'
+      self.values.setdefault((section, subsection, key.lower()), []).append(value)
+
+  def get(self, section, key, subsection=None, default=None):
+    """Returns the (last) value of the key, e.g. get('remote', 'url', 'origin'), or default."""
+    values = self.values.get((section, subsection, key.lower()))
+    return values[-1] if values else default
+
+  def remote_url(self, remote='origin'):
+    """Returns the URL of a remote, rewritten by the url.<base>.insteadOf settings.
+
+    Like `git ls-remote --get-url`, a remote that isn't configured is its own URL."""
+    values = self.values.get(('remote', remote, 'url'))
+    url = values[0] if values else remote
+
+    # the longest matching insteadOf is replaced by its base
+    rewrite = None
+    for (section, base, key), prefixes in self.values.items():
+      if section == 'url' and key == 'insteadof':
+        for prefix in prefixes:
+          if url.startswith(prefix) and (rewrite is None or len(prefix) > len(rewrite[1])):
+            rewrite = (base, prefix)
+    if rewrite is not None:
+      url = rewrite[0] + url[len(rewrite[1]):]
+    return url
+
+
+def repo_url(path='.'):
+  """Returns the URL of the origin remote of the repository at path (read from its config if possible)."""
+  config = RepoConfig.load(path)
+  if config is not None:
+    return config.remote_url('origin')
+
+  from codewerdz.git.process.git_process import GitProcess
+  return list(GitProcess().get_lines("-C", [path, "ls-remote", "--get-url", "origin"]))[0]
+
+
+def repo_name(url):
+  """Returns the name of a repository from its URL, e.g. codewerdz/codewerdz-git."""
+  return urlparse(url).path[1:].split(':')[-1]
+
+
+def _config_paths():
+  """Returns the paths of the system, XDG and global config files, in the order git reads them."""
+  paths = []
+  if not os.environ.get('GIT_CONFIG_NOSYSTEM'):
+    paths.append('/etc/gitconfig')
+  home = os.path.expanduser('~')
+  xdg_config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(home, '.config')
+  paths.append(os.path.join(xdg_config_home, 'git', 'config'))
+  paths.append(os.environ.get('GIT_CONFIG_GLOBAL') or os.path.join(home, '.gitconfig'))
+  return paths
+
+
+def _parse_value(text, lines):
+  """Returns the value starting at text, reading the next lines if it continues on them."""
+  value = []
+  # the length of value without its trailing whitespace (outside of quotes)
+  length = 0
+  quoted = False
+  i = 0
+  while True:
+    if i >= len(text) or text[i] == '\n':
+      if quoted:
+        raise ValueError("Unterminated quote in config value: {}".format(text))
+      break
+    c = text[i]
+    i += 1
+    if c == '\\':
+      if i >= len(text) or text[i] in '\r\n':
+        # a line continuation
+        text, i = next(lines, ''), 0
+        continue
+      value.append(ESCAPES.get(text[i], text[i]))
+      length = len(value)
+      i += 1
+    elif c == '"':
+      quoted = not quoted
+      length = len(value)
+    elif c in '#;' and not quoted:
+      break
+    elif c.isspace() and not quoted:
+      if value:
+        value.append(c)
+    else:
+      value.append(c)
+      length = len(value)
+  return ''.join(value[:length])
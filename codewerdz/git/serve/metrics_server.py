@@ -0,0 +1,170 @@
+import calendar
+import datetime
+import json
+import traceback
+
+import iso8601
+
+try:
+  from http.server import BaseHTTPRequestHandler, HTTPServer
+  from socketserver import ThreadingMixIn
+  from urllib.parse import parse_qs, urlparse
+except ImportError:
+  from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+  from SocketServer import ThreadingMixIn
+  from urlparse import parse_qs, urlparse
+
+import codewerdz
+import codewerdz.git.metrics
+
+from codewerdz.git.metrics.analysis import ANALYZERS
+from codewerdz.git.metrics.metrics_command import FORMAT_CSV, FORMAT_JSON, FORMATS, json_date
+from codewerdz.git.metrics.metrics_csv_printer import MetricsCsvPrinter
+from codewerdz.git.metrics.time_buckets import TimeBuckets, parse_timezone
+from codewerdz.git.streaming_json_printer import StreamingJsonPrinter
+
+
+class MetricsServer(ThreadingMixIn, HTTPServer):
+  """A local HTTP server answering metrics queries from the warm commits of its repos (see WarmRepo).
+
+  Each request is handled on its own thread, and refreshes the repos it queries first (which
+  only parses their new commits, if their HEAD moved).
+
+  Endpoints:
+    GET /repos
+        The name, url, head and number of warm commits of each repo.
+    GET /metrics?repo=...&precision=...&metric=...&since=...&until=...&timezone=...&analyzer=...&format=...
+        The output of the metrics command for the repos (default all of them). precision and metric
+        can be repeated, and default to the metrics command's. since and until are unix timestamps
+        or ISO 8601 dates (midnight UTC if there's no time), and bound the commit dates analyzed.
+
+  Usage:
+    server = MetricsServer(('127.0.0.1', 8000), [WarmRepo('.', options)])
+    server.serve_forever()
+  """
+
+  daemon_threads = True
+
+  def __init__(self, address, repos):
+    """
+    Args:
+        address: The (host, port) to listen on, port 0 picks a free port.
+        repos: The WarmRepo of each repo served, by their (unique) names.
+    """
+    HTTPServer.__init__(self, address, _MetricsRequestHandler)
+    self.repos = dict((repo.name, repo) for repo in repos)
+
+
+class _QueryError(Exception):
+  """A query that can't be answered, and the HTTP status it's answered with."""
+
+  def __init__(self, status, message):
+    super(_QueryError, self).__init__(message)
+    self.status = status
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+  def do_GET(self):
+    url = urlparse(self.path)
+    query = parse_qs(url.query)
+    try:
+      if url.path == '/repos':
+        self._send_json(self._repos())
+      elif url.path == '/metrics':
+        output, metric, output_format = self._metrics(query)
+        self._send_headers(200, 'text/csv' if output_format == FORMAT_CSV else 'application/json')
+        if output_format == FORMAT_CSV:
+          MetricsCsvPrinter.dump(output, metric, self.wfile)
+        else:
+          StreamingJsonPrinter.dump(output, self.wfile)
+      else:
+        raise _QueryError(404, "Not found: {}".format(url.path))
+    except _QueryError as e:
+      self._send_json({'error': str(e)}, e.status)
+    except Exception as e:
+      codewerdz.info("ERROR: Failed to answer {}: {}".format(self.path, e))
+      codewerdz.debug(traceback.format_exc())
+      self._send_json({'error': "{}: {}".format(type(e).__name__, e)}, 500)
+
+  def log_message(self, format, *args):
+    codewerdz.debug("Request      : {}".format(format % args))
+
+  def _repos(self):
+    repos = {}
+    for name, repo in self.server.repos.items():
+      head = repo.refresh()
+      repos[name] = {'url': repo.url, 'head': head, 'commit_count': len(repo.commits)}
+    return {'repos': repos}
+
+  def _metrics(self, query):
+    """Returns the output of the query (like the metrics command's), its metrics and format."""
+    names = query.get('repo') or sorted(self.server.repos)
+    unknown = [name for name in names if name not in self.server.repos]
+    if unknown:
+      raise _QueryError(404, "Unknown repo: {}".format(', '.join(unknown)))
+
+    metrics_precision = _choices(query, 'precision', codewerdz.git.metrics.PRECISION_CHOICES,
+                                 codewerdz.git.metrics.DEFAULT_PRECISION)
+    metric = _choices(query, 'metric', codewerdz.git.metrics.METRICS_CHOICES, codewerdz.git.metrics.DEFAULT_METRICS)
+    analyzer = _choices(query, 'analyzer', sorted(ANALYZERS), ['streaming'])[-1]
+    output_format = _choices(query, 'format', FORMATS, [FORMAT_JSON])[-1]
+    timezone = query.get('timezone', [TimeBuckets.TIMEZONE_COMMITTER])[-1]
+    try:
+      parse_timezone(timezone)
+    except ValueError as e:
+      raise _QueryError(400, str(e))
+    since = _timestamp(query, 'since')
+    until = _timestamp(query, 'until')
+
+    output = {'repos': {}}
+    for name in names:
+      repo = self.server.repos[name]
+      head = repo.refresh()
+      metrics, commit_count = repo.metrics(metrics_precision, metric, since, until, ANALYZERS[analyzer], timezone,
+                                           lazy=True)
+      output['repos'][name] = {
+        "url": repo.url,
+        "analysis_date": json_date(datetime.datetime.utcnow()),
+        "date_range": {
+          "start_date": query.get('since', [None])[-1],
+          "end_date": query.get('until', [None])[-1]
+        },
+        "head": head,
+        "commit_count": commit_count,
+        "metrics": metrics
+      }
+    return output, metric, output_format
+
+  def _send_headers(self, status, content_type):
+    self.send_response(status)
+    self.send_header('Content-Type', content_type)
+    self.end_headers()
+
+  def _send_json(self, value, status=200):
+    self._send_headers(status, 'application/json')
+    self.wfile.write(json.dumps(value, indent=2, sort_keys=True).encode('utf-8'))
+
+
+def _choices(query, name, choices, default):
+  """Returns the values of the query parameter name, which must be choices, or default."""
+  values = query.get(name)
+  if not values:
+    return list(default)
+  invalid = [value for value in values if value not in choices]
+  if invalid:
+    raise _QueryError(400, "Invalid {}: {} (one of {})".format(name, ', '.join(invalid), ', '.join(choices)))
+  return values
+
+
+def _timestamp(query, name):
+  """Returns the unix timestamp of the query parameter name (a timestamp or an ISO 8601 date), or None."""
+  values = query.get(name)
+  if not values:
+    return None
+  value = values[-1]
+  if value.isdigit():
+    return int(value)
+  try:
+    return calendar.timegm(iso8601.parse_date(value).utctimetuple())
+  except iso8601.ParseError as e:
+    raise _QueryError(400, "Invalid {}: {} ({})".format(name, value, e))
@@ -0,0 +1,63 @@
+import os
+import time
+
+import codewerdz
+
+from codewerdz.git.metrics.metrics_command import read_repos_file
+from codewerdz.git.repo_config import repo_name, repo_url
+from codewerdz.git.serve.metrics_server import MetricsServer
+from codewerdz.git.serve.warm_repo import WarmRepo
+
+import click
+
+
+@click.command()
+@click.option('--host', help="Address to listen on.", default='127.0.0.1')
+@click.option('--port', help="Port to listen on.", default=8000, type=click.IntRange(0, 65535))
+@click.option('--repo', help="Path of a repo to serve, instead of the current one.", multiple=True, type=click.Path(exists=True, file_okay=False))
+@click.option('--repos-file', help="File listing repos to serve, one per line: a path, optionally followed by a name and a URL.", default=None, type=click.Path(exists=True, dir_okay=False))
+@click.pass_context
+def serve(ctx, host, port, repo, repos_file):
+  """Serves metrics queries over HTTP, from the stats of every commit kept in memory (see MetricsServer)."""
+
+  options = ctx.obj.copy()
+
+  # Print Options
+  codewerdz.debug("Listen       : {}:{}".format(host, port))
+
+  if options['commits_limit']:
+    raise click.UsageError("--commits-limit can't be combined with serve.")
+
+  repos = [(path, None, None) for path in repo]
+  if repos_file:
+    repos += read_repos_file(repos_file)
+
+  if repos:
+    if options['repo_name'] or options['repo_url']:
+      raise click.UsageError("--repo-name and --repo-url can't be combined with --repo or --repos-file.")
+    warm_repos = [WarmRepo(path, options, name, url) for path, name, url in repos]
+  else:
+    url = options['repo_url'] or repo_url()
+    name = options['repo_name'] or repo_name(url)
+    warm_repos = [WarmRepo(os.getcwd(), options, name, url)]
+
+  names = [warm_repo.name for warm_repo in warm_repos]
+  for name in set(names):
+    if names.count(name) > 1:
+      raise click.UsageError("Two repos are named {}, name them in the --repos-file.".format(name))
+
+  # warm every repo before taking queries
+  for warm_repo in warm_repos:
+    start = time.time()
+    warm_repo.refresh()
+    codewerdz.info("Warmed       : {} ({} commits in {:.1f}s)".format(
+      warm_repo.name, len(warm_repo.commits), time.time() - start))
+
+  server = MetricsServer((host, port), warm_repos)
+  codewerdz.info("Serving      : http://{}:{}/metrics".format(*server.server_address[:2]))
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
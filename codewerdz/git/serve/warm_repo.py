@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+import codewerdz
+
+from codewerdz.git.log.commits import iterate_commits
+from codewerdz.git.metrics.analysis_state import head_commit, is_ancestor
+from codewerdz.git.metrics.commit_analyzer import CommitAnalyzer
+from codewerdz.git.metrics.time_buckets import TimeBuckets
+from codewerdz.git.repo_config import repo_url
+
+# the stats of a diff that the analyzers use
+STATS = ['chars_changed', 'chars_of_code', 'chars_of_docs']
+
+
+class WarmRepo(object):
+  """The per-commit stats of a repository, kept in memory to answer metrics queries from.
+
+  Each commit is kept as a rollup of its diffs' stats (with its author and dates), which is all
+  the analyzers need to bucket and aggregate it, so any precision, metric, timezone or date
+  range can be computed without running git. When the repository's HEAD moves, only the commits
+  since the last refresh are parsed (everything is, if history was rewritten). Concurrent
+  refreshes share a single git log: the callers that find one in flight wait for it, and then
+  find the commits up to date.
+
+  Usage:
+    repo = WarmRepo('../project', options)
+    repo.refresh()
+    metrics = repo.metrics(['total', 'monthly'], ['commit_count'], since=1483228800)
+  """
+
+  def __init__(self, path, options, name=None, url=None):
+    """
+    Args:
+        path: The path of the repository.
+        options: The CLI's options (see cli), e.g. docs_pattern, exclude_path and jobs.
+        name: The name of the repository. Default None (the directory's name)
+        url: The URL of the repository. Default None (its origin's, read on the first refresh)
+    """
+    self.path = os.path.abspath(path)
+    self.name = name or os.path.basename(self.path)
+    self.url = url
+    self.options = options
+    # (head, commits) swapped at once by refresh, so a query never sees a mix of two refreshes
+    self.state = (None, [])
+    self.refresh_lock = threading.Lock()
+
+  @property
+  def head(self):
+    return self.state[0]
+
+  @property
+  def commits(self):
+    """The rollups of the commits, newest first (like git log)."""
+    return self.state[1]
+
+  def refresh(self):
+    """Parses the commits since the last refresh if HEAD moved, returns the HEAD the commits are up to date with."""
+    head = self.current_head()
+    if head == self.head:
+      return head
+
+    with self.refresh_lock:
+      # another request refreshed the commits while this one waited
+      if head == self.head:
+        return head
+
+      start = time.time()
+      if self.url is None:
+        self.url = repo_url(self.path)
+
+      previous_head, previous_commits = self.state
+      if previous_head is not None and is_ancestor(previous_head, head, self.path):
+        revisions = ['{}..{}'.format(previous_head, head)]
+      else:
+        if previous_head is not None:
+          codewerdz.info("History of {} was rewritten, reloading its commits.".format(self.name))
+        revisions = [head]
+        previous_commits = []
+
+      commits = [rollup(commit) for commit in self._iterate_commits(revisions)]
+
+      self.state = (head, commits + previous_commits)
+      codewerdz.debug("Refreshed    : {} {} ({} new commits in {:.1f}s)".format(
+        self.name, revisions[0], len(commits), time.time() - start))
+    return head
+
+  def current_head(self):
+    """Returns the full SHA of the repository's HEAD commit."""
+    return head_commit(self.path)
+
+  def metrics(self, metrics_precision, metric, since=None, until=None, analyzer=CommitAnalyzer,
+              timezone=TimeBuckets.TIMEZONE_COMMITTER, lazy=False):
+    """Returns the metrics of the commits (see CommitAnalyzer.finalize_metrics), and the number of commits analyzed.
+
+    The commits as of the last refresh are analyzed.
+
+    Args:
+        metrics_precision: The precisions to output.
+        metric: The metrics to output.
+        since: The unix timestamp of the oldest commit date to analyze. Default None (no limit)
+        until: The unix timestamp of the newest commit date to analyze. Default None (no limit)
+        analyzer: The CommitAnalyzer class aggregating the commits. Default CommitAnalyzer
+        timezone: The timezone commits are bucketed in, see TimeBuckets. Default committer
+        lazy: Whether to finalize the buckets as they are looked up, see FinalizedBuckets. Default False
+    """
+    commits = self.commits
+    if since is not None or until is not None:
+      commits = [commit for commit in commits if _in_range(int(commit['commit_date']), since, until)]
+
+    analyzer = analyzer(timezone)
+    accumulators = analyzer.aggregate_commits(commits, metrics_precision, metric)
+    return analyzer.finalize_metrics(accumulators, metric, lazy), len(commits)
+
+  def _iterate_commits(self, revisions):
+    options = self.options
+    return iterate_commits(
+      options['docs_pattern'],
+      options['comments_are_docs'],
+      options['date_range_start'],
+      options['date_range_end'],
+      None,
+      options['exclude_path'],
+      options['jobs'],
+      options['cache'],
+      revisions,
+      diff_parser=options['diff_parser'],
+      diff_lines=False,
+      max_diff_bytes=options['max_diff_bytes'],
+      max_diff_lines=options['max_diff_lines'],
+      skip_generated=options['skip_generated'],
+      job_mode=options['job_mode'],
+      job_chunk_size=options['job_chunk_size'],
+      repo=self.path
+    )
+
+
+def rollup(commit):
+  """Returns what the analyzers use of a commit, with the stats of its diffs summed into a single diff."""
+  stats = dict((name, 0) for name in STATS)
+  for diff in commit['diffs']:
+    for name in STATS:
+      stats[name] += diff['stats'][name]
+  return {
+    'author': commit['author'],
+    'email': commit['email'],
+    'commit_date': commit['commit_date'],
+    'commit_date_iso': commit['commit_date_iso'],
+    'diffs': [{'stats': stats}]
+  }
+
+
+def _in_range(timestamp, since, until):
+  return (since is None or timestamp >= since) and (until is None or timestamp <= until)
+
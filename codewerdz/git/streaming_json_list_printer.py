@@ -1,6 +1,8 @@
 import sys
 from json import JSONEncoder
 
+from codewerdz.git.buffered_writer import BufferedWriter
+
 
 class StreamingJsonListPrinter():
   """ A streaming JSON list printer.
@@ -9,8 +11,17 @@ class StreamingJsonListPrinter():
   convert it to a list before encoding it to JSON. This saves on memory when outputing very
   large lists.
 
+  The list is printed either as a JSON array (indented, or compact), or as NDJSON: one
+  (compact or not) JSON value per line, which readers can parse a line at a time.
+  The output is buffered, see BufferedWriter.
+
   Cribbed from: https://nbsoftsolutions.com/blog/processing-arbitrary-amount-of-data-in-python.html
   """
+
+  FORMAT_JSON = 'json'
+  FORMAT_NDJSON = 'ndjson'
+  FORMATS = [FORMAT_JSON, FORMAT_NDJSON]
+
   class SerializableGenerator(list):
     """ A wrapper class that spoofs the list interface for a generator so that the JSON
     encoder will iterate over it. """
@@ -24,10 +35,33 @@ class StreamingJsonListPrinter():
       return 1
 
   @staticmethod
-  def dump(iterator, f=sys.stdout):
+  def dump(iterator, f=sys.stdout, output_format=FORMAT_JSON, compact=False,
+           flush_size=BufferedWriter.DEFAULT_FLUSH_SIZE, flush_interval=BufferedWriter.DEFAULT_FLUSH_INTERVAL):
     """ Converts a Python generator (iterator) to a JSON list and
-    outputs to a file handle (f) (defaults to sys.stdout)"""
-    encoder = JSONEncoder(indent=2)
-    for chunk in encoder.iterencode(StreamingJsonListPrinter.SerializableGenerator(iterator)):
-      f.write(chunk)
-      f.flush()
+    outputs to a file handle (f) (defaults to sys.stdout).
+
+    Keys are sorted so the output doesn't depend on how each dict was built (e.g. when
+    commits were parsed in a worker process and unpickled).
+
+    Args:
+        iterator: The values to output.
+        f: The file to output to. Default sys.stdout
+        output_format: json (an array) or ndjson (a value per line). Default json
+        compact: Whether to leave out the whitespace (i.e. indentation) between tokens. Default False
+        flush_size: See BufferedWriter. Default 64KiB
+        flush_interval: See BufferedWriter. Default 1.0
+    """
+    with BufferedWriter(f, flush_size, flush_interval) as writer:
+      if output_format == StreamingJsonListPrinter.FORMAT_NDJSON:
+        encoder = JSONEncoder(sort_keys=True, separators=(',', ':') if compact else None)
+        for value in iterator:
+          writer.write(encoder.encode(value))
+          writer.write("\n")
+        return
+
+      if compact:
+        encoder = JSONEncoder(sort_keys=True, separators=(',', ':'))
+      else:
+        encoder = JSONEncoder(indent=2, sort_keys=True)
+      for chunk in encoder.iterencode(StreamingJsonListPrinter.SerializableGenerator(iterator)):
+        writer.write(chunk)
@@ -0,0 +1,78 @@
+import sys
+from json import JSONEncoder
+
+from codewerdz.git.buffered_writer import BufferedWriter
+
+try:
+  from collections.abc import Mapping
+except ImportError:
+  from collections import Mapping
+
+_SCALARS = frozenset([type(''), type(u''), int, float, bool, type(None)])
+
+
+class StreamingJsonPrinter():
+  """ A streaming JSON printer for (large) trees of mappings.
+
+  Outputs exactly what `json.dumps(value, indent=2, sort_keys=True)` would, but one key at a
+  time: a mapping's values are only looked up as they are written, so a lazy mapping (one that
+  computes each value on access, like the finalized buckets of CommitAnalyzer) never has all
+  of its values in memory at once, and the output is never held as one (huge) string.
+  """
+
+  INDENT = '  '
+
+  @staticmethod
+  def dump(value, f=None, flush_size=BufferedWriter.DEFAULT_FLUSH_SIZE,
+           flush_interval=BufferedWriter.DEFAULT_FLUSH_INTERVAL):
+    """ Outputs value as JSON to a file handle (f) (defaults to sys.stdout).
+
+    Args:
+        value: The value to output. Mappings (of any type) are output as JSON objects.
+        f: The file to output to. Default None (sys.stdout)
+        flush_size: See BufferedWriter. Default 64KiB
+        flush_interval: See BufferedWriter. Default 1.0
+    """
+    with BufferedWriter(f or sys.stdout, flush_size, flush_interval) as writer:
+      StreamingJsonPrinter._write(writer, JSONEncoder(indent=2, sort_keys=True), value, 0)
+
+  @staticmethod
+  def _write(writer, encoder, value, level):
+    if _is_plain(value):
+      # encoded at once, then indented to its level
+      # NOTE: JSON strings can't contain raw newlines, so every newline is the start of an indented line
+      encoded = encoder.encode(value)
+      writer.write(encoded.replace('\n', '\n' + StreamingJsonPrinter.INDENT * level) if level else encoded)
+      return
+
+    keys = sorted(value.keys())
+    if not keys:
+      writer.write('{}')
+      return
+
+    indent = '\n' + StreamingJsonPrinter.INDENT * (level + 1)
+    writer.write('{')
+    for i, key in enumerate(keys):
+      writer.write((', ' if i else '') + indent + encoder.encode(key) + ': ')
+      StreamingJsonPrinter._write(writer, encoder, value[key], level + 1)
+    writer.write('\n' + StreamingJsonPrinter.INDENT * level + '}')
+
+
+def _is_plain(value):
+  """Returns whether value is made of dicts, lists and scalars only (i.e. holds no other kind of mapping)."""
+  if isinstance(value, dict):
+    items = value.values()
+  elif isinstance(value, list):
+    items = value
+  else:
+    return not isinstance(value, Mapping)
+
+  for item in items:
+    kind = type(item)
+    if kind is dict or kind is list:
+      if not _is_plain(item):
+        return False
+    # NOTE: checking against Mapping (an ABC) is slow, so the common scalars are skipped first
+    elif kind not in _SCALARS and isinstance(item, Mapping):
+      return False
+  return True
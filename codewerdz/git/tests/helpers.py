@@ -0,0 +1,57 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+
+class TemporaryGitRepo(object):
+  """A throwaway git repository, used as the working directory for the duration of a test.
+
+  Usage:
+    with TemporaryGitRepo() as repo:
+      repo.commit({'README.md': 'hello\\n'}, message='init')
+  """
+
+  def __init__(self):
+    self.path = None
+    self.previous_cwd = None
+    self.timestamp = 1483228800
+
+  def __enter__(self):
+    self.path = tempfile.mkdtemp(prefix='codewerdz-test-')
+    self.previous_cwd = os.getcwd()
+    os.chdir(self.path)
+    self.git('init', '-q')
+    self.git('config', 'user.name', 'Test')
+    self.git('config', 'user.email', 'test@example.com')
+    return self
+
+  def __exit__(self, *exc_info):
+    os.chdir(self.previous_cwd)
+    shutil.rmtree(self.path)
+
+  def git(self, *args, **env):
+    environ = dict(os.environ)
+    environ.update(env)
+    return subprocess.check_output(('git',) + args, env=environ)
+
+  def commit(self, files, message='commit', author='Test <test@example.com>', tz='+0000'):
+    """Writes the given {path: content} files (None deletes a file) and commits them.
+
+    Each commit is dated one day after the previous one, so the history is deterministic."""
+    for path, content in files.items():
+      if content is None:
+        self.git('rm', '-q', path)
+        continue
+      directory = os.path.dirname(path)
+      if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+      with open(path, 'wb') as f:
+        f.write(content)
+      self.git('add', path)
+
+    self.timestamp += 86400
+    date = '{} {}'.format(self.timestamp, tz)
+    self.git('commit', '-q', '--allow-empty', '-m', message, '--author', author,
+             GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+    return self.git('rev-parse', 'HEAD').strip()
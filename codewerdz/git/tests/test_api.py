@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+from click.testing import CliRunner
+from codewerdz.git import api
+from codewerdz.git.cli import cli
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+
+
+class TestApi(TestCase):
+  def test_matches_cli(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'README.md': 'a\n'}, author='A <a@example.com>')
+      repo.commit({'main.py': 'x = 1\n'}, author='B <b@example.com>')
+      repo.commit({'README.md': 'b\n', 'main.py': 'x = 2\n'}, author='A <a@example.com>')
+
+      result = CliRunner(mix_stderr=False).invoke(cli, ['--repo-name', 'test', '--repo-url', 'test', '--commits-limit', '2',
+                                                        'metrics', '--metrics-precision', 'monthly'])
+      expected = json.loads(result.output)['repos']['test']['metrics']
+      os.chdir(os.path.dirname(repo.path))
+      try:
+        self.assertEqual(api.compute_metrics(repo.path, precisions=['monthly'], limit=2), expected)
+        commits = list(api.iter_commits(repo.path, docs_pattern=['*.md'], diff_lines=False))
+        self.assertEqual(len(commits), 3)
+        self.assertEqual([diff['stats']['is_docfile'] for diff in commits[0]['diffs']], [True, False])
+      finally:
+        os.chdir(repo.path)
+      self.assertRaises(TypeError, api.iter_commits, date_range_start='2017-01-01')
+
+  def test_runs_in_the_repo_without_changing_directory(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'README.md': 'a\n'}, author='A <a@example.com>')
+      repo.commit({'main.py': 'x = 1\n'}, author='B <b@example.com>')
+      expected = api.compute_metrics(precisions=['monthly'])
+
+      cwd = os.path.dirname(repo.path)
+      os.chdir(cwd)
+      chdir = os.chdir
+      pid = os.getpid()
+      directories = []
+
+      def record_chdir(path):
+        # (subprocess changes directory in the child, to run git in the repo)
+        if os.getpid() == pid:
+          directories.append(path)
+        chdir(path)
+
+      os.chdir = record_chdir
+      try:
+        commits = api.iter_commits(repo.path, jobs=2, cache=True)
+        next(commits)
+        self.assertEqual(len(list(commits)), 1)
+
+        self.assertEqual(api.compute_metrics(repo.path, precisions=['monthly'], jobs=2, incremental='state.json'),
+                         expected)
+        self.assertEqual(api.compute_metrics(repo.path, precisions=['monthly'], metrics=['commit_count']),
+                         {'monthly': dict((month, {'commit_count': bucket['commit_count']})
+                                          for month, bucket in expected['monthly'].items())})
+        self.assertEqual(directories, [])
+        # the state and the cache are saved in the repo
+        assert os.path.exists(os.path.join(repo.path, 'state.json'))
+        assert os.path.exists(os.path.join(repo.path, '.git', 'codewerdz-cache.sqlite'))
+      finally:
+        os.chdir = chdir
+        os.chdir(repo.path)
+
+  def test_import_is_lazy(self):
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(api.__file__))))
+    heavy = ['click', 'whatthepatch', 'iso8601', 'numpy', 'multiprocessing']
+    output = subprocess.check_output([sys.executable, '-c', "import sys; sys.path.insert(0, {!r}); import codewerdz.git.api; "
+                                      "print([m for m in {!r} if m in sys.modules])".format(root, heavy)])
+    self.assertEqual(output.strip(), b'[]')
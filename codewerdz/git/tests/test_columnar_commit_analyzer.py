@@ -0,0 +1,57 @@
+import json
+from unittest import TestCase
+
+import codewerdz.git.metrics
+from codewerdz.git.metrics import columnar_commit_analyzer
+from codewerdz.git.metrics.columnar_commit_analyzer import ColumnarCommitAnalyzer
+from codewerdz.git.metrics.commit_analyzer import CommitAnalyzer
+from codewerdz.git.tests.test_metrics_updater import commit
+
+COMMITS = [
+  commit('Ann', '2016-12-31 23:30:00 -0700', 10, 0),
+  commit('Bob', '2017-01-01 00:30:00 +0200', 0, 5),
+  commit('Ann', '2017-01-01 10:00:00 +0000', 6, 2),
+  commit('Cid', '2017-01-01 11:00:00 +0000', 0, 0),
+  commit('Bob', '2017-03-04 10:00:00 +0000', 3, 3),
+  commit('Dee', '2017-03-04 12:00:00 +0000', 7, 1),
+  commit('Bob', '2017-03-04 13:00:00 +0000', 0, 9),
+]
+
+
+class TestColumnarCommitAnalyzer(TestCase):
+  def assertMatchesCommitAnalyzer(self, commits):
+    for metric_names in (codewerdz.git.metrics.METRICS_CHOICES, ['docs_density_avg'], ['contributor_only_docs_list']):
+      expected = CommitAnalyzer().analyze_commits(commits, codewerdz.git.metrics.PRECISION_CHOICES, metric_names)
+      actual = ColumnarCommitAnalyzer().analyze_commits(commits, codewerdz.git.metrics.PRECISION_CHOICES, metric_names)
+      self.assertEqual(json.dumps(actual, sort_keys=True), json.dumps(expected, sort_keys=True))
+
+  def test_matches_commit_analyzer(self):
+    self.assertMatchesCommitAnalyzer(COMMITS)
+    self.assertMatchesCommitAnalyzer([])
+
+  def test_matches_commit_analyzer_without_numpy(self):
+    numpy = columnar_commit_analyzer.numpy
+    columnar_commit_analyzer.numpy = None
+    try:
+      self.assertMatchesCommitAnalyzer(COMMITS)
+      self.assertMatchesCommitAnalyzer([])
+    finally:
+      columnar_commit_analyzer.numpy = numpy
+
+  def test_matches_commit_analyzer_with_contributor_sketches(self):
+    # with a precision low enough for the sketches to turn into HyperLogLogs
+    commits = [commit('Author {}'.format(n % 40), '2017-01-0{} 10:00:00 +0000'.format(n % 3 + 1), n % 2, n % 3)
+               for n in range(200)]
+    metric_names = ['contributor_count', 'contributor_only_docs_count', 'commit_count']
+    expected = CommitAnalyzer(contributor_error=0.2).analyze_commits(commits, ['total', 'daily'], metric_names)
+    actual = ColumnarCommitAnalyzer(contributor_error=0.2).analyze_commits(commits, ['total', 'daily'], metric_names)
+    self.assertEqual(actual, expected)
+
+  def test_matches_commit_analyzer_with_top_contributor_summaries(self):
+    # with few enough top contributors for the summaries to replace contributors
+    commits = [commit('Author {}'.format(n * n % 37), '2017-01-0{} 10:00:00 +0000'.format(n % 3 + 1), n % 5, n % 7)
+               for n in range(300)]
+    metric_names = ['top_contributors_by_commits', 'top_contributors_by_docs_chars', 'top_contributors_by_code_chars']
+    expected = CommitAnalyzer(top_contributors=1).analyze_commits(commits, ['total', 'daily'], metric_names)
+    actual = ColumnarCommitAnalyzer(top_contributors=1).analyze_commits(commits, ['total', 'daily'], metric_names)
+    self.assertEqual(actual, expected)
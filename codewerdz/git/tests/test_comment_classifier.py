@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+from codewerdz.git.log.comment_classifier import CommentClassifier
+
+
+class TestCommentClassifier(TestCase):
+  def assertComments(self, filename, comments, code):
+    is_comment = CommentClassifier().matcher(filename)
+    for line in comments:
+      self.assertTrue(is_comment(line), '{}: {!r}'.format(filename, line))
+    for line in code:
+      self.assertFalse(is_comment(line), '{}: {!r}'.format(filename, line))
+
+  def test_languages(self):
+    self.assertComments('src/main.c',
+                        ['// note', '  /* block', ' * body', ' */', 'int x; /* trailing */'],
+                        ['#include <stdio.h>', '#define X 1', "'''", '*', '* ', 'x = a * b;'])
+    self.assertComments('lib/util.py',
+                        ['# note', '    """Docstring."""', "'''", 'x = 1  # not at the start, but ends with """'],
+                        ['// not python', '/* nor this */', 'x = 1  # trailing'])
+    self.assertComments('query.SQL', ['-- note'], ['# not sql', 'SELECT 1'])
+    self.assertComments('docs/index.md', ['<!-- hidden -->'], ['* a bullet', '# A heading'])
+    self.assertComments('build/Makefile', ['# note'], ['// not make'])
+
+  def test_unknown_languages_use_generic_rules(self):
+    self.assertComments('notes.unknown',
+                        ['# a', '// b', '/* c', '* d', '*/', "'''", '"""', 'e */', "f '''", 'g """  '],
+                        ['', '   ', '*', '* ', 'x', 'x # y'])
+    self.assertComments('', ['# a'], ['x'])
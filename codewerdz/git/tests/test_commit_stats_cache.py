@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+from codewerdz.git.log.commit_stats_cache import CommitStatsCache
+from codewerdz.git.log.commits import iterate_commits
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+
+
+class TestCommitStatsCache(TestCase):
+  def test_cached_commits_match_parsed_commits(self):
+    with TemporaryGitRepo() as repo:
+      for i in range(5):
+        repo.commit({'README.md': 'docs\n' * i, 'main.py': '# comment\nx = {}\n'.format(i)})
+
+      def commits(**kwargs):
+        return list(iterate_commits(['*.md'], True, None, None, None, [], **kwargs))
+
+      expected = commits()
+      for commit in expected:
+        for diff in commit['diffs']:
+          del diff['diff_lines']
+
+      assert commits(cache=True) == expected
+
+      fingerprint = CommitStatsCache.settings_fingerprint(['*.md'], True, [])
+      cache = CommitStatsCache(CommitStatsCache.default_path(), fingerprint)
+      assert len(cache.cached_shas()) == 5
+
+      # new commits are added to the cache, the cached ones are reused
+      repo.commit({'main.py': 'y = 1\n'})
+      expected = commits()[0]
+      for diff in expected['diffs']:
+        del diff['diff_lines']
+      assert commits(cache=True)[0] == expected
+      assert len(cache.cached_shas()) == 6
+
+      # other settings don't share cached stats
+      other = CommitStatsCache(CommitStatsCache.default_path(), CommitStatsCache.settings_fingerprint(['*.py'], True, []))
+      assert not other.cached_shas()
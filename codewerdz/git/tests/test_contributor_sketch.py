@@ -0,0 +1,70 @@
+import json
+from unittest import TestCase
+
+from click.testing import CliRunner
+from codewerdz.git.cli import cli
+from codewerdz.git.metrics.commit_analyzer import CONTRIBUTOR_COUNTS, CommitAnalyzer
+from codewerdz.git.metrics.contributor_sketch import ContributorSketch
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+from codewerdz.git.tests.test_metrics_updater import COMMITS
+
+
+def contributor_hash(n):
+  return ContributorSketch.hash('Author {0} <author{0}@example.com>'.format(n))
+
+
+class TestContributorSketch(TestCase):
+  def test_counts_are_within_the_error_bound(self):
+    precision = ContributorSketch.precision_for(0.02)
+    self.assertEqual(precision, 12)
+
+    # exact while sparse
+    sketch = ContributorSketch(precision)
+    for n in range(100):
+      sketch.add(contributor_hash(n), n % 2, n % 3 == 0)
+    self.assertEqual(sketch.counts(), (100, 50, 34, 33, 17))
+
+    for n in range(100, 20000):
+      sketch.add(contributor_hash(n), n % 2, n % 3 == 0)
+    self.assertIsNone(sketch.sparse)
+    for count, exact in zip(sketch.counts()[:3], (20000, 10000, 6667)):
+      self.assertLess(abs(count - exact), 3 * ContributorSketch.error(precision) * exact)
+
+  def test_merges_are_exact(self):
+    whole = ContributorSketch(8)
+    parts = [ContributorSketch(8), ContributorSketch(8)]
+    for n in range(1000):
+      whole.add(contributor_hash(n % 700), 1, 0)
+      # a dense part and a sparse one
+      parts[0 if n < 990 else 1].add(contributor_hash(n % 700), 1, 0)
+
+    merged = ContributorSketch(8).merge(parts[1]).merge(parts[0])
+    self.assertEqual(merged.to_dict(), whole.to_dict())
+    self.assertEqual(ContributorSketch.from_dict(merged.to_dict()).to_dict(), whole.to_dict())
+
+  def test_analyzer_only_sketches_counts(self):
+    analyzer = CommitAnalyzer(contributor_error=0.02)
+    metrics = analyzer.aggregate_commits(COMMITS, ['total', 'yearly'], CONTRIBUTOR_COUNTS)
+    self.assertIsNone(metrics['total'].contributors)
+    self.assertEqual(analyzer.finalize_metrics(metrics, CONTRIBUTOR_COUNTS),
+                     CommitAnalyzer().analyze_commits(COMMITS, ['total', 'yearly'], CONTRIBUTOR_COUNTS))
+
+    # the lists need every contributor
+    metrics = analyzer.aggregate_commits(COMMITS, ['total'], ['contributor_count', 'contributor_docs_list'])
+    self.assertIsNone(metrics['total'].contributor_sketch)
+    self.assertEqual(len(metrics['total'].contributors), 3)
+
+  def test_error_is_only_output_for_sketched_counts(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'README.md': 'a\n'})
+
+      def output(*metrics):
+        args = ['--repo-name', 'test', '--repo-url', 'test', 'metrics', '--metrics-precision', 'yearly',
+                '--approximate-contributors', '0.02']
+        result = CliRunner(mix_stderr=False).invoke(cli, args + ['--metric=' + name for name in metrics])
+        return json.loads(result.stdout)['repos']['test']
+
+      self.assertEqual(output('contributor_count', 'commit_count')['contributor_count_error'],
+                       ContributorSketch.error(ContributorSketch.precision_for(0.02)))
+      self.assertNotIn('contributor_count_error', output('commit_count'))
+      self.assertNotIn('contributor_count_error', output('contributor_count', 'contributor_docs_list'))
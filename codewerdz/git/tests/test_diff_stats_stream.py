@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+from codewerdz.git.log.git_attributes import GitAttributes
+from codewerdz.git.log.git_log_parser import GitLogParser
+
+DIFF_LINES = [
+  'diff --git a/README.md b/README.md',
+  'index 0d55420..429a31b 100644',
+  '--- a/README.md',
+  '+++ b/README.md',
+  '@@ -1,2 +1,3 @@',
+  ' # Title',
+  '-hello',
+  '+hello world',
+  '+more docs',
+  'diff --git a/src/main.py b/src/main.py',
+  'new file mode 100644',
+  '--- /dev/null',
+  '+++ b/src/main.py',
+  '@@ -0,0 +1,4 @@',
+  '+# a comment',
+  '+x = 1\r',
+  '+y = 2\rz = 3',
+  '+"""docstring"""',
+  '\\ No newline at end of file',
+  'diff --git a/old.c b/old.c',
+  'deleted file mode 100644',
+  '--- a/old.c',
+  '+++ /dev/null',
+  '@@ -1 +0,0 @@',
+  '-// bye',
+  '-int x;',
+  'diff --git a/bin.dat b/bin.dat',
+  'Binary files a/bin.dat and b/bin.dat differ',
+]
+
+
+class TestDiffStatsStream(TestCase):
+  def test_matches_whatthepatch(self):
+    for comments_are_docs in (False, True):
+      for diff_lines in (False, True):
+        expected = GitLogParser(comments_are_docs=comments_are_docs, diff_lines=diff_lines,
+                                diff_parser=GitLogParser.DIFF_PARSER_WHATTHEPATCH)._slurp_diffs(DIFF_LINES)
+        actual = GitLogParser(comments_are_docs=comments_are_docs, diff_lines=diff_lines,
+                              diff_parser=GitLogParser.DIFF_PARSER_STREAMING)._slurp_diffs(DIFF_LINES)
+        assert actual == expected
+
+  def test_stats(self):
+    diffs = GitLogParser(comments_are_docs=True, diff_lines=False)._slurp_diffs(DIFF_LINES)
+    assert [diff['filename'] for diff in diffs] == ['README.md', 'src/main.py', 'old.c', 'bin.dat']
+    assert 'diff_lines' not in diffs[0]
+
+    readme, main, old, binary = [diff['stats'] for diff in diffs]
+    assert (readme['lines_added'], readme['lines_removed'], readme['lines_of_docs']) == (2, 1, 3)
+    assert readme['is_docfile']
+    # lines are split on '\r', so 'z = 3' isn't an added line and trailing '\r's aren't counted
+    assert (main['lines_added'], main['lines_of_docs'], main['chars_added']) == (4, 2, 36)
+    # '-1' without a count is taken as an empty hunk, so every removed line is counted
+    assert (old['lines_removed'], old['lines_of_docs'], old['chars_of_code']) == (2, 1, 6)
+    assert binary['lines_changed'] == 0
+
+  def test_truncates_big_diffs(self):
+    for diff_parser in GitLogParser.DIFF_PARSERS:
+      expected = GitLogParser(diff_parser=diff_parser)._slurp_diffs(DIFF_LINES)
+      for limits, kept_lines in [({'max_diff_lines': 8}, 8), ({'max_diff_bytes': 122}, 6)]:
+        diffs = GitLogParser(diff_parser=diff_parser, **limits)._slurp_diffs(DIFF_LINES)
+        # the stats of the truncated diffs are counted all the same
+        assert [diff['stats'] for diff in diffs] == [diff['stats'] for diff in expected]
+        assert [diff.get('truncated', False) for diff in diffs] == [True, True, False, False]
+        assert diffs[0]['diff_lines'] == '\n'.join(DIFF_LINES[:kept_lines])
+        assert diffs[2] == expected[2]
+
+  def test_skips_generated_files(self):
+    attributes = GitAttributes(GitAttributes.parse('*.py linguist-generated\n*.dat binary\n'))
+    commit = {'stats': [], 'diffs': []}
+    for skip_generated in (False, True):
+      parser = GitLogParser(attributes=attributes, diff_lines=False, skip_generated=skip_generated)
+      commit = parser._new_commit(['abc1234'], ['1\t1\tREADME.md', '4\t0\tsrc/main.py', '-\t-\tbin.dat'],
+                                  parser._slurp_diffs(DIFF_LINES), None)
+      if skip_generated:
+        assert [diff['filename'] for diff in commit['diffs']] == ['README.md', 'old.c']
+        assert [stats['path'] for stats in commit['stats']] == ['README.md']
+      else:
+        assert len(commit['diffs']) == 4 and len(commit['stats']) == 3
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from codewerdz.git.log.git_log_parser import GitLogParser
+from codewerdz.git.log.git_log_process import GitLogProcess
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+
+SENTINEL = GitLogProcess.FORMAT_START_COMMIT
+
+
+def _summary(commits):
+  return [(commit['subject'], [(diff['filename'], diff['stats']['lines_added']) for diff in commit['diffs']])
+          for commit in commits]
+
+
+class TestGitLogParser(TestCase):
+  def test_subjects_and_bodies_with_the_former_sentinel(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'a.md': 'a\n'}, message='first')
+      repo.commit({'b.md': 'b\n'}, message='{0}\n\n{0}\nbody'.format(SENTINEL))
+      repo.commit({'c.md': 'c\nc\n'}, message='before {}'.format(SENTINEL))
+      repo.commit({'a.md': 'a\n' + SENTINEL + '\n'}, message='last')
+
+      lines = list(GitLogProcess().get_lines())
+      parser = GitLogParser()
+      commits = list(parser.parse(lines))
+      self.assertEqual(_summary(commits), [
+        ('last', [('a.md', 1)]),
+        ('before {}'.format(SENTINEL), [('c.md', 2)]),
+        (SENTINEL, [('b.md', 1)]),
+        ('first', [('a.md', 1)])
+      ])
+      self.assertEqual(len(set(commit['sha'] for commit in commits)), 4)
+      # chunks of whole commits, however small
+      self.assertEqual(list(parser.parse_in_pool(lines, 2, chunk_size=1)), commits)
+
+  def test_empty_subjects(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'a.md': 'a\n'}, message='first')
+      repo.git('commit', '-q', '--allow-empty', '--allow-empty-message', '-m', '')
+      repo.commit({'b.md': 'b\n'}, message='between')
+      repo.git('mv', 'b.md', 'c.md')
+      repo.git('commit', '-q', '--allow-empty-message', '-m', '')
+
+      # (the empty commit has no changes, so git log leaves it out)
+      commits = list(GitLogParser().parse(GitLogProcess().get_lines()))
+      self.assertEqual(_summary(commits), [('', [('c.md', 0)]), ('between', [('b.md', 1)]), ('first', [('a.md', 1)])])
+
+      commits = list(GitLogParser(diff_lines=False).parse(GitLogProcess(patches=False).get_lines()))
+      self.assertEqual([(commit['subject'], commit['stats'], commit['diffs']) for commit in commits],
+                       [('', [], []), ('between', [], []), ('first', [], [])])
+
+  def test_commits_without_a_patch_at_the_end(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'empty.md': '', 'image.png': '\0\1\2'}, message='first')
+      repo.commit({'a.md': 'a\n'}, message='last')
+
+      # the first commit's diffs have no hunks, and end the output
+      lines = list(GitLogProcess().get_lines())
+      commits = list(GitLogParser().parse(lines))
+      self.assertEqual(_summary(commits), [('last', [('a.md', 1)]), ('first', [('empty.md', 0), ('image.png', 0)])])
+      self.assertEqual([stat['path'] for stat in commits[1]['stats']], ['empty.md', 'image.png'])
+
+      # or only numstats do
+      patch = max(i for i, line in enumerate(lines) if line.startswith('diff --git ')) - 3
+      commits = list(GitLogParser().parse(lines[:patch]))
+      self.assertEqual(_summary(commits), [('last', [('a.md', 1)]), ('first', [])])
+      self.assertEqual([stat['path'] for stat in commits[1]['stats']], ['empty.md', 'image.png'])
@@ -0,0 +1,65 @@
+from unittest import TestCase
+
+from codewerdz.git.metrics.commit_analyzer import CommitAnalyzer
+from codewerdz.git.metrics.heavy_hitters import HeavyHitters
+from codewerdz.git.tests.test_metrics_updater import COMMITS
+
+TOP_METRICS = ['top_contributors_by_commits', 'top_contributors_by_docs_chars', 'top_contributors_by_code_chars']
+
+
+def stream(count):
+  """Returns count keys, the n-th of which is about 1 / n of them, and their exact weights."""
+  keys = ['key{}'.format(int(1000 ** (i * 7 % count / float(count)))) for i in range(count)]
+  return keys, dict((key, keys.count(key)) for key in set(keys))
+
+
+class TestHeavyHitters(TestCase):
+  def test_counts_are_within_the_error_bound(self):
+    keys, weights = stream(5000)
+    heavy_hitters = HeavyHitters(3)
+    for key in keys:
+      heavy_hitters.add(key, 1)
+
+    self.assertEqual(len(heavy_hitters.counts), heavy_hitters.capacity)
+    for key, count in heavy_hitters.counts.items():
+      self.assertTrue(weights[key] <= count <= weights[key] + len(keys) / heavy_hitters.capacity)
+    exact = sorted(weights.items(), key=lambda item: (-item[1], item[0]))[:3]
+    self.assertEqual([key for key, _ in heavy_hitters.top()], [key for key, _ in exact])
+
+    # exact while the keys fit
+    heavy_hitters = HeavyHitters(3)
+    for key in ('b', 'a', 'b', 'c'):
+      heavy_hitters.add(key, 2)
+    self.assertEqual(heavy_hitters.top(), [['b', 4], ['a', 2], ['c', 2]])
+
+  def test_merges_keep_the_error_bound(self):
+    keys, weights = stream(3000)
+    parts = [HeavyHitters(3), HeavyHitters(3), HeavyHitters(3)]
+    for i, key in enumerate(keys):
+      parts[0 if i < 2980 else i % 2 + 1].add(key, 1)
+
+    merged = HeavyHitters(3).merge(parts[1]).merge(parts[0]).merge(parts[2])
+    for key, count in merged.counts.items():
+      self.assertTrue(weights[key] <= count <= weights[key] + len(keys) / merged.capacity)
+    self.assertEqual(HeavyHitters.from_dict(merged.to_dict()).to_dict(), merged.to_dict())
+
+    # exact while the keys fit
+    merged = HeavyHitters(3).merge(parts[1]).merge(parts[2])
+    self.assertEqual(merged.counts, dict((key, keys[2980:].count(key)) for key in set(keys[2980:])))
+
+  def test_analyzer_only_summarizes_top_contributors(self):
+    analyzer = CommitAnalyzer(top_contributors=2)
+    metrics = analyzer.aggregate_commits(COMMITS, ['total', 'yearly'], TOP_METRICS)
+    self.assertIsNone(metrics['total'].contributors)
+    self.assertEqual(analyzer.finalize_metrics(metrics, TOP_METRICS)['total'], {
+      'top_contributors_by_commits': [['Ann <ann@example.com>', 2], ['Bob <bob@example.com>', 1]],
+      'top_contributors_by_docs_chars': [['Bob <bob@example.com>', 5], ['Ann <ann@example.com>', 2]],
+      'top_contributors_by_code_chars': [['Ann <ann@example.com>', 16]],
+    })
+
+    # ranked from every contributor when they are tracked anyway
+    names = TOP_METRICS + ['contributor_docs_list']
+    metrics = analyzer.aggregate_commits(COMMITS, ['total', 'yearly'], names)
+    self.assertIsNone(metrics['total'].top_commits_summary)
+    self.assertEqual(analyzer.finalize_metrics(metrics, TOP_METRICS),
+                     analyzer.analyze_commits(COMMITS, ['total', 'yearly'], TOP_METRICS))
@@ -0,0 +1,84 @@
+import json
+import os
+import time
+
+from click.testing import CliRunner
+from codewerdz.git.cli import cli
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+from unittest import TestCase
+
+
+class TestIncrementalMetrics(TestCase):
+  def metrics(self, *args):
+    result = CliRunner(mix_stderr=False).invoke(cli, ['--repo-name', 'test', '--repo-url', 'test', 'metrics'] + list(args))
+    assert result.exit_code == 0, result.output
+    return json.loads(result.output)['repos']['test']['metrics']
+
+  def test_incremental_matches_full_run(self):
+    with TemporaryGitRepo() as repo:
+      state_path = os.path.join(repo.path, 'state.json')
+      args = ['--incremental', state_path, '--metric', 'commit_count', '--metric', 'docs_count',
+              '--metric', 'contributor_count']
+
+      repo.commit({'README.md': 'a\n'}, author='A <a@example.com>')
+      repo.commit({'main.py': 'x = 1\n'}, author='B <b@example.com>')
+      assert self.metrics(*args)['total']['commit_count'] == 2
+
+      repo.commit({'README.md': 'b\n'}, author='C <c@example.com>')
+      head = repo.commit({'main.py': 'x = 2\n'}, author='A <a@example.com>')
+      incremental = self.metrics(*args)
+      assert incremental == self.metrics(*args[2:])
+      assert incremental['total']['commit_count'] == 4
+      assert incremental['total']['contributor_count'] == 3
+
+      with open(state_path) as f:
+        assert json.load(f)['head'] == head
+
+      # rewritten history is rebuilt from scratch
+      repo.git('reset', '-q', '--hard', 'HEAD~2')
+      repo.commit({'main.py': 'x = 3\n'}, author='D <d@example.com>')
+      assert self.metrics(*args)['total']['commit_count'] == 3
+
+      # asking for a quantile rebuilds the state with its sketches, which later runs keep
+      quantiles = args + ['--metric', 'docs_density_p90']
+      assert self.metrics(*quantiles) == self.metrics(*quantiles[2:])
+      repo.commit({'README.md': 'c\n'}, author='E <e@example.com>')
+      assert self.metrics(*args) == self.metrics(*args[2:])
+      with open(state_path) as f:
+        assert json.load(f)['settings']['extra_metrics'] == ['docs_density_p90']
+      assert self.metrics(*quantiles)['total']['docs_density_p90'] == 1.0
+
+      # the top contributors are ranked from the contributors the state keeps, without rebuilding it
+      top = ['--incremental', state_path, '--metric', 'commit_count', '--top-contributors', '2']
+      assert self.metrics(*top) == self.metrics(*top[2:])
+      assert len(self.metrics(*top)['total']['top_contributors_by_commits']) == 2
+      with open(state_path) as f:
+        assert json.load(f)['settings']['extra_metrics'] == ['docs_density_p90']
+
+  def test_resumed_run_matches_full_run_with_every_metric(self):
+    with TemporaryGitRepo() as repo:
+      state_path = os.path.join(repo.path, 'state.json')
+      authors = ['{0} <{0}@example.com>'.format(name) for name in ('kim', 'al', 'zed', 'bo', 'mia', 'ed', 'lu', 'cy')]
+      for n, author in enumerate(authors + authors[::-1]):
+        repo.commit({'README.md' if n % 3 else 'main.py': '{}\n'.format(n)}, author=author)
+        if n % 5 == 4:
+          # (the contributors of each bucket are saved and resumed in the order they were first seen)
+          self.metrics('--incremental', state_path)
+      assert self.metrics('--incremental', state_path) == self.metrics()
+
+  def test_relative_date_bounds_rebuild_the_state(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'README.md': 'a\n'}, author='A <a@example.com>')
+
+      def resumed(*bounds):
+        args = ['--repo-name', 'test', '--repo-url', 'test'] + list(bounds) + ['metrics', '--incremental', 'state.json']
+        result = CliRunner(mix_stderr=False).invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        return 'rebuilding' not in result.stderr
+
+      resumed('--date-range-start', '2000-01-01 00:00:00 +0000')
+      assert resumed('--date-range-start', '2000-01-01 00:00:00 +0000')
+      # '1 year ago' is another date a second later
+      resumed('--date-range-start', '1 year ago')
+      time.sleep(1.1)
+      assert not resumed('--date-range-start', '1 year ago')
@@ -0,0 +1,74 @@
+import json
+from io import BytesIO
+from unittest import TestCase
+
+import codewerdz.git.metrics
+from codewerdz.git.buffered_writer import BufferedWriter
+from codewerdz.git.metrics.commit_analyzer import CommitAnalyzer, FinalizedBuckets
+from codewerdz.git.metrics.metrics_csv_printer import MetricsCsvPrinter
+from codewerdz.git.streaming_json_list_printer import StreamingJsonListPrinter
+from codewerdz.git.streaming_json_printer import StreamingJsonPrinter
+from codewerdz.git.tests.test_metrics_updater import COMMITS
+
+VALUES = [{'sha': 'abc', 'diffs': [{'stats': {'b': 1, 'a': [2, 3]}}]}, {'sha': 'def', 'diffs': []}]
+
+
+class TestStreamingJsonListPrinter(TestCase):
+  def dump(self, **kwargs):
+    f = BytesIO()
+    StreamingJsonListPrinter.dump(iter(VALUES), f, **kwargs)
+    return f.getvalue()
+
+  def test_json(self):
+    self.assertEqual(self.dump(), json.dumps(VALUES, indent=2, sort_keys=True))
+    self.assertEqual(self.dump(compact=True), json.dumps(VALUES, sort_keys=True, separators=(',', ':')))
+
+  def test_ndjson(self):
+    lines = self.dump(output_format='ndjson', compact=True).splitlines()
+    self.assertEqual(lines[0], '{"diffs":[{"stats":{"a":[2,3],"b":1}}],"sha":"abc"}')
+    self.assertEqual([json.loads(line) for line in lines], VALUES)
+    self.assertEqual([json.loads(line) for line in self.dump(output_format='ndjson').splitlines()], VALUES)
+
+  def test_buffered_writer_flushes_by_size(self):
+    f = BytesIO()
+    writer = BufferedWriter(f, flush_size=4, flush_interval=None)
+    writer.write('ab')
+    self.assertEqual(f.getvalue(), '')
+    writer.write('cd')
+    self.assertEqual(f.getvalue(), 'abcd')
+    writer.write('e')
+    writer.flush()
+    self.assertEqual(f.getvalue(), 'abcde')
+
+
+class TestStreamingJsonPrinter(TestCase):
+  def test_matches_json_dumps(self):
+    value = {'repos': {'b': {'list': ['x', 'y'], 'empty': {}, 'none': None, 'float': 0.1 + 0.2},
+                       'a': {'nested': {u'k\u00e9y': [], 'list': [{'z': 1, 'a': 2}]}}}, 'top': 'v\n'}
+    f = BytesIO()
+    StreamingJsonPrinter.dump(value, f)
+    self.assertEqual(f.getvalue(), json.dumps(value, indent=2, sort_keys=True))
+
+  def test_finalizes_buckets_lazily(self):
+    analyzer = CommitAnalyzer()
+    names = codewerdz.git.metrics.METRICS_CHOICES
+    metrics = analyzer.aggregate_commits(COMMITS, codewerdz.git.metrics.PRECISION_CHOICES, names)
+    lazy = analyzer.finalize_metrics(metrics, names, lazy=True)
+    self.assertIsInstance(lazy['daily'], FinalizedBuckets)
+
+    f = BytesIO()
+    StreamingJsonPrinter.dump(lazy, f)
+    self.assertEqual(f.getvalue(), json.dumps(analyzer.finalize_metrics(metrics, names), indent=2, sort_keys=True))
+
+  def test_csv(self):
+    names = ['commit_count', 'contributor_code_list', 'top_contributors_by_docs_chars']
+    metrics = CommitAnalyzer().analyze_commits(COMMITS, ['total', 'yearly'], names)
+    f = BytesIO()
+    MetricsCsvPrinter.dump({'repos': {'r': {'metrics': metrics}, 'failed': {'error': 'x'}}},
+                           names + ['contributor_stats'], f)
+    self.assertEqual(f.getvalue().splitlines(), [
+      'repo,precision,bucket,commit_count,contributor_code_list,top_contributors_by_docs_chars',
+      'r,total,,4,Ann <ann@example.com>,Bob <bob@example.com>=5;Ann <ann@example.com>=2',
+      'r,yearly,2017,3,Ann <ann@example.com>,Bob <bob@example.com>=5;Ann <ann@example.com>=2',
+      'r,yearly,2018,1,,'
+    ])
@@ -0,0 +1,48 @@
+import errno
+import os
+import subprocess
+from subprocess import CalledProcessError
+from unittest import TestCase
+
+from codewerdz.git.process.line_output_shell_process import LineOutputShellProcess
+from codewerdz.git.process.threaded_line_reader import ThreadedLineReader
+
+
+class TestLineOutputShellProcess(TestCase):
+  def tearDown(self):
+    LineOutputShellProcess.reader = LineOutputShellProcess.READER_THREADED
+
+  def test_readers_output_the_same_lines(self):
+    command = ['printf', 'a\\n\\nb c\\n\\0d\\n']
+    for reader in LineOutputShellProcess.READERS:
+      LineOutputShellProcess.reader = reader
+      self.assertEqual(list(LineOutputShellProcess().get_lines(command)), ['a', '', 'b c', '\0d'], reader)
+
+  def test_failed_command_raises(self):
+    for reader in LineOutputShellProcess.READERS:
+      LineOutputShellProcess.reader = reader
+      lines = LineOutputShellProcess().get_lines(['sh', '-c', 'echo a; exit 3'])
+      self.assertEqual(next(lines), 'a')
+      self.assertRaises(CalledProcessError, list, lines)
+
+  def test_command_is_killed_when_not_consumed(self):
+    for reader in LineOutputShellProcess.READERS:
+      LineOutputShellProcess.reader = reader
+      lines = LineOutputShellProcess().get_lines(['sh', '-c', 'echo $$; exec yes'])
+      pid = int(next(lines))
+      self.assertEqual(next(lines), 'y')
+      lines.close()
+      # the process was killed, and waited for
+      with self.assertRaises(OSError) as context:
+        os.kill(pid, 0)
+      self.assertEqual(context.exception.errno, errno.ESRCH)
+
+  def test_threaded_reader_splits_chunks(self):
+    p = subprocess.Popen(['printf', 'first\\nsecond line\\n\\nlast'], stdout=subprocess.PIPE)
+    reader = ThreadedLineReader(p.stdout, chunk_size=4, queue_size=1)
+    try:
+      self.assertEqual(list(reader), ['first', 'second line', '', 'last'])
+    finally:
+      reader.close()
+      p.stdout.close()
+      p.wait()
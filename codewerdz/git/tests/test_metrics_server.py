@@ -0,0 +1,93 @@
+import json
+import threading
+from unittest import TestCase
+
+try:
+  from urllib.error import HTTPError
+  from urllib.request import urlopen
+except ImportError:
+  from urllib2 import HTTPError, urlopen
+
+from click.testing import CliRunner
+from codewerdz.git.cli import cli
+from codewerdz.git.log.commits import JOB_MODE_SHARDS
+from codewerdz.git.log.git_log_parser import GitLogParser
+from codewerdz.git.serve.metrics_server import MetricsServer
+from codewerdz.git.serve.warm_repo import WarmRepo
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+
+OPTIONS = {
+  'date_range_start': None,
+  'date_range_end': None,
+  'commits_limit': None,
+  'exclude_path': [],
+  'docs_pattern': ['*.md'],
+  'comments_are_docs': False,
+  'jobs': 1,
+  'job_mode': JOB_MODE_SHARDS,
+  'job_chunk_size': GitLogParser.POOL_CHUNK_SIZE,
+  'cache': False,
+  'diff_parser': GitLogParser.DIFF_PARSER_STREAMING,
+  'max_diff_bytes': GitLogParser.MAX_DIFF_BYTES,
+  'max_diff_lines': GitLogParser.MAX_DIFF_LINES,
+  'skip_generated': False
+}
+
+
+class TestMetricsServer(TestCase):
+  def test_answers_queries_from_warm_commits(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'README.md': 'a\n'}, author='A <a@example.com>')
+      repo.commit({'main.py': 'x = 1\n'}, author='B <b@example.com>')
+
+      server = MetricsServer(('127.0.0.1', 0), [WarmRepo(repo.path, OPTIONS, 'test', 'test')])
+      thread = threading.Thread(target=server.serve_forever)
+      thread.daemon = True
+      thread.start()
+      url = 'http://127.0.0.1:{}/'.format(server.server_address[1])
+
+      def get(path):
+        return json.loads(urlopen(url + path).read().decode('utf-8'))
+
+      def metrics(query=''):
+        return get('metrics?precision=total&precision=monthly' + query)['repos']['test']
+
+      try:
+        assert metrics()['commit_count'] == 2
+
+        # only the new commits are parsed when HEAD moves
+        repo.commit({'README.md': 'b\n'}, author='C <c@example.com>')
+        head = repo.commit({'main.py': 'x = 2\n'}, author='A <a@example.com>')
+        output = metrics()
+        assert output['head'] == head
+        runner = CliRunner(mix_stderr=False)
+        result = runner.invoke(cli, ['--repo-name', 'test', '--repo-url', 'test', 'metrics',
+                                     '--metrics-precision', 'total', '--metrics-precision', 'monthly'])
+        assert output['metrics'] == json.loads(result.output)['repos']['test']['metrics']
+
+        # the date range is applied to the warm commits (each commit is a day apart from 2017-01-02)
+        assert metrics('&since=2017-01-03&until=2017-01-04T00:00:00Z')['commit_count'] == 2
+        assert metrics('&since=1483488000')['metrics']['total']['contributor_count'] == 2
+
+        assert get('repos')['repos']['test']['commit_count'] == 4
+        for query in ('metrics?repo=other', 'metrics?precision=never', 'metrics?since=soon', 'nothing'):
+          self.assertRaises(HTTPError, urlopen, url + query)
+      finally:
+        server.shutdown()
+        server.server_close()
+
+  def test_concurrent_refreshes_share_one_log(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'README.md': 'a\n'})
+      warm_repo = WarmRepo(repo.path, OPTIONS, 'test', 'test')
+      logs = []
+      iterate_commits = warm_repo._iterate_commits
+      warm_repo._iterate_commits = lambda revisions: logs.append(revisions) or iterate_commits(revisions)
+
+      threads = [threading.Thread(target=warm_repo.refresh) for _ in range(4)]
+      for thread in threads:
+        thread.start()
+      for thread in threads:
+        thread.join()
+      assert len(logs) == 1
+      assert len(warm_repo.commits) == 1
@@ -0,0 +1,100 @@
+import calendar
+from unittest import TestCase
+
+import codewerdz.git.metrics
+from codewerdz.git.metrics.commit_analyzer import CommitAnalyzer, finalize_accumulator
+from codewerdz.git.metrics.metrics_accumulator import MetricsAccumulator
+from codewerdz.git.metrics.metrics_updater import MetricsUpdater
+
+
+def parse_git_iso(isodate_string):
+  # eg: 2017-05-13 17:22:39 -0700
+  import iso8601
+  return iso8601.parse_date(isodate_string.replace(" -", "-").replace(" +", "+"))
+
+
+def timestamp(date_iso):
+  return calendar.timegm(parse_git_iso(date_iso).utctimetuple())
+
+
+def commit(author, date_iso, chars_of_code, chars_of_docs):
+  stats = {'chars_changed': chars_of_code + chars_of_docs, 'chars_of_code': chars_of_code, 'chars_of_docs': chars_of_docs}
+  return {'author': author, 'email': author.lower() + '@example.com', 'commit_date_iso': date_iso,
+          'commit_date': str(timestamp(date_iso)),
+          'diffs': [{'filename': 'x', 'stats': stats}]}
+
+
+COMMITS = [
+  commit('Ann', '2017-01-02 10:00:00 +0000', 10, 0),
+  commit('Bob', '2017-01-03 10:00:00 -0700', 0, 5),
+  commit('Ann', '2017-02-01 10:00:00 +0200', 6, 2),
+  commit('Cid', '2018-03-04 10:00:00 +0000', 0, 0),
+]
+
+
+class TestMetricsUpdater(TestCase):
+  def test_only_updates_selected_metrics_and_dependencies(self):
+    updater = MetricsUpdater(['docs_density_avg', 'contributor_docs_count'])
+    self.assertEqual(updater.fields, set(['docs_density_avg', 'commit_count']))
+    self.assertEqual(updater.contributor_fields, set(['docs_count', 'code_count']))
+
+    updater = MetricsUpdater(['commit_count'])
+    self.assertFalse(updater.tracks_contributors)
+    self.assertIsNone(updater.new_accumulator().contributors)
+
+  def test_selections_match_all_metrics(self):
+    precisions = codewerdz.git.metrics.PRECISION_CHOICES
+    everything = CommitAnalyzer().analyze_commits(COMMITS, precisions, codewerdz.git.metrics.METRICS_CHOICES)
+    self.assertEqual(everything['total']['contributor_only_code_list'], [])
+    self.assertEqual(everything['total']['commit_count'], 4)
+    self.assertEqual(everything['yearly']['2017']['contributor_stats']['Ann <ann@example.com>']['code_count'], 2)
+
+    for metric_names in (['commit_count'], ['docs_to_code_avg', 'contributor_count'], ['contributor_stats', 'docs_count']):
+      selected = CommitAnalyzer().analyze_commits(COMMITS, precisions, metric_names)
+      self.assertEqual(selected['total'], _filter(everything['total'], metric_names))
+      self.assertEqual(selected['monthly'], dict((month, _filter(metrics, metric_names))
+                                                 for month, metrics in everything['monthly'].items()))
+
+  def test_contributors_are_listed_in_the_order_they_were_first_seen(self):
+    names = ['Author {}'.format(n) for n in (7, 3, 12, 0, 9, 21, 5, 14, 1, 30)]
+    commits = [commit(name, '2017-01-02 10:00:00 +0000', 1, 0) for name in names + names[::-1]]
+    metrics = CommitAnalyzer().analyze_commits(commits, ['total'], ['contributor_code_list'])
+    self.assertEqual(metrics['total']['contributor_code_list'],
+                     ['{} <{}@example.com>'.format(name, name.lower()) for name in names])
+
+  def test_export_round_trip(self):
+    analyzer = CommitAnalyzer()
+    metrics = analyzer.empty_metrics(['total', 'daily'])
+    analyzer.accumulate_commits(metrics, COMMITS[:2])
+    metrics = analyzer.import_metrics(analyzer.export_metrics(metrics))
+    analyzer.accumulate_commits(metrics, COMMITS[2:])
+    self.assertIsInstance(metrics['total'], MetricsAccumulator)
+    self.assertEqual(analyzer.finalize_metrics(metrics, ['commit_count', 'contributor_stats']),
+                     CommitAnalyzer().analyze_commits(COMMITS, ['total', 'daily'], ['commit_count', 'contributor_stats']))
+
+  def test_merged_metrics_match_all_commits(self):
+    analyzer = CommitAnalyzer()
+    precisions = ['total', 'monthly', 'daily']
+    metric_names = codewerdz.git.metrics.METRICS_CHOICES
+    expected = analyzer.analyze_commits(COMMITS, precisions, metric_names)
+
+    # e.g. the metrics of separate runs over parts of the history
+    metrics = analyzer.empty_metrics(precisions, metric_names)
+    for part in (COMMITS[:1], COMMITS[1:3], COMMITS[3:]):
+      analyzer.merge_metrics(metrics, analyzer.aggregate_commits(part, precisions, metric_names))
+    self.assertEqual(analyzer.finalize_metrics(metrics, metric_names), expected)
+
+    # a month is the merge of its days
+    january = MetricsAccumulator()
+    for day in ('2017-day002', '2017-day003'):
+      january.merge(metrics['daily'][day])
+    self.assertEqual(finalize_accumulator(january, metric_names), expected['monthly']['2017-month01'])
+    self.assertEqual(expected['monthly']['2017-month01']['docs_density_avg'], (0.0 + 1.0) / 3)
+
+
+def _filter(metrics, metric_names):
+  filtered = dict((name, value) for name, value in metrics.items() if name in metric_names)
+  if 'contributor_stats' in filtered:
+    filtered['contributor_stats'] = dict((contributor, _filter(stats, metric_names))
+                                         for contributor, stats in filtered['contributor_stats'].items())
+  return filtered
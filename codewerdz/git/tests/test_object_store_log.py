@@ -0,0 +1,100 @@
+from unittest import TestCase
+
+from codewerdz.git.log.git_log_parser import GitLogParser
+from codewerdz.git.log.git_log_process import GitLogProcess
+from codewerdz.git.log.commits import iterate_commit_metadata
+from codewerdz.git.log.object_store import ObjectStore
+from codewerdz.git.log.object_store_log import ObjectStoreLog
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+
+
+def git_log(**kwargs):
+  log = GitLogProcess(patches=False, **kwargs)
+  return [_abbreviated(commit) for commit in GitLogParser(diff_lines=False).parse(log.get_lines())]
+
+
+def object_store_log(**kwargs):
+  log = ObjectStoreLog.open(**kwargs)
+  assert log is not None
+  return [_abbreviated(commit) for commit in log.iterate_commits()]
+
+
+def _abbreviated(commit):
+  """The commit with the (7 digit) object ids that git log outputs."""
+  commit = dict(commit)
+  commit['sha'] = commit['sha'][:7]
+  commit['tree'] = commit['tree'][:7]
+  commit['parent'] = ' '.join(parent[:7] for parent in commit['parent'].split())
+  return commit
+
+
+def build_history(repo):
+  """Commits a history with a merge, an empty commit, commits with equal dates, and a non UTF-8 message."""
+  root = repo.commit({'README.md': 'hello\n'}, message='init')
+  repo.commit({'src/a.py': 'a = 1\n'}, message='add a\nwrapped subject\n\nbody', author='Dev <dev@example.com>')
+  repo.git('checkout', '-q', '-b', 'topic', root)
+  repo.commit({'src/b.py': 'b = 1\n'}, message='add b', tz='-0700')
+  # dated like the previous commit
+  repo.timestamp -= 86400
+  repo.commit({'src/c.py': 'c = 1\n'}, message='add c', tz='+0530')
+  repo.git('checkout', '-q', 'master')
+  repo.commit({}, message='nothing')
+  date = '{} +0000'.format(repo.timestamp)
+  repo.git('merge', '-q', '--no-ff', '-m', 'merge topic', 'topic', GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+  with open('LICENSE', 'wb') as f:
+    f.write('MIT\n')
+  repo.git('add', 'LICENSE')
+  repo.git('-c', 'i18n.commitEncoding=iso-8859-1', 'commit', '-q', '-m', 'caf\xe9',
+           GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+  repo.commit({'README.md': 'hello again\n'}, message='update\t \n\ndetails')
+
+
+class TestObjectStoreLog(TestCase):
+  def test_matches_git_log(self):
+    with TemporaryGitRepo() as repo:
+      build_history(repo)
+
+      expected = git_log()
+      assert [commit['subject'] for commit in expected] == [
+        'update', 'caf\xc3\xa9', 'add c', 'add b', 'add a wrapped subject', 'init']
+      assert object_store_log() == expected
+
+      # the same commits read from packs, with deltas
+      repo.git('gc', '-q', '--aggressive')
+      assert object_store_log() == expected
+
+      # with their parents, trees and dates read from the commit-graph
+      repo.git('commit-graph', 'write', '--reachable')
+      assert object_store_log() == expected
+
+  def test_ranges_and_limits(self):
+    with TemporaryGitRepo() as repo:
+      shas = [repo.commit({'file': 'version {}\n'.format(i)}, message='commit {}'.format(i)) for i in range(6)]
+
+      for revisions, limit in [(None, '2'), (None, '0'), (['{}..HEAD'.format(shas[2])], None),
+                               (['{}..{}'.format(shas[1], shas[4])], '2'), (['HEAD..{}'.format(shas[3])], None)]:
+        assert object_store_log(revisions=revisions, limit=limit) == git_log(revisions=revisions, limit=limit)
+
+  def test_falls_back_to_git_log(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'README.md': 'hello\n'}, message='init', author='Old Name <old@example.com>')
+      assert ObjectStoreLog.open(since='2017-01-01') is None
+      assert ObjectStoreLog.open(excluded_paths=['docs']) is None
+
+      # the mailmap changes the authors git outputs
+      repo.commit({'.mailmap': 'New Name <new@example.com> <old@example.com>\n'}, message='mailmap')
+      assert ObjectStoreLog.open() is None
+      commits = list(iterate_commit_metadata(None, None, None, []))
+      assert [commit['author'] for commit in commits] == ['Test', 'New Name']
+      assert [commit['stats'] for commit in commits] == [[], []]
+
+  def test_object_store_reads_objects(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'README.md': 'hello\n' * 100}, message='init')
+      repo.commit({'README.md': 'hello\n' * 100 + 'world\n'}, message='update')
+      blob = repo.git('rev-parse', 'HEAD:README.md').strip()
+
+      assert ObjectStore('.git/objects').read(blob) == ('blob', 'hello\n' * 100 + 'world\n')
+      repo.git('gc', '-q', '--aggressive')
+      assert ObjectStore('.git/objects').read(blob) == ('blob', 'hello\n' * 100 + 'world\n')
+      self.assertRaises(KeyError, ObjectStore('.git/objects').read, '0' * 40)
@@ -0,0 +1,63 @@
+import fnmatch
+from unittest import TestCase
+
+import codewerdz.git
+from codewerdz.git.log.git_attributes import GitAttributes
+from codewerdz.git.log.path_classifier import PathClassifier
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+
+PATHS = [
+  'README', 'README.md', 'docs/index.rst', 'docs/api/README', 'src/main.py', 'src/notes.txt',
+  'vendor/lib.js', 'vendor/nested/readme.markdown', 'setup.py', 'a.md/b.py', '[weird].md', 'CHANGES.asc'
+]
+
+
+class TestPathClassifier(TestCase):
+  def test_docs_match_like_fnmatch(self):
+    patterns = codewerdz.git.DEFAULT_DOCS_PATTERNS + ['docs/*', '*/README', '[[]weird*']
+    classifier = PathClassifier(patterns)
+    for path in PATHS:
+      expected = any(fnmatch.fnmatch(path, pattern) for pattern in patterns)
+      self.assertEqual(classifier.is_doc_file(path), expected, path)
+    self.assertFalse(classifier.is_doc_file(''))
+
+  def test_cache_is_bounded(self):
+    classifier = PathClassifier(['*.md'], cache_size=3)
+    for path in PATHS:
+      classifier.classify(path)
+    self.assertEqual(list(classifier.cache), PATHS[-3:])
+
+    # a hit makes the path the most recently used one
+    classifier.classify(PATHS[-3])
+    classifier.classify('new.md')
+    self.assertEqual(list(classifier.cache), [PATHS[-1], PATHS[-3], 'new.md'])
+
+  def test_attributes(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({
+        '.gitattributes': '# linguist overrides\n'
+                          'docs/** -linguist-documentation\n'
+                          '*.rst linguist-documentation\n'
+                          'manual/* linguist-documentation=true\n'
+                          '[attr]binary -diff\n',
+        'src/.gitattributes': '/gen/*.py linguist-generated\n**/fixtures/** linguist-documentation\n'
+                              '*.png binary\n*.min.js -diff\n',
+      })
+      attributes = GitAttributes.load()
+
+    classifier = PathClassifier(codewerdz.git.DEFAULT_DOCS_PATTERNS, attributes=attributes)
+    expectations = [
+      ('README.md', PathClassifier.DOCS),
+      ('docs/guide.md', 0),  # unset by docs/**
+      ('docs/guide.rst', PathClassifier.DOCS),  # set again by the later *.rst
+      ('manual/intro.c', PathClassifier.DOCS),
+      ('manual/sub/intro.c', 0),  # * doesn't match across directories
+      ('src/gen/api.py', PathClassifier.GENERATED),
+      ('gen/api.py', 0),  # relative to src/.gitattributes
+      ('src/a/fixtures/data.json', PathClassifier.DOCS),
+      ('src/main.py', 0),
+      ('src/logo.png', PathClassifier.BINARY),
+      ('src/gen/app.min.js', PathClassifier.BINARY),
+    ]
+    for path, flags in expectations:
+      self.assertEqual(classifier.classify(path), flags, path)
@@ -0,0 +1,72 @@
+import json
+import os
+
+from click.testing import CliRunner
+from codewerdz.git.cli import cli
+from codewerdz.git.profiler import Profiler, profiled, profiled_stage
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+from unittest import TestCase
+
+
+class TestProfiler(TestCase):
+  def tearDown(self):
+    Profiler.stop()
+
+  def test_not_profiling(self):
+    lines = ['a', 'b']
+    assert profiled('git', lines) is lines
+    with profiled_stage('output'):
+      pass
+    assert Profiler.current() is None
+
+  def test_stages(self):
+    profiler = Profiler.start(progress_interval=None, slowest_count=2)
+    with profiled_stage('analyze'):
+      lines = list(profiled('git', iter(['ab', 'c', 'def']), size=len, batch_size=2))
+      commits = list(profiled('parse', [{'sha': sha} for sha in 'xyz'], commits=True))
+      diff = profiler.timed_feed('diff', _Diff())
+      for line in lines:
+        diff.feed(line)
+      assert diff.result() == 'ab c def'
+    report = Profiler.stop().report()
+
+    assert len(commits) == 3
+    assert report['commits'] == 3
+    assert sorted(commit['sha'] for commit in report['slowest_commits']) in [['x', 'y'], ['x', 'z'], ['y', 'z']]
+    stages = report['stages']
+    assert sorted(stages) == ['analyze', 'diff', 'git', 'other', 'parse']
+    assert (stages['git']['items'], stages['git']['bytes']) == (3, 6)
+    assert stages['parse']['items'] == 3
+    assert stages['diff']['items'] == 1
+    # the time of each stage is its own, so that they add up to the run's
+    total = sum(stage['wall_time'] for stage in stages.values())
+    assert abs(total - report['wall_time']) < 0.001
+
+  def test_cli_profile(self):
+    with TemporaryGitRepo() as repo:
+      repo.commit({'README.md': 'a\n'})
+      repo.commit({'main.py': 'x = 1\n'})
+      profile_path = os.path.join(repo.path, 'profile.json')
+
+      args = ['--repo-name', 'test', '--repo-url', 'test', 'metrics', '--metric', 'commit_count']
+      result = CliRunner(mix_stderr=False).invoke(cli, ['--profile', profile_path] + args)
+      assert result.exit_code == 0, result.output
+      assert json.loads(result.output)['repos']['test']['metrics']['total']['commit_count'] == 2
+      assert Profiler.current() is None
+
+      with open(profile_path) as f:
+        report = json.load(f)
+      assert report['commits'] == 2
+      assert report['stages']['analyze']['items'] == 2
+      assert 'output' in report['stages']
+
+
+class _Diff(object):
+  def __init__(self):
+    self.lines = []
+
+  def feed(self, line):
+    self.lines.append(line)
+
+  def result(self):
+    return ' '.join(self.lines)
@@ -0,0 +1,32 @@
+import random
+from unittest import TestCase
+
+from codewerdz.git.metrics.quantile_sketch import QuantileSketch
+
+
+class TestQuantileSketch(TestCase):
+  def test_quantiles_are_within_the_error_bound(self):
+    rng = random.Random(0)
+    values = [0.0] * 100 + [1.0] * 50 + [rng.random() for _ in range(1000)] + [rng.expovariate(0.01) for _ in range(100)]
+    sketch = QuantileSketch()
+    for value in values:
+      sketch.add(value)
+
+    values.sort()
+    for q in (0.0, 0.05, 0.5, 0.9, 0.99, 1.0):
+      exact = values[int(q * (len(values) - 1))]
+      self.assertLessEqual(abs(sketch.quantile(q) - exact), QuantileSketch.ALPHA * exact)
+    self.assertEqual(sketch.quantile(1.0), values[-1])
+    self.assertEqual(QuantileSketch().quantile(0.5), 0.0)
+
+  def test_merges_are_exact(self):
+    values = [i / 7.0 for i in range(50)]
+    whole = QuantileSketch()
+    parts = [QuantileSketch(), QuantileSketch(), QuantileSketch()]
+    for i, value in enumerate(values):
+      whole.add(value)
+      parts[i % 3].add(value)
+
+    merged = QuantileSketch().merge(parts[2]).merge(parts[0]).merge(parts[1])
+    self.assertEqual(merged.to_dict(), whole.to_dict())
+    self.assertEqual(QuantileSketch.from_dict(merged.to_dict()).to_dict(), whole.to_dict())
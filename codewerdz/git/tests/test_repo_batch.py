@@ -0,0 +1,65 @@
+import json
+import os
+
+from click.testing import CliRunner
+from codewerdz.git.cli import cli
+from codewerdz.git.metrics import metrics_command
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+from unittest import TestCase
+
+
+class TestRepoBatch(TestCase):
+  def metrics(self, *args, **kwargs):
+    jobs = str(kwargs.get('jobs', 2))
+    result = CliRunner(mix_stderr=False).invoke(cli, ['-j', jobs, 'metrics', '--metric', 'commit_count'] + list(args))
+    return result.exit_code, json.loads(result.stdout)['repos']
+
+  def test_analyzes_each_repo(self):
+    with TemporaryGitRepo() as first:
+      first.commit({'README.md': 'a\n'})
+      with TemporaryGitRepo() as second:
+        second.commit({'README.md': 'a\n'})
+        second.commit({'main.py': 'x = 1\n'})
+
+        repos_file = os.path.join(second.path, 'repos.txt')
+        with open(repos_file, 'w') as f:
+          f.write("# name and url are optional\n{} first https://example.com/first.git\n\n".format(first.path))
+          f.write(os.path.join(second.path, 'missing') + "\n")
+
+        exit_code, repos = self.metrics('--repos-file', repos_file, '--repo', second.path)
+        assert exit_code == 1
+        assert set(repos) == set(['first', 'missing', os.path.basename(second.path)])
+
+        assert repos['first']['url'] == 'https://example.com/first.git'
+        assert repos['first']['commit_count'] == 1
+        assert repos['first']['metrics']['total'] == {'commit_count': 1}
+        assert repos[os.path.basename(second.path)]['metrics']['total'] == {'commit_count': 2}
+        assert 'No such file or directory' in repos['missing']['error']
+
+  def test_analyzes_each_repo_by_path(self):
+    with TemporaryGitRepo() as first:
+      first.commit({'README.md': 'a\n'})
+      with TemporaryGitRepo() as second:
+        second.commit({'README.md': 'a\n'})
+        repos_file = os.path.join(second.path, 'repos.txt')
+        with open(repos_file, 'w') as f:
+          f.write("{} first https://example.com/first.git\n{} second\n".format(first.path, second.path))
+
+        chdir, repo_url = os.chdir, metrics_command.repo_url
+        directories, urls = [], []
+        os.chdir = lambda path: directories.append(path) or chdir(path)
+        metrics_command.repo_url = lambda path=None: urls.append(path) or repo_url(path)
+        try:
+          # (in this process, with a single job)
+          exit_code, repos = self.metrics('--repos-file', repos_file, '--incremental', 'state.json', jobs=1)
+        finally:
+          os.chdir, metrics_command.repo_url = chdir, repo_url
+
+        assert exit_code == 0
+        assert repos['first']['metrics']['total'] == {'commit_count': 1}
+        assert directories == []
+        # only the repo without a URL in the repos file looks its URL up
+        assert urls == [second.path]
+        assert repos['first']['url'] == 'https://example.com/first.git'
+        assert os.path.exists(os.path.join(first.path, 'state.json'))
+        assert os.path.exists(os.path.join(second.path, 'state.json'))
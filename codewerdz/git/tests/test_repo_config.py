@@ -0,0 +1,58 @@
+import os
+from subprocess import CalledProcessError
+from unittest import TestCase
+
+from codewerdz.git.repo_config import RepoConfig, repo_name, repo_url
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+
+
+class TestRepoConfig(TestCase):
+  def assertMatchesGit(self, repo):
+    expected = repo.git('ls-remote', '--get-url', 'origin').strip()
+    self.assertEqual(repo_url(), expected)
+    self.assertEqual(RepoConfig.load().remote_url(), expected)
+
+  def test_remote_url_matches_git(self):
+    with TemporaryGitRepo() as repo:
+      # a remote that isn't configured is its own URL
+      self.assertMatchesGit(repo)
+
+      repo.git('remote', 'add', 'origin', 'git@github.com:codewerdz/codewerdz-git.git')
+      self.assertMatchesGit(repo)
+      self.assertEqual(repo_name(repo_url()), 'codewerdz/codewerdz-git.git')
+
+      repo.git('config', 'url.https://github.com/.insteadOf', 'git@github.com:')
+      repo.git('config', 'url.https://example.com/.insteadOf', 'git@')
+      self.assertMatchesGit(repo)
+
+      # from a subdirectory
+      os.mkdir('docs')
+      os.chdir('docs')
+      self.assertEqual(repo_url('.'), 'https://github.com/codewerdz/codewerdz-git.git')
+
+  def test_unreadable_configs_are_left_to_git(self):
+    with TemporaryGitRepo() as repo:
+      repo.git('remote', 'add', 'origin', 'git@github.com:codewerdz/codewerdz-git.git')
+      with open(os.path.join('.git', 'config'), 'a') as f:
+        f.write('[alias]\n\tx = "unterminated\n')
+      self.assertIsNone(RepoConfig.load())
+      # (which rejects this one too)
+      self.assertRaises(CalledProcessError, repo_url)
+
+  def test_read(self):
+    config = RepoConfig()
+    config.read([
+      '[core]\n',
+      '\tbare = false ; a comment\n',
+      '[remote "up\\"stream"]\n',
+      '  url = "/path/with # hash"  # comment\n',
+      '[branch.Main]\n',
+      '  Merge = refs/heads/\\\n',
+      'main\n',
+      '  rebase\n'
+    ])
+    self.assertEqual(config.get('core', 'bare'), 'false')
+    self.assertEqual(config.get('remote', 'url', 'up"stream'), '/path/with # hash')
+    self.assertEqual(config.get('branch', 'merge', 'main'), 'refs/heads/main')
+    self.assertEqual(config.get('branch', 'rebase', 'main'), 'true')
+    self.assertEqual(config.get('core', 'missing', default='x'), 'x')
@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+from codewerdz.git.log.git_log_parser import GitLogParser
+from codewerdz.git.log.git_log_process import GitLogProcess
+from codewerdz.git.log.commits import JOB_MODE_DIFFS, iterate_commits
+from codewerdz.git.log.sharded_git_log import ShardedGitLog
+from codewerdz.git.tests.helpers import TemporaryGitRepo
+
+
+class TestShardedGitLog(TestCase):
+  def test_split(self):
+    sharded_log = ShardedGitLog(3)
+    assert sharded_log.split([]) == []
+    assert sharded_log.split(['a', 'b']) == [['a'], ['b']]
+    assert sharded_log.split(list('abcdefg')) == [['a', 'b', 'c'], ['d', 'e', 'f'], ['g']]
+
+  def test_matches_serial_log(self):
+    with TemporaryGitRepo() as repo:
+      for i in range(12):
+        repo.commit({
+          'README.md': '# Title\n' + 'docs\n' * i,
+          'src/main.py': '# comment {}\nx = {}\n'.format(i, i) * (i % 4)
+        }, message='commit {}'.format(i), author='Dev{0} <dev{0}@example.com>'.format(i % 3))
+
+      def commits(**kwargs):
+        return list(iterate_commits(['*.md'], True, None, None, None, [], **kwargs))
+
+      serial = commits()
+      assert len(serial) == 12
+      assert commits(jobs=4) == serial
+      assert commits(jobs=3, job_mode=JOB_MODE_DIFFS, job_chunk_size=5) == serial
+
+      # either framing is split into chunks of whole commits
+      for framing in (GitLogProcess.FRAMING_NUL, GitLogProcess.FRAMING_SENTINEL):
+        lines = list(GitLogProcess(framing=framing).get_lines())
+        parser = GitLogParser(['*.md'], True)
+        assert list(parser.parse_in_pool(lines, 2, chunk_size=2)) == list(parser.parse(lines))
+        assert [chunk.count('\nDev') for chunk in parser._frame_chunks(lines, 5)] == [5, 5, 2]
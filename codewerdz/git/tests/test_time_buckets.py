@@ -0,0 +1,70 @@
+import datetime
+from unittest import TestCase
+
+from codewerdz.git.metrics.time_buckets import TimeBuckets, parse_timezone
+from codewerdz.git.tests.test_metrics_updater import commit, parse_git_iso
+
+PRECISIONS = ['yearly', 'quarterly', 'monthly', 'weekly', 'isoweekly', 'daily', 'hourly']
+
+
+# the date functions the buckets used to be keyed with (see test_matches_legacy_date_functions)
+class UTC(datetime.tzinfo):
+  """UTC"""
+
+  def utcoffset(self, dt):
+    return datetime.timedelta(0)
+
+  def tzname(self, dt):
+    return "UTC"
+
+  def dst(self, dt):
+    return datetime.timedelta(0)
+
+
+def week_of_year(isodate_string):
+  """ NOTE: Not ISO week number... TODO, decide if we care about this or not... """
+  date = parse_git_iso(isodate_string)
+  return ((date - datetime.datetime(date.year, 1, 1, tzinfo=UTC())).days // 7) + 1
+
+
+def day_of_year(isodate_string):
+  date = parse_git_iso(isodate_string)
+  return date.timetuple().tm_yday
+
+
+def month_of_year(isodate_string):
+  date = parse_git_iso(isodate_string)
+  return date.timetuple().tm_mon
+
+
+class TestTimeBuckets(TestCase):
+  def test_buckets_in_committer_timezone(self):
+    keys = TimeBuckets().keys(commit('Ann', '2016-01-01 01:30:00 +0200', 1, 0), PRECISIONS)
+    # Jan 1st 01:30 +0200 is before Jan 1st 00:00 UTC, which the legacy weeks count from
+    self.assertEqual(keys, ['2016', '2016-quarter1', '2016-month01', '2016-week00', '2015-isoweek53',
+                            '2016-day001', '2016-day001-hour01'])
+
+  def test_buckets_in_fixed_timezone(self):
+    a_commit = commit('Ann', '2017-12-31 20:00:00 -0700', 1, 0)
+    self.assertEqual(TimeBuckets('utc').keys(a_commit, PRECISIONS),
+                     ['2018', '2018-quarter1', '2018-month01', '2018-week01', '2018-isoweek01',
+                      '2018-day001', '2018-day001-hour03'])
+    self.assertEqual(TimeBuckets('+05:30').keys(a_commit, ['hourly']), ['2018-day001-hour08'])
+
+  def test_matches_legacy_date_functions(self):
+    buckets = TimeBuckets()
+    for date_iso in ('2016-12-31 23:59:59 -1200', '2017-01-01 00:00:00 +1400', '2016-02-29 12:00:00 +0530',
+                     '2015-06-15 07:30:00 -0930', '2020-12-31 00:00:00 +0000'):
+      year = date_iso[:4]
+      self.assertEqual(buckets.keys(commit('Ann', date_iso, 1, 0), ['monthly', 'weekly', 'daily']), [
+        "{0}-month{1:0>2}".format(year, month_of_year(date_iso)),
+        "{0}-week{1:0>2}".format(year, week_of_year(date_iso)),
+        "{0}-day{1:0>3}".format(year, day_of_year(date_iso))
+      ])
+
+  def test_parse_timezone(self):
+    self.assertEqual(parse_timezone('committer'), None)
+    self.assertEqual(parse_timezone('UTC'), 0)
+    self.assertEqual(parse_timezone('-0930'), -34200)
+    self.assertEqual(parse_timezone('+02'), 7200)
+    self.assertRaises(ValueError, parse_timezone, 'Europe/Paris')
@@ -28,6 +28,10 @@ setup(name='codewerdz-git',
         'click',
         'iso8601'
       ],
+      extras_require={
+        # speeds up `metrics --analyzer columnar`
+        'columnar': ['numpy']
+      },
       test_suite='nose.collector',
       tests_require=['nose'],
       entry_points={